@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Concurrent page fetching for the scrapers
+Downloads a list of URLs through the shared fair scheduler, limited per host
+"""
+
+import asyncio
+from urllib.parse import urlparse
+
+import http_transport
+import scheduler
+from scheduler import get_scheduler, DEFAULT_PER_HOST
+
+
+def host_of(url):
+    """Return the lowercase host part of a URL"""
+    return urlparse(url).netloc.lower()
+
+
+async def _fetch_one(url, per_host, headers, timeout, deadline):
+    """Queue a single page on the scheduler and wait for it"""
+    future = get_scheduler().submit(host_of(url), http_transport.get, url, per_host=per_host,
+                                    headers=headers, timeout=timeout, html_only=True, deadline=deadline)
+    try:
+        return await asyncio.wrap_future(future)
+    except Exception as e:
+        return e
+
+
+async def fetch_many(urls, headers=None, timeout=10, per_host=DEFAULT_PER_HOST, deadline=None):
+    """
+    Fetch URLs concurrently, at most `per_host` at a time for each host.
+    Downloads from every source in the process share one scheduler, so
+    hosts take turns and the global concurrency cap holds for all of them.
+    """
+    tasks = {}
+    for url in dict.fromkeys(urls):
+        tasks[url] = asyncio.ensure_future(_fetch_one(url, per_host, headers, timeout, deadline))
+
+    if tasks:
+        await asyncio.wait(tasks.values())
+    return {url: task.result() for url, task in tasks.items()}
+
+
+def fetch(url, headers=None, timeout=10, deadline=None):
+    """
+    Fetch one page the way fetch_all() does: the response, or the exception
+    raised, so a failure can still be passed to failure_reason()
+    """
+    try:
+        return http_transport.get(url, headers=headers, timeout=timeout, html_only=True, deadline=deadline)
+    except Exception as e:
+        return e
+
+
+def fetch_all(urls, headers=None, timeout=10, per_host=DEFAULT_PER_HOST, deadline=None):
+    """
+    Fetch all URLs concurrently and return {url: response}.
+    A failed download maps to the exception that was raised, so callers
+    can report it the same way as a sequential fetch error. Only HTML is
+    downloaded; other content types map to http_transport.NotHTML, and
+    pages not started before `deadline` to http_transport.DeadlineExceeded.
+    """
+    urls = list(urls)
+    if not urls:
+        return {}
+    if scheduler.ADAPTIVE_PER_HOST:
+        print(f"⚡ Fetching {len(urls)} pages concurrently (adaptive per-host limit)...")
+    else:
+        print(f"⚡ Fetching {len(urls)} pages concurrently (max {per_host} per host)...")
+    return asyncio.run(fetch_many(urls, headers=headers, timeout=timeout, per_host=per_host,
+                                  deadline=deadline))
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Historical backfill: walk a source's listing pages as deep as they go
+The crawl frontier (listing pages and the articles found on them) lives in
+an SQLite file and is committed after every page, so a backfill stopped by
+a crash, Ctrl-C or its time budget picks up where it left off on the next
+start. Pages go through the shared HTTP transport, so robots.txt, the
+per-host rate limits and the circuit breaker apply as in the cron runs;
+articles are parsed and saved by the source's own scraper code
+Usage: python3 backfill.py <scraper.py> [--max-pages N] [--hours H] [--stop-at-seen] [--reset]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+
+import http_transport
+import pagination
+import rate_limit
+from async_fetch import fetch_all
+from deadline import Deadline
+from failure_ledger import failure_reason
+from head_index import HeadIndex
+from run_sources import load_source
+from urls import url_key
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+FRONTIER_FILE = os.path.join(SCRIPT_DIR, "backfill.sqlite")
+MAX_PAGES = 200             # listing pages read per run, unless --max-pages says otherwise
+MAX_HOURS = 6               # time budget of one run
+ARTICLE_BATCH = 8           # articles downloaded concurrently between checkpoints
+MAX_ATTEMPTS = 3            # tries per page before it is given up
+RETRY_PENALTY = 1000        # priority added per failed try, so retries wait for the rest
+
+# Frontier entry kinds and states
+LISTING = 'listing'
+ARTICLE = 'article'
+PENDING = 'pending'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class Frontier:
+    """
+    One source's crawl frontier. Lower priority goes first: listing page n
+    has 2n - 1 and its articles 2n, so a page's articles are finished before
+    the next page is read and the frontier never grows past one page ahead.
+    """
+
+    def __init__(self, source, path=FRONTIER_FILE):
+        self.source = source
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS frontier ("
+            " source TEXT, key TEXT, url TEXT, kind TEXT, page INTEGER, priority INTEGER,"
+            " state TEXT, attempts INTEGER DEFAULT 0, updated_at REAL,"
+            " PRIMARY KEY (source, key))"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS frontier_next ON frontier(source, state, priority)")
+        self.conn.commit()
+
+    def add(self, url, kind, page):
+        """Queue a URL unless the frontier already has it; True when it was new"""
+        priority = 2 * page - 1 if kind == LISTING else 2 * page
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO frontier (source, key, url, kind, page, priority, state, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (self.source, url_key(url), url, kind, page, priority, PENDING, time.time())
+        )
+        return cursor.rowcount > 0
+
+    def next_batch(self, limit=ARTICLE_BATCH):
+        """The next listing page on its own, or up to `limit` articles of equal priority"""
+        row = self.conn.execute(
+            "SELECT kind, priority FROM frontier WHERE source = ? AND state = ? ORDER BY priority, rowid LIMIT 1",
+            (self.source, PENDING)
+        ).fetchone()
+        if not row:
+            return []
+        kind, priority = row
+        rows = self.conn.execute(
+            "SELECT url, kind, page FROM frontier WHERE source = ? AND state = ? AND kind = ? AND priority = ?"
+            " ORDER BY rowid LIMIT ?",
+            (self.source, PENDING, kind, priority, 1 if kind == LISTING else limit)
+        ).fetchall()
+        return rows
+
+    def done(self, url):
+        self._set(url, "state = ?", (DONE,))
+
+    def retry(self, url):
+        """Count a failed try; the URL goes to the back of the queue, or is given up after MAX_ATTEMPTS"""
+        self._set(url, "attempts = attempts + 1, priority = priority + ?,"
+                       " state = CASE WHEN attempts + 1 >= ? THEN ? ELSE state END",
+                  (RETRY_PENALTY, MAX_ATTEMPTS, FAILED))
+
+    def give_up(self, url):
+        """Drop a URL that cannot succeed, such as a listing page past the last one"""
+        self._set(url, "attempts = attempts + 1, state = ?", (FAILED,))
+
+    def _set(self, url, assignments, values):
+        self.conn.execute(f"UPDATE frontier SET {assignments}, updated_at = ? WHERE source = ? AND key = ?",
+                          (*values, time.time(), self.source, url_key(url)))
+
+    def checkpoint(self):
+        """Make everything recorded so far survive a crash"""
+        self.conn.commit()
+
+    def counts(self):
+        """{state: number of URLs} for this source"""
+        return dict(self.conn.execute(
+            "SELECT state, COUNT(*) FROM frontier WHERE source = ? GROUP BY state", (self.source,)
+        ).fetchall())
+
+    def reset(self):
+        """Forget this source's frontier, to backfill it again from the first page"""
+        self.conn.execute("DELETE FROM frontier WHERE source = ?", (self.source,))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+def next_filename(output_dir, prefix):
+    """First free `{prefix}-{nnn}.json` in output_dir; the cron runs number from 001 each day"""
+    taken = set()
+    for name in os.listdir(output_dir):
+        if name.startswith(prefix + '-') and name.endswith('.json'):
+            number = name[len(prefix) + 1:-len('.json')]
+            if number.isdigit():
+                taken.add(int(number))
+    number = 1
+    while number in taken:
+        number += 1
+    return f"{prefix}-{number:03d}.json"
+
+
+class ModuleSource:
+    """A procedural scraper (kbbihac.py, kcbihac.py), driven through its module functions"""
+
+    def __init__(self, module):
+        self.module = module
+        self.name = module.SCRIPT_NAME
+        self.start_urls = [module.BASE_URL]
+        self.headers = module.HEADERS
+        self.scraped_urls, self.content_hashes = module.load_scraped_data()
+        self.heads = HeadIndex(self.name)
+        module.ensure_dirs()
+        rate_limit.configure(module.BASE_URL, module.RATE_PER_SECOND, module.RATE_BURST)
+
+    def listing_links(self, soup, page_url):
+        return self.module.listing_links(soup, page_url)
+
+    def process(self, url, response):
+        """Parse and save one article: 'saved', 'duplicate', or None when it could not be read"""
+        details = self.module.extract_news_details(url, response)
+        if not details:
+            return None
+        fb_post, _, content_hash = self.module.format_for_facebook(details)
+        self.scraped_urls.add(url)
+        if content_hash in self.content_hashes:
+            return 'duplicate'
+        prefix = f"{self.module.SCRIPT_NAME_HASH}-{time.strftime('%Y%m%d')}"
+        filename = next_filename(self.module.OUTPUT_DIR, prefix)
+        with open(os.path.join(self.module.OUTPUT_DIR, filename), 'w', encoding='utf-8') as f:
+            json.dump(fb_post, f, indent=2, ensure_ascii=False)
+        print(f"  ✅ Saved: {filename} - {details['title'][:50]}")
+        self.content_hashes.add(content_hash)
+        self.heads.add(url)
+        return 'saved'
+
+    def save(self):
+        self.module.save_scraped_data(self.scraped_urls, self.content_hashes)
+        self.heads.save()
+
+
+class ScraperSource:
+    """A class-based scraper (bihac-org.py), driven through its instance"""
+
+    def __init__(self, scraper):
+        self.scraper = scraper
+        self.name = scraper.script_name
+        self.start_urls = list(scraper.urls.values())
+        self.headers = dict(scraper.session.headers)
+        self.scraped_urls = scraper.scraped_urls
+
+    def listing_links(self, soup, page_url):
+        return self.scraper.find_article_links(soup, page_url)
+
+    def process(self, url, response):
+        """Parse and save one article: 'saved', 'duplicate', or None when it could not be read"""
+        if isinstance(response, Exception):
+            print(f"  ❌ Error: {response}")
+            return None
+        if response.status_code != 200:
+            print(f"  ❌ HTTP {response.status_code}")
+            return None
+        post_data = self.scraper.parse_article(url, http_transport.parse_html(response),
+                                              self.scraper.get_category_from_url(url))
+        self.scraper.scraped_urls.add(url)
+        if post_data['content_hash'] in self.scraper.content_hashes:
+            return 'duplicate'
+        filename = self.scraper.save_post(post_data)
+        print(f"  ✅ Saved: {filename} - {post_data['title'][:50]}")
+        self.scraper.content_hashes.add(post_data['content_hash'])
+        self.scraper.heads.add(url)
+        return 'saved'
+
+    def save(self):
+        self.scraper.save_state()
+
+
+# Sources with paginated listings the backfill knows how to drive
+SOURCES = {
+    'kbbihac.py': ModuleSource,
+    'kcbihac.py': ModuleSource,
+    'bihac-org.py': lambda module: ScraperSource(module.BihacOrgScraper()),
+}
+
+
+def transient(outcome):
+    """
+    True when a fetch failed for reasons that are not the URL's own: the host
+    is down or rate limiting, its breaker is open, or time ran out. Such URLs
+    stay pending with their attempts untouched, for the next run.
+    """
+    response = getattr(outcome, 'response', None)
+    if response is None:
+        response = outcome
+    return failure_reason(outcome) is None or getattr(response, 'status_code', None) == 429
+
+
+def drop(frontier, url, outcome):
+    """Give up a URL the server refuses (4xx), otherwise count a failed try"""
+    response = getattr(outcome, 'response', None)
+    if response is None:
+        response = outcome
+    status = getattr(response, 'status_code', None)
+    if status and 400 <= status < 500:
+        frontier.give_up(url)
+    else:
+        frontier.retry(url)
+
+
+def read_listing(source, frontier, url, page, stop_at_seen, deadline):
+    """
+    Fetch one listing page and queue its new articles and the page after it.
+    Returns False when the host or the time budget failed, to stop the run.
+    """
+    print(f"\n📄 Listing page {page}: {url}")
+    try:
+        response = http_transport.get(url, headers=source.headers, timeout=15, html_only=True, deadline=deadline)
+        response.raise_for_status()
+    except Exception as e:
+        print(f"  ❌ Error: {e}")
+        if transient(e):
+            return False
+        drop(frontier, url, e)
+        return True
+    soup = http_transport.parse_html(response)
+    links = [link for link in source.listing_links(soup, url) if not pagination.PAGE_LINK.search(link)]
+    queued = sum(1 for link in links if link not in source.scraped_urls and frontier.add(link, ARTICLE, page))
+    print(f"  Found {len(links)} articles, {queued} new")
+
+    next_url = pagination.find_next_page(soup, url, page)
+    if not links:
+        print("  ⏹️  No articles on this page, the listing ends here")
+    elif stop_at_seen and not pagination.has_unseen(links, source.scraped_urls):
+        print("  ⏹️  Every article here is already scraped, stopping")
+    elif not next_url:
+        print("  ⏹️  No next page, the listing ends here")
+    elif frontier.add(next_url, LISTING, page + 1):
+        print(f"  ➡️  Next: {next_url}")
+    frontier.done(url)
+    return True
+
+
+def read_articles(source, frontier, rows, deadline):
+    """
+    Download a batch of articles concurrently and save them one by one.
+    Returns (new posts, False when the host or the time budget failed).
+    """
+    urls = [url for url, _, _ in rows]
+    responses = fetch_all(urls, headers=source.headers, timeout=10, deadline=deadline)
+    saved = 0
+    healthy = True
+    for url in urls:
+        if url in source.scraped_urls:
+            frontier.done(url)
+            continue
+        response = responses.get(url)
+        print(f"\n🔗 {url}")
+        if transient(response):
+            print(f"  ⏸️  Not fetched ({response}), left for the next run")
+            healthy = False
+            continue
+        outcome = source.process(url, response)
+        if outcome is None:
+            drop(frontier, url, response)
+            continue
+        if outcome == 'duplicate':
+            print("  ⚠️  Duplicate content")
+        saved += outcome == 'saved'
+        # The post file and the scraper's state are on disk before the frontier moves on
+        source.save()
+        frontier.done(url)
+        frontier.checkpoint()
+    return saved, healthy
+
+
+def backfill(script, max_pages=MAX_PAGES, hours=MAX_HOURS, stop_at_seen=False, reset=False):
+    """Walk one source's listings until they end, max_pages pages were read or time runs out"""
+    module = load_source(script)
+    source = SOURCES[script](module)
+    frontier = Frontier(source.name)
+    deadline = Deadline(hours * 3600, source.name)
+    if reset:
+        frontier.reset()
+    if not frontier.counts():
+        for url in source.start_urls:
+            frontier.add(url, LISTING, 1)
+        frontier.checkpoint()
+    else:
+        print(f"♻️  Resuming: {frontier.counts()}")
+
+    pages = saved = 0
+    try:
+        while not deadline.expired():
+            rows = frontier.next_batch()
+            if not rows:
+                print("\n✅ Backfill complete")
+                break
+            url, kind, page = rows[0]
+            if kind == LISTING:
+                # The articles already queued are finished first, so the next run starts on a listing page
+                if pages >= max_pages:
+                    print(f"\n⏸️  Read {max_pages} listing pages, run again to continue")
+                    break
+                healthy = read_listing(source, frontier, url, page, stop_at_seen, deadline)
+                if healthy:
+                    pages += 1
+            else:
+                batch_saved, healthy = read_articles(source, frontier, rows, deadline)
+                saved += batch_saved
+            frontier.checkpoint()
+            # Responses and soups of this page are not needed again; a backfill runs for hours
+            http_transport.clear_memo()
+            if not healthy:
+                if deadline.expired():
+                    print("\n⏰ Time budget used up, run again to continue")
+                else:
+                    print("\n⏸️  The site is not answering, run again later to continue")
+                break
+        else:
+            print("\n⏰ Time budget used up, run again to continue")
+    finally:
+        source.save()
+        frontier.close()
+        http_transport.save_validators()
+
+    print(f"\n📊 {source.name}: {pages} listing pages, {saved} new posts")
+    return saved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill a source from its paginated listings")
+    parser.add_argument('script', choices=sorted(SOURCES))
+    parser.add_argument('--max-pages', type=int, default=MAX_PAGES, help="listing pages to read in this run")
+    parser.add_argument('--hours', type=float, default=MAX_HOURS, help="time budget of this run")
+    parser.add_argument('--stop-at-seen', action='store_true',
+                        help="stop at the first listing page that is entirely scraped already (outage recovery)")
+    parser.add_argument('--reset', action='store_true', help="forget the saved frontier and start from page 1")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"📚 Backfill: {args.script}")
+    print("=" * 60)
+    try:
+        backfill(args.script, args.max_pages, args.hours, args.stop_at_seen, args.reset)
+    except KeyboardInterrupt:
+        print("\n🛑 Interrupted, the frontier is saved; run again to resume")
+        return 130
+    http_transport.print_stats()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
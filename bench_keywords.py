@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark the compiled keyword matchers against the old `any(word in
+text.lower() ...)` loops on real homepages
+Usage: python bench_keywords.py [saved.html ...]
+Without arguments the source homepages are fetched live.
+"""
+
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+import http_transport
+from keywords import Matcher, fold
+
+# The listing pages the scrapers read
+HOMEPAGES = [
+    "https://www.radiobihac.com",
+    "https://www.vodovod-bihac.ba/",
+    "https://www.rtvusk.ba/kategorija/kanton-krajina/2",
+    "https://kcbihac.ba/novosti.php",
+    "https://www.kbbihac.ba/novosti",
+]
+# The lists the scrapers matched with loops, by what they are tested against
+WORD_LISTS = {
+    'announcement words (links)': ['obavijest', 'obavjest', 'vijest', 'novost', 'aktuelno', 'aktualno', 'news',
+                                   'announcement', 'prekidi', 'planirani', 'održavanje', 'servis'],
+    'non-news words (links)': ['emisija', 'program', 'kontakt', 'o nama'],
+    'boilerplate words (paragraphs)': ['menu', 'home', 'contact', 'copyright', 'privacy', 'terms', 'cookie',
+                                       'facebook', 'twitter', 'instagram', 'linkedin', 'youtube',
+                                       'search', 'login', 'register', 'subscribe'],
+}
+REPEATS = 20
+
+
+def page_texts(html):
+    """Link texts, hrefs and paragraph texts of a page, as the scrapers see them"""
+    soup = BeautifulSoup(html, 'html.parser')
+    links = []
+    for a in soup.find_all('a', href=True):
+        links.extend([a.get_text(strip=True), a['href']])
+    paragraphs = [p.get_text(strip=True) for p in soup.find_all(['p', 'div'])]
+    return links, paragraphs
+
+
+def timed(function, texts):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        hits = [function(text) for text in texts]
+    return (time.perf_counter() - start) / REPEATS, hits
+
+
+def main():
+    pages = {}
+    if len(sys.argv) > 1:
+        for path in sys.argv[1:]:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                pages[path] = f.read()
+    else:
+        for url in HOMEPAGES:
+            try:
+                pages[url] = http_transport.get(url, timeout=15).text
+            except Exception as e:
+                print(f"⚠️  Could not fetch {url}: {e}")
+
+    total_loop = total_matcher = 0.0
+    for name, html in pages.items():
+        links, paragraphs = page_texts(html)
+        print(f"\n📄 {name}: {len(links) // 2} links, {len(paragraphs)} paragraphs")
+        for label, words in WORD_LISTS.items():
+            texts = paragraphs if 'paragraphs' in label else links
+            matcher = Matcher(words)
+            loop_time, loop_hits = timed(lambda text: any(word in text.lower() for word in words), texts)
+            matcher_time, matcher_hits = timed(matcher.search, texts)
+            # The matcher also ignores diacritics, so it may find more, never less
+            folded_time, _ = timed(lambda text: any(word in fold(text) for word in words), texts)
+            extra = sum(1 for old, new in zip(loop_hits, matcher_hits) if new and not old)
+            missed = sum(1 for old, new in zip(loop_hits, matcher_hits) if old and not new)
+            total_loop += loop_time
+            total_matcher += matcher_time
+            print(f"  {label:32} loop {loop_time * 1000:7.2f} ms | folded loop {folded_time * 1000:7.2f} ms"
+                  f" | matcher {matcher_time * 1000:7.2f} ms ({loop_time / matcher_time:4.1f}x)"
+                  f" | hits {sum(loop_hits)} -> {sum(matcher_hits)} (+{extra}, -{missed})")
+
+    if total_matcher:
+        print(f"\n⏱️  All pages: loops {total_loop * 1000:.1f} ms, matchers {total_matcher * 1000:.1f} ms"
+              f" ({total_loop / total_matcher:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,4 @@
 #!/usr/bin/env python3
-import requests
 import hashlib
 import json
 import os
@@ -7,7 +6,15 @@ import sys
 import re
 from datetime import datetime
 from urllib.parse import urljoin
-from bs4 import BeautifulSoup
+
+import feeds
+import http_transport
+import sitemaps
+from failure_ledger import FailureLedger, failure_reason
+from deadline import source_deadline
+from head_index import HeadIndex
+from keywords import Matcher
+from urls import LinkSet
 
 class BihacOrgScraper:
     def __init__(self):
@@ -24,9 +31,22 @@ class BihacOrgScraper:
         }
         
         # State tracking
-        self.scraped_urls = set()
+        self.scraped_urls = LinkSet()
         self.content_hashes = set()
         self.new_posts = []
+        self.failures = FailureLedger(self.script_name)
+        self.heads = HeadIndex(self.script_name)
+        # Read only the <head> of new pages first and skip the full download of known articles
+        self.head_check = True
+        # Paragraphs with these are navigation, footers and share bars, not article text
+        self.boilerplate_words = Matcher(['menu', 'home', 'contact', 'copyright', 'privacy', 'terms', 'cookie',
+                                          'facebook', 'twitter', 'instagram', 'linkedin', 'youtube',
+                                          'search', 'login', 'register', 'subscribe'])
+        # Take every article changed since the last run from the sitemaps (by <lastmod>)
+        self.use_sitemap = True
+        self.sitemap_url_pattern = r'/obavijesti/|/javni-pozivi/'
+        self.last_error = None
+        self.deadline = None
         
         # Create directories
         os.makedirs(self.output_dir, exist_ok=True)
@@ -35,10 +55,12 @@ class BihacOrgScraper:
         self.load_state()
         
         # Setup session
-        self.session = requests.Session()
+        self.session = http_transport.Client()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
         })
+        # All pages come from one host: multiplex them over a single HTTP/2 connection
+        http_transport.enable_http2(self.base_url)
     
     def get_script_hash(self):
         """Get script hash"""
@@ -55,13 +77,13 @@ class BihacOrgScraper:
                 with open(self.state_file, 'r', encoding='utf-8') as f:
                     state = json.load(f)
                     
-                    self.scraped_urls = set(state.get('scraped_urls', []))
+                    self.scraped_urls = LinkSet(state.get('scraped_urls', []))
                     self.content_hashes = set(state.get('content_hashes', []))
                     
                     print(f"📁 Loaded state: {len(self.scraped_urls)} URLs, {len(self.content_hashes)} hashes")
             except Exception as e:
                 print(f"⚠️  Error loading state: {e}")
-                self.scraped_urls = set()
+                self.scraped_urls = LinkSet()
                 self.content_hashes = set()
         else:
             print("📁 No state file found, starting fresh")
@@ -79,6 +101,9 @@ class BihacOrgScraper:
         try:
             with open(self.state_file, 'w', encoding='utf-8') as f:
                 json.dump(state, f, ensure_ascii=False, indent=2)
+            http_transport.save_validators()
+            self.failures.save()
+            self.heads.save()
             print(f"\n💾 State saved to {self.state_file}")
         except Exception as e:
             print(f"❌ Error saving state: {e}")
@@ -97,19 +122,36 @@ class BihacOrgScraper:
         print("=" * 60)
     
     def fetch_page(self, url):
-        """Fetch webpage"""
+        """Fetch and parse webpage"""
+        self.last_error = None
+        try:
+            resp = self.session.get(url, timeout=15, html_only=True)
+            resp.raise_for_status()
+            return http_transport.parse_html(resp)
+        except http_transport.SkippedRequest as e:
+            self.last_error = e
+            return None
+        except Exception as e:
+            self.last_error = e
+            print(f"  ❌ Error: {e}")
+            return None
+    
+    def fetch_listing(self, url):
+        """Fetch and parse a listing page, revalidating it against the last run"""
         try:
-            resp = self.session.get(url, timeout=15)
+            resp = self.session.get_conditional(url, timeout=15)
             resp.raise_for_status()
-            return resp.text
+            if resp.status_code == 304:
+                print(f"  ⏸️  Not modified since last run, skipping")
+                return None
+            return http_transport.parse_html(resp)
         except Exception as e:
             print(f"  ❌ Error: {e}")
             return None
     
-    def find_article_links(self, html, category_url):
+    def find_article_links(self, soup, category_url):
         """Find article links on page"""
-        soup = BeautifulSoup(html, 'html.parser')
-        article_urls = []
+        article_urls = LinkSet()
         
         # Look for article links - adjust selectors for bihac.org
         selectors = [
@@ -131,12 +173,11 @@ class BihacOrgScraper:
                 href = link.get('href')
                 if href:
                     full_url = urljoin(category_url, href)
-                    if (self.base_url in full_url and 
-                        full_url not in article_urls and
+                    if (self.base_url in full_url and
                         not any(ext in full_url.lower() for ext in ['.jpg', '.png', '.pdf', '.zip', '.doc'])):
-                        article_urls.append(full_url)
+                        article_urls.add(full_url)
         
-        return list(set(article_urls))[:20]  # Increased limit
+        return list(article_urls)[:20]  # Increased limit
     
     def extract_image_url(self, soup, url):
         """Extract main image from article"""
@@ -173,9 +214,8 @@ class BihacOrgScraper:
         # Default fallback
         return "https://www.bihac.org/images/logo.png"
     
-    def parse_article(self, url, html, category):
+    def parse_article(self, url, soup, category):
         """Parse article and return data in required JSON format"""
-        soup = BeautifulSoup(html, 'html.parser')
         
         # 1. Title
         title = "Obavijest"
@@ -276,10 +316,7 @@ class BihacOrgScraper:
                 text = p.get_text(strip=True)
                 # Better filtering
                 if (len(text) > 30 and 
-                    not any(word in text.lower() for word in
-                           ['menu', 'home', 'contact', 'copyright', 'privacy', 'terms', 'cookie',
-                            'facebook', 'twitter', 'instagram', 'linkedin', 'youtube',
-                            'search', 'login', 'register', 'subscribe'])):
+                    not self.boilerplate_words.search(text)):
                     text_parts.append(text)
             
             if text_parts:
@@ -369,24 +406,44 @@ class BihacOrgScraper:
     def run(self):
         """Main execution"""
         self.print_header()
+        self.deadline = source_deadline(self.script_name)
+        self.session.deadline = self.deadline
         
         print(f"Scraping Bihać.org categories...")
         
         all_new_urls = []
         
-        # Process each category
-        for category_name, category_url in self.urls.items():
+        # Sitemaps list every changed article of the categories, not just their first page
+        sitemap_urls = None
+        if self.use_sitemap:
+            sitemap_urls = sitemaps.sitemap_links(self.script_name, self.base_url, self.sitemap_url_pattern,
+                                                  headers=self.session.headers, deadline=self.deadline)
+        if sitemap_urls is not None:
+            all_new_urls = [url for url in sitemap_urls if url not in self.scraped_urls]
+            print(f"  New articles: {len(all_new_urls)}")
+        
+        # Process each category, unless the sitemaps already listed everything
+        categories = self.urls.items() if sitemap_urls is None else []
+        for category_name, category_url in categories:
+            if self.deadline.expired():
+                print("\n⏰ Time budget used up, skipping the remaining pages")
+                break
             print(f"\n📂 Category: {category_name.replace('_', ' ').title()}")
             print(f"   URL: {category_url}")
             
-            # Fetch category page
-            category_html = self.fetch_page(category_url)
-            if not category_html:
-                print(f"  ❌ Failed to fetch category page")
+            # The category's feed, when it has one, replaces parsing the page
+            found, article_urls = feeds.feed_links(self.script_name, category_url,
+                                                   headers=self.session.headers, deadline=self.deadline)
+            if not found:
+                # Fetch category page
+                category_soup = self.fetch_listing(category_url)
+                if not category_soup:
+                    continue
+                
+                # Find article links
+                article_urls = self.find_article_links(category_soup, category_url)
+            if article_urls is None:
                 continue
-            
-            # Find article links
-            article_urls = self.find_article_links(category_html, category_url)
             print(f"  Found {len(article_urls)} articles")
             
             # Filter out already scraped URLs
@@ -399,37 +456,64 @@ class BihacOrgScraper:
             all_new_urls.extend(new_urls)
         
         # Remove duplicates
-        all_new_urls = list(set(all_new_urls))
+        all_new_urls = list(LinkSet(all_new_urls))
         
         if not all_new_urls:
             print("\n✅ No new articles found.")
+            sitemaps.commit(self.script_name)
             self.save_state()
             return
         
         print(f"\n📊 Total unique new articles to process: {len(all_new_urls)}")
         print(f"\nProcessing articles...\n")
         
+        # Known articles are recognised from their <head>, before the full download
+        head_duplicates = {}
+        if self.head_check:
+            pending = [u for u in all_new_urls if not self.failures.should_skip(u)]
+            head_duplicates = self.heads.check(pending, self.scraped_urls, headers=self.session.headers,
+                                               deadline=self.deadline)
+        
         for i, url in enumerate(all_new_urls, 1):
+            # Out of time: stop here, what was scraped so far is still saved below
+            if self.deadline.expired():
+                print(f"\n⏰ Time budget used up, stopping with partial results")
+                break
+            
             # Determine category from URL using improved function
             category = self.get_category_from_url(url)
             
             print(f"[{i}/{len(all_new_urls)}] Checking: {url}")
             print(f"  Category: {category.replace('_', ' ').title()}")
             
+            # Failed on an earlier run and not due for another try yet
+            if self.failures.should_skip(url):
+                print(f"  ⏳ Skipping, {self.failures.describe(url)}")
+                continue
+            
+            # Already have this article under another URL or with the same title and date
+            if url in head_duplicates:
+                print(f"  ⚠️  Duplicate, {head_duplicates[url]}")
+                self.scraped_urls.add(url)
+                continue
+            
             # Fetch article
-            article_html = self.fetch_page(url)
-            if not article_html:
+            article_soup = self.fetch_page(url)
+            if not article_soup:
                 print(f"  ❌ Failed to fetch")
+                self.failures.record_failure(url, failure_reason(self.last_error))
                 continue
+            self.failures.record_success(url)
             
             # Parse article
-            post_data = self.parse_article(url, article_html, category)
+            post_data = self.parse_article(url, article_soup, category)
             
             # Check for duplicate content
             if post_data['content_hash'] in self.content_hashes:
                 print(f"  ⚠️  Duplicate content (hash: {post_data['content_hash']})")
                 # Still add URL to scraped list
                 self.scraped_urls.add(url)
+                self.heads.add(url)
                 continue
             
             # Save to facebook_ready_posts
@@ -438,6 +522,7 @@ class BihacOrgScraper:
             # Update state
             self.scraped_urls.add(url)
             self.content_hashes.add(post_data['content_hash'])
+            self.heads.add(url)
             self.new_posts.append((filename, post_data))
             
             print(f"  ✅ Saved: {filename}")
@@ -446,6 +531,14 @@ class BihacOrgScraper:
             print(f"    Content length: {len(post_data['content'])} chars")
             print(f"    Content hash: {post_data['content_hash']}\n")
         
+        unhandled = [u for u in all_new_urls if u not in self.scraped_urls and not self.failures.recorded(u)]
+        # A listing only counts as read once all its links were handled; otherwise the next run reads it again
+        if unhandled:
+            listings = list(self.urls.values())
+            http_transport.discard_validators(listings + [feeds.known_feed(self.script_name, u) for u in listings])
+        # The sitemap high-water mark stops short of any URL it gave us that was not handled
+        sitemaps.commit(self.script_name, unhandled)
+        
         # Print summary
         print("=" * 60)
         print("Scraping completed!")
@@ -465,6 +558,7 @@ class BihacOrgScraper:
                 if len(post['content']) < 100:
                     print(f"    ⚠️  Warning: Very short content!")
         
+        http_transport.print_stats()
         print(f"\n✅ Check the 'facebook_ready_posts' directory for JSON files.")
         
         # Save state
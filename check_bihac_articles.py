@@ -3,13 +3,14 @@
 Check if Oslobođenje has any Bihać articles at all
 """
 
-import requests
 from bs4 import BeautifulSoup
 import re
 
+import http_transport
+
 BASE_URL = "https://www.oslobodjenje.ba"
 
-session = requests.Session()
+session = http_transport.Client()
 session.headers.update({
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
 })
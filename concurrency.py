@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Adaptive per-host concurrency and timeouts
+An AIMD controller per host: parallelism grows by one while latency stays
+flat and halves as soon as p95 latency climbs or the host starts failing.
+The same latency window gives each host a timeout that fits it
+"""
+
+import threading
+from collections import deque
+
+# Configuration
+INITIAL_LIMIT = 2           # parallel requests per host before anything is known
+MIN_LIMIT = 1
+MAX_LIMIT = 8
+WINDOW = 50                 # latency samples kept per host
+MIN_SAMPLES = 8             # below this the controller and timeouts do not act
+LATENCY_TOLERANCE = 1.5     # p95 above baseline * this counts as "rising"
+DECREASE_FACTOR = 0.5
+TIMEOUT_FACTOR = 4          # adaptive timeout = p95 * this ...
+MIN_TIMEOUT = 3             # ... but never below this many seconds
+
+_hosts = {}
+_lock = threading.Lock()
+
+
+def _p95(samples):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+class HostController:
+    """Latency window and AIMD concurrency limit for one host"""
+
+    def __init__(self):
+        self.limit = float(INITIAL_LIMIT)
+        self.samples = deque(maxlen=WINDOW)
+        self.baseline = None        # lowest p95 seen, the host's "flat" latency
+        self.since_change = 0       # completions since the limit last moved
+        self.since_decrease = WINDOW    # completions since the last decrease
+
+    def observe(self, seconds, ok):
+        self.since_change += 1
+        self.since_decrease += 1
+        if not ok:
+            self._decrease()
+            return
+        self.samples.append(seconds)
+        if len(self.samples) < MIN_SAMPLES:
+            return
+        p95 = _p95(self.samples)
+        if self.baseline is None or p95 < self.baseline:
+            self.baseline = p95
+        if p95 > self.baseline * LATENCY_TOLERANCE:
+            self._decrease()
+        elif self.since_change >= self.limit:
+            # One step up per round of `limit` requests that stayed flat
+            self.limit = min(MAX_LIMIT, self.limit + 1)
+            self.since_change = 0
+
+    def _decrease(self):
+        # Requests already in flight report the same trouble; react once per round
+        if self.since_decrease < self.limit:
+            return
+        self.limit = max(MIN_LIMIT, self.limit * DECREASE_FACTOR)
+        self.since_change = 0
+        self.since_decrease = 0
+        # Let the baseline follow a host that has become slower for good
+        if self.samples:
+            self.baseline = max(self.baseline or 0, _p95(self.samples) / LATENCY_TOLERANCE)
+
+
+def _controller(host):
+    controller = _hosts.get(host)
+    if controller is None:
+        controller = _hosts[host] = HostController()
+    return controller
+
+
+def observe(host, seconds, ok):
+    """Report one finished request: time to response headers, and whether it succeeded"""
+    with _lock:
+        _controller(host).observe(seconds, ok)
+
+
+def limit(host):
+    """Parallel requests currently allowed against a host"""
+    with _lock:
+        return int(_controller(host).limit)
+
+
+def timeout(host, default):
+    """Request timeout for a host: a multiple of its p95 latency, capped by `default`"""
+    with _lock:
+        samples = list(_controller(host).samples)
+    if len(samples) < MIN_SAMPLES:
+        return default
+    return min(default, max(MIN_TIMEOUT, _p95(samples) * TIMEOUT_FACTOR))
+
+
+def snapshot():
+    """Current limit and p95 latency per host, for the stats printout"""
+    with _lock:
+        hosts = {host: (c.limit, list(c.samples)) for host, c in _hosts.items()}
+    return {host: {'limit': int(lim), 'p95': _p95(samples) if samples else None}
+            for host, (lim, samples) in hosts.items()}
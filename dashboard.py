@@ -15,6 +15,10 @@ import bcrypt
 from datetime import datetime
 from functools import wraps
 from flask import Flask, render_template, jsonify, redirect, url_for, request, session
+from markupsafe import escape
+
+import http_transport
+import failure_ledger
 
 print(f"DEBUG: Starting dashboard.py with Python: {sys.executable}")
 
@@ -296,25 +300,26 @@ def get_articles():
     return articles
 
 def run_curl_command(json_file_path):
-    """Run curl command to post to Facebook"""
+    """Post a JSON file to the Facebook webhook over the shared HTTP transport"""
     try:
-        cmd = [
-            'curl', '-X', 'POST',
-            '-H', 'Content-Type: application/json',
-            '-d', f'@{json_file_path}',
-            WEBHOOK_URL,
-            '--max-time', '30'
-        ]
+        with open(json_file_path, 'rb') as f:
+            payload = f.read()
         
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=35)
+        response = http_transport.post(
+            WEBHOOK_URL,
+            data=payload,
+            headers={'Content-Type': 'application/json'},
+            timeout=30,
+            polite=False  # a webhook call, not a crawl
+        )
         
         return {
-            'success': result.returncode == 0,
-            'stdout': result.stdout,
-            'stderr': result.stderr
+            'success': response.ok,
+            'stdout': response.text,
+            'stderr': '' if response.ok else f"HTTP {response.status_code}: {response.text[:200]}"
         }
     except Exception as e:
-        return {'success': False, 'error': str(e)}
+        return {'success': False, 'error': str(e), 'stderr': str(e)}
 
 @app.route('/health')
 def health():
@@ -445,6 +450,7 @@ def index():
                     <a href="/run-scrapers" class="btn btn-run">🤖 Run Scrapers</a>
                     <a href="/list" class="btn">📋 List View</a>
                     <a href="/view-logs" class="btn">📊 View Logs</a>
+                    <a href="/failures" class="btn">🚫 Failed URLs</a>
                     <a href="/logout" class="btn btn-logout">🚪 Logout</a>
                 </div>
             </div>
@@ -869,6 +875,76 @@ def view_logs():
     
     return html
 
+@app.route('/failures')
+@login_required
+def view_failures():
+    """View article URLs the scrapers are backing off from"""
+    client_ip = get_client_ip()
+    username = session.get('username', 'UNKNOWN')
+    
+    log_activity(client_ip, username, "VIEWED_FAILURES")
+    
+    ledger = failure_ledger.load_all()
+    total = sum(len(entries) for entries in ledger.values())
+    
+    html = f'''
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Failed URLs</title>
+        <style>
+            body {{ font-family: Arial, sans-serif; margin: 20px; background: #f5f5f5; }}
+            .header {{ background: white; padding: 20px; border-radius: 10px; margin-bottom: 20px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }}
+            .source {{ background: white; padding: 20px; margin-bottom: 20px; border-radius: 10px; }}
+            table {{ width: 100%; border-collapse: collapse; font-size: 13px; }}
+            th, td {{ text-align: left; padding: 6px; border-bottom: 1px solid #eee; vertical-align: top; }}
+            td.url {{ word-break: break-all; }}
+            .btn {{ 
+                padding: 8px 16px; 
+                border-radius: 4px; 
+                text-decoration: none; 
+                display: inline-block;
+                font-size: 14px;
+                background: #607d8b; 
+                color: white; 
+            }}
+        </style>
+    </head>
+    <body>
+        <div class="header">
+            <h1>🚫 Failed URLs ({total})</h1>
+            <p>Article pages that could not be scraped. Each failure doubles the wait before the next try.</p>
+            <p><a href="/" class="btn">← Back to Dashboard</a></p>
+        </div>
+    '''
+    
+    if not ledger:
+        html += '<div class="source"><p>✅ No failed URLs.</p></div>'
+    
+    for source, entries in sorted(ledger.items()):
+        html += f'''
+        <div class="source">
+            <h2>{escape(source)} ({len(entries)})</h2>
+            <table>
+                <tr><th>URL</th><th>Reason</th><th>Failures</th><th>Last failed</th><th>Next try</th></tr>
+        '''
+        for url, entry in sorted(entries.items(), key=lambda item: item[1]['next_retry']):
+            # URLs and reasons come from crawled pages
+            url, reason = escape(url), escape(entry['reason'])
+            html += f'''
+                <tr>
+                    <td class="url"><a href="{url}" target="_blank" rel="noopener">{url}</a></td>
+                    <td>{reason}</td>
+                    <td>{entry['count']}</td>
+                    <td>{entry['last_failed'][:16].replace('T', ' ')}</td>
+                    <td>{entry['next_retry'][:16].replace('T', ' ')}</td>
+                </tr>
+            '''
+        html += '</table></div>'
+    
+    html += '</body></html>'
+    return html
+
 @app.route('/refresh')
 @login_required
 def refresh():
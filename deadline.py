@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Time budgets for scraper runs
+run_all_scrapers.sh exports when the whole run has to be over; every source
+gets its own slice of that, and its fetches and sleeps are cut to fit
+"""
+
+import os
+import time
+
+# Unix time by which the whole run must be done, exported by run_all_scrapers.sh
+RUN_DEADLINE_ENV = "SCRAPER_RUN_DEADLINE"
+SOURCE_BUDGET = 120         # seconds one source may take
+MIN_REQUEST_TIMEOUT = 2     # a request with less time than this is not started
+
+
+class Deadline:
+    """A point in time a piece of work has to be finished by"""
+
+    def __init__(self, seconds, name=""):
+        self.name = name
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        """Seconds left, never negative"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        """True once there is not enough time left to start another request"""
+        return self.remaining() < MIN_REQUEST_TIMEOUT
+
+    def timeout(self, default):
+        """Request timeout: the usual one, shortened as the budget drains"""
+        return max(MIN_REQUEST_TIMEOUT, min(default, self.remaining()))
+
+    def sleep(self, seconds):
+        """Sleep, but never past the deadline"""
+        time.sleep(min(seconds, self.remaining()))
+
+    def child(self, seconds, name=""):
+        """A shorter deadline that still ends no later than this one"""
+        return Deadline(min(seconds, self.remaining()), name)
+
+
+def source_deadline(name, budget=SOURCE_BUDGET):
+    """Deadline for one source: its own budget, capped by the run deadline"""
+    seconds = budget
+    run_end = os.environ.get(RUN_DEADLINE_ENV)
+    if run_end:
+        try:
+            seconds = min(seconds, float(run_end) - time.time())
+        except ValueError:
+            pass
+    deadline = Deadline(max(0, seconds), name)
+    print(f"⏱️  Time budget for {name}: {deadline.remaining():.0f}s")
+    return deadline
@@ -3,17 +3,18 @@
 Debug script to check for API endpoints in Oslobođenje search
 """
 
-import requests
 from bs4 import BeautifulSoup
 from urllib.parse import quote, urljoin
 import json
 import re
 
+import http_transport
+
 SEARCH_URL = "https://www.oslobodjenje.ba/pretraga/"
 SEARCH_TERM = "bihac"
 
 # Create session
-session = requests.Session()
+session = http_transport.Client()
 session.headers.update({
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
 })
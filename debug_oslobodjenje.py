@@ -3,16 +3,17 @@
 Debug script to check Oslobođenje search page structure
 """
 
-import requests
 from bs4 import BeautifulSoup
 from urllib.parse import quote
 import json
 
+import http_transport
+
 SEARCH_URL = "https://www.oslobodjenje.ba/pretraga/"
 SEARCH_TERM = "bihac"
 
 # Create session with headers
-session = requests.Session()
+session = http_transport.Client()
 session.headers.update({
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
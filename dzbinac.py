@@ -3,17 +3,23 @@
 DžBihac News Scraper - IMPROVED VERSION with better title extraction
 """
 
-import requests
-from bs4 import BeautifulSoup
 import json
 import os
 import hashlib
 from datetime import datetime
 import re
 from urllib.parse import urljoin
-import time
 import sys
 
+import feeds
+import http_transport
+import rate_limit
+from async_fetch import fetch, fetch_all
+from failure_ledger import FailureLedger, failure_reason
+from deadline import source_deadline
+from head_index import HeadIndex
+from urls import LinkSet
+
 # Configuration
 BASE_URL = "https://www.dzbihac.com/index.php/bs/medija-centar/novosti/oglasi"
 OUTPUT_DIR = "facebook_ready_posts"
@@ -22,6 +28,19 @@ HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
 }
 
+# Fetch article pages concurrently instead of one by one
+ASYNC_FETCH = True
+MAX_CONCURRENCY_PER_HOST = 4
+
+# Read only the <head> of new pages first and skip the full download of
+# articles we already have (same canonical URL, or same title and date)
+HEAD_CHECK = True
+
+# Politeness towards the host: sustained requests per second and burst size.
+# robots.txt Crawl-delay and Retry-After can only slow this down.
+RATE_PER_SECOND = 1.0
+RATE_BURST = 4
+
 # Get script name hash for file naming
 SCRIPT_NAME = os.path.basename(sys.argv[0])
 SCRIPT_NAME_HASH = hashlib.md5(SCRIPT_NAME.encode()).hexdigest()[:12]
@@ -42,8 +61,8 @@ def load_scraped_data():
     if os.path.exists(STATE_FILE):
         with open(STATE_FILE, 'r') as f:
             data = json.load(f)
-            return set(data.get('scraped_urls', [])), set(data.get('content_hashes', []))
-    return set(), set()
+            return LinkSet(data.get('scraped_urls', [])), set(data.get('content_hashes', []))
+    return LinkSet(), set()
 
 def save_scraped_data(scraped_urls, content_hashes):
     """Save scraped data to state file"""
@@ -56,6 +75,7 @@ def save_scraped_data(scraped_urls, content_hashes):
     }
     with open(STATE_FILE, 'w') as f:
         json.dump(state, f, indent=2, ensure_ascii=False)
+    http_transport.save_validators()
 
 def clean_text(text):
     """Clean and normalize text"""
@@ -66,14 +86,17 @@ def clean_text(text):
     text = re.sub(r'\s+', ' ', text)
     return text.strip()
 
-def extract_news_details(news_url):
+def extract_news_details(news_url, response=None, deadline=None):
     """Extract full details from a news article page - IMPROVED for dzbihac.com"""
     try:
         print(f"  Fetching: {news_url}")
-        response = requests.get(news_url, headers=HEADERS, timeout=10)
+        if response is None:
+            response = http_transport.get(news_url, headers=HEADERS, timeout=10, html_only=True, deadline=deadline)
+        elif isinstance(response, Exception):
+            raise response
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = http_transport.parse_html(response)
         
         # IMPROVED TITLE EXTRACTION for dzbihac.com
         title = "No Title"
@@ -223,6 +246,9 @@ def extract_news_details(news_url):
             'image_url': image_url
         }
         
+    except http_transport.SkippedRequest:
+        # Non-HTML page or unreachable host, already reported by the transport
+        return None
     except Exception as e:
         print(f"  Error extracting details: {e}")
         return None
@@ -265,14 +291,22 @@ def format_for_facebook(news_data):
     
     return fb_post, post_id, content_hash
 
-def scrape_news_links():
+def scrape_news_links(deadline=None):
     """Scrape the main page for news links"""
+    # The site's feed, when it has one, replaces the listing page heuristics below
+    found, feed_urls = feeds.feed_links(SCRIPT_NAME, BASE_URL, headers=HEADERS, deadline=deadline)
+    if found:
+        return feed_urls
+    
     try:
-        response = requests.get(BASE_URL, headers=HEADERS, timeout=15)
+        response = http_transport.get_conditional(BASE_URL, headers=HEADERS, timeout=15, deadline=deadline)
         response.raise_for_status()
+        if response.status_code == 304:
+            print("⏸️  Listing page not modified since last run, skipping")
+            return None
         
-        soup = BeautifulSoup(response.content, 'html.parser')
-        news_links = []
+        soup = http_transport.parse_html(response)
+        news_links = LinkSet()
         
         print(f"Looking for news links on: {BASE_URL}")
         
@@ -291,9 +325,7 @@ def scrape_news_links():
                 for link in links:
                     href = link.get('href')
                     if href:
-                        full_url = urljoin(BASE_URL, href)
-                        if full_url not in news_links:
-                            news_links.append(full_url)
+                        news_links.add(urljoin(BASE_URL, href))
         
         # If no sections found, find all article links
         if not news_links:
@@ -302,17 +334,10 @@ def scrape_news_links():
             for link in article_links:
                 href = link.get('href')
                 if href:
-                    full_url = urljoin(BASE_URL, href)
-                    if full_url not in news_links:
-                        news_links.append(full_url)
-        
-        # Remove duplicates and limit
-        unique_links = []
-        seen = set()
-        for link in news_links:
-            if link not in seen:
-                seen.add(link)
-                unique_links.append(link)
+                    news_links.add(urljoin(BASE_URL, href))
+        
+        # Already one entry per page; just limit
+        unique_links = list(news_links)
         
         print(f"Found {len(unique_links)} unique news links")
         return unique_links[:10]  # Limit to 10
@@ -329,10 +354,18 @@ def scrape_latest_news():
     
     ensure_dirs()
     scraped_urls, content_hashes = load_scraped_data()
+    failures = FailureLedger(SCRIPT_NAME)
+    heads = HeadIndex(SCRIPT_NAME)
+    deadline = source_deadline(SCRIPT_NAME)
+    rate_limit.configure(BASE_URL, RATE_PER_SECOND, RATE_BURST)
     new_posts = []
     
     # Get news links
-    news_links = scrape_news_links()
+    news_links = scrape_news_links(deadline)
+    
+    # Listing page unchanged since the last run
+    if news_links is None:
+        return []
     
     if not news_links:
         print("No news links found!")
@@ -343,7 +376,25 @@ def scrape_latest_news():
     counter = 1
     processed = 0
     
+    # Known articles are recognised from their <head>, before the full download
+    pending = [u for u in news_links if u not in scraped_urls and not failures.should_skip(u)]
+    head_duplicates = {}
+    if HEAD_CHECK:
+        head_duplicates = heads.check(pending, scraped_urls, headers=HEADERS, deadline=deadline)
+    
+    # Download all unseen pages up front; the loop below only parses them
+    prefetched = {}
+    if ASYNC_FETCH:
+        pending = [u for u in pending if u not in head_duplicates]
+        prefetched = fetch_all(pending, headers=HEADERS, timeout=10,
+                               per_host=MAX_CONCURRENCY_PER_HOST, deadline=deadline)
+    
     for news_url in news_links:
+        # Out of time: stop here, what was scraped so far is still saved below
+        if deadline.expired():
+            print(f"\n⏰ Time budget used up, stopping with partial results")
+            break
+        
         processed += 1
         print(f"\n[{processed}/{len(news_links)}] Checking: {news_url}")
         
@@ -352,11 +403,28 @@ def scrape_latest_news():
             print("  ⏩ Already processed")
             continue
         
+        # Failed on an earlier run and not due for another try yet
+        if failures.should_skip(news_url):
+            print(f"  ⏳ Skipping, {failures.describe(news_url)}")
+            continue
+        
+        # Already have this article under another URL or with the same title and date
+        if news_url in head_duplicates:
+            print(f"  ⚠️  Duplicate, {head_duplicates[news_url]}")
+            scraped_urls.add(news_url)
+            continue
+        
         # Extract details
-        news_details = extract_news_details(news_url)
+        # The page as fetched, or the error, so a broken URL can be told apart from a timeout
+        response = prefetched.get(news_url)
+        if response is None:
+            response = fetch(news_url, headers=HEADERS, timeout=10, deadline=deadline)
+        news_details = extract_news_details(news_url, response, deadline)
         if not news_details:
             print("  ❌ Could not extract details")
+            failures.record_failure(news_url, failure_reason(response))
             continue
+        failures.record_success(news_url)
         
         # Format for Facebook
         fb_post, post_id, content_hash = format_for_facebook(news_details)
@@ -365,6 +433,7 @@ def scrape_latest_news():
         if content_hash in content_hashes:
             print(f"  ⚠️  Duplicate content")
             scraped_urls.add(news_url)
+            heads.add(news_url)
             continue
         
         # Save to file
@@ -381,6 +450,7 @@ def scrape_latest_news():
             # Update tracking
             scraped_urls.add(news_url)
             content_hashes.add(content_hash)
+            heads.add(news_url)
             new_posts.append({
                 'filename': filename,
                 'title': news_details['title'],
@@ -393,11 +463,16 @@ def scrape_latest_news():
         except Exception as e:
             print(f"  ❌ Error saving: {e}")
         
-        # Polite delay
-        time.sleep(1)
+    
+    # A listing only counts as read once all its links were handled; otherwise the next run reads it again
+    unhandled = [u for u in news_links if u not in scraped_urls and not failures.recorded(u)]
+    if unhandled:
+        http_transport.discard_validators([BASE_URL, feeds.known_feed(SCRIPT_NAME, BASE_URL)])
     
     # Save state
     save_scraped_data(scraped_urls, content_hashes)
+    failures.save()
+    heads.save()
     
     print(f"\n" + "=" * 60)
     print(f"Scraping completed!")
@@ -428,6 +503,7 @@ def main():
     else:
         print("\nℹ️  No new posts found.")
     
+    http_transport.print_stats()
     print(f"✅ Check the '{OUTPUT_DIR}' directory for JSON files.")
     print("=" * 60)
 
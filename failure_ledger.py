@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Failure ledger for article URLs that could not be scraped
+Every failure pushes the next revisit of a URL further out, so permanently
+broken links stop costing a fetch on every cron run
+"""
+
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+import requests
+
+import http_transport
+
+# Shared by all scrapers, one section per source; lives next to the scripts
+LEDGER_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "failure_ledger.json")
+BASE_REVISIT = timedelta(hours=1)      # wait after the first failure, doubled every time
+MAX_REVISIT = timedelta(days=30)
+FORGET_AFTER = timedelta(days=90)      # entries that stopped failing long ago are dropped
+
+_file_lock = threading.Lock()
+
+
+def failure_reason(outcome):
+    """
+    Describe why a page could not be scraped, or None for transient problems.
+    `outcome` is whatever the fetch produced: a response, an exception or None.
+    Timeouts, connection errors, 5xx answers and a used-up time budget are
+    not the URL's fault, so they are not recorded.
+    """
+    if isinstance(outcome, requests.HTTPError) and outcome.response is not None:
+        outcome = outcome.response
+    if isinstance(outcome, (http_transport.HostUnavailable, http_transport.DeadlineExceeded,
+                            requests.ConnectionError, requests.Timeout)):
+        return None
+    if isinstance(outcome, http_transport.NotHTML):
+        return f"not HTML: {outcome}"
+    if isinstance(outcome, http_transport.BodyTooLarge):
+        return f"too large: {outcome}"
+    if isinstance(outcome, Exception):
+        return f"{type(outcome).__name__}: {outcome}"
+    if isinstance(outcome, requests.Response):
+        if outcome.status_code >= 500:
+            return None
+        if outcome.status_code >= 400:
+            return f"HTTP {outcome.status_code}"
+        return "no usable content"
+    return "could not fetch or parse"
+
+
+def load_all():
+    """Return the whole ledger as {source: {url: entry}}"""
+    try:
+        with open(LEDGER_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+class FailureLedger:
+    """Failed URLs of one source with their reason, count and next revisit"""
+
+    def __init__(self, source):
+        self.source = source
+        self.entries = load_all().get(source, {})
+        self._changed = False
+
+    def should_skip(self, url):
+        """True while a failed URL is still waiting for its next revisit"""
+        entry = self.entries.get(url)
+        if not entry:
+            return False
+        return datetime.now() < datetime.fromisoformat(entry['next_retry'])
+
+    def describe(self, url):
+        """Short human readable status of a failed URL"""
+        entry = self.entries[url]
+        return (f"failed {entry['count']}x ({entry['reason']}), "
+                f"next try after {entry['next_retry'][:16].replace('T', ' ')}")
+
+    def record_failure(self, url, reason):
+        """Count a failure and schedule the next revisit; None reasons are ignored"""
+        if reason is None:
+            return
+        now = datetime.now()
+        entry = self.entries.get(url, {'count': 0, 'first_failed': now.isoformat()})
+        entry['count'] += 1
+        entry['reason'] = reason[:200]
+        entry['last_failed'] = now.isoformat()
+        delay = min(MAX_REVISIT, BASE_REVISIT * 2 ** (entry['count'] - 1))
+        entry['next_retry'] = (now + delay).isoformat()
+        self.entries[url] = entry
+        self._changed = True
+
+    def recorded(self, url):
+        """True when a URL's failure is on record, so it is retried on schedule rather than lost"""
+        return url in self.entries
+
+    def record_success(self, url):
+        """Forget a URL once it has been scraped"""
+        if self.entries.pop(url, None) is not None:
+            self._changed = True
+
+    def save(self):
+        """Write this source's section back, leaving the other sources alone"""
+        cutoff = datetime.now() - FORGET_AFTER
+        for url in [u for u, e in self.entries.items() if datetime.fromisoformat(e['last_failed']) < cutoff]:
+            del self.entries[url]
+            self._changed = True
+        if not self._changed:
+            return
+
+        with _file_lock:
+            ledger = load_all()
+            if self.entries:
+                ledger[self.source] = self.entries
+            else:
+                ledger.pop(self.source, None)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(LEDGER_FILE), suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(ledger, f, indent=2, ensure_ascii=False)
+                os.replace(tmp_path, LEDGER_FILE)
+                self._changed = False
+            except Exception as e:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                print(f"⚠️  Could not save failure ledger: {e}")
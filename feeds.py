@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Feed-first article discovery
+Finds the RSS/Atom feed of each listing page once, remembers it in
+feeds.json and reads new article links from it instead of parsing the
+page. Scrapers keep their HTML heuristics as the fallback when there is
+no feed
+"""
+
+import json
+import os
+import tempfile
+import threading
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
+from urllib.parse import urljoin, urlsplit
+
+import requests
+
+import http_transport
+from urls import LinkSet
+
+# Discovered feeds, per source and listing page; lives next to the scripts
+FEEDS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "feeds.json")
+USE_FEEDS = True
+REDISCOVER_AFTER = timedelta(days=7)    # look again this long after finding no feed
+# Feed URL per listing page, used instead of discovery; "" means "never use a feed"
+FEED_OVERRIDES = {}
+FEED_TYPES = ('application/rss+xml', 'application/atom+xml', 'application/rdf+xml')
+# Tried in order when the listing page does not link a feed; relative to the listing page
+FEED_PATHS = ['feed/', '?format=feed&type=rss', 'rss', 'rss.xml', 'feed.xml', 'atom.xml']
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+RSS1 = '{http://purl.org/rss/1.0/}'
+_file_lock = threading.Lock()
+
+
+def load_all():
+    """Return every remembered feed as {source: {listing_url: entry}}"""
+    try:
+        with open(FEEDS_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _remember(source, listing_url, feed_url):
+    """Store the feed (or the lack of one) found for a listing page"""
+    with _file_lock:
+        feeds = load_all()
+        feeds.setdefault(source, {})[listing_url] = {'feed': feed_url, 'checked': datetime.now().isoformat()}
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(FEEDS_FILE), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(feeds, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, FEEDS_FILE)
+        except Exception as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            print(f"⚠️  Could not save feeds: {e}")
+
+
+def parse_feed(body, feed_url=''):
+    """
+    Entries of an RSS 2.0, RSS 1.0 or Atom document as a list of
+    {'url', 'title', 'published'}, or None if the body is not a feed.
+    """
+    try:
+        root = ET.fromstring(body.strip())
+    except ET.ParseError:
+        return None
+
+    entries = []
+    if root.tag == 'rss' or root.tag.endswith('RDF'):
+        for item in root.iter('item') if root.tag == 'rss' else root.iter(f'{RSS1}item'):
+            ns = '' if root.tag == 'rss' else RSS1
+            link = (item.findtext(f'{ns}link') or '').strip()
+            guid = (item.findtext('guid') or '').strip()
+            if not link and guid.startswith('http'):
+                link = guid
+            if link:
+                entries.append({'url': urljoin(feed_url, link),
+                                'title': (item.findtext(f'{ns}title') or '').strip(),
+                                'published': (item.findtext('pubDate') or '').strip()})
+    elif root.tag == f'{ATOM}feed':
+        for entry in root.iter(f'{ATOM}entry'):
+            links = entry.findall(f'{ATOM}link')
+            link = next((l for l in links if l.get('rel', 'alternate') == 'alternate'), None)
+            if link is not None and link.get('href'):
+                entries.append({'url': urljoin(feed_url, link.get('href')),
+                                'title': (entry.findtext(f'{ATOM}title') or '').strip(),
+                                'published': (entry.findtext(f'{ATOM}published')
+                                              or entry.findtext(f'{ATOM}updated') or '').strip()})
+    else:
+        return None
+    return entries
+
+
+def _fetch_feed(url, headers, deadline):
+    """Entries of the feed at `url`, or None when it is missing or not a feed"""
+    try:
+        response = http_transport.get(url, headers=headers, timeout=10, deadline=deadline)
+    except requests.RequestException:
+        return None
+    if response.status_code != 200:
+        return None
+    return parse_feed(response.content, response.url or url)
+
+
+def discover_feed(listing_url, headers=None, deadline=None):
+    """
+    Find the feed for a listing page: a <link rel="alternate"> on the page
+    itself first, then the conventional WordPress/Joomla feed locations
+    next to it. Category pages usually link their own category feed next
+    to the site-wide one; it is preferred, so the feed covers the same
+    articles as the page. Returns the URL or None.
+    """
+    candidates = []
+    try:
+        response = http_transport.get(listing_url, headers=headers, timeout=15, html_only=True,
+                                      deadline=deadline)
+        if response.status_code == 200:
+            soup = http_transport.parse_html(response)
+            for link in soup.find_all('link', rel='alternate', href=True):
+                if (link.get('type') or '').lower() in FEED_TYPES:
+                    candidates.append(urljoin(listing_url, link['href']))
+    except requests.RequestException:
+        pass
+
+    base = listing_url if listing_url.endswith('/') else listing_url + '/'
+    candidates.sort(key=lambda url: not url.startswith(base))
+    for path in FEED_PATHS:
+        candidates.append(listing_url + path if path.startswith('?') else urljoin(base, path))
+
+    for url in dict.fromkeys(candidates):
+        # Site-wide comment feeds list comments, not articles
+        if 'comments' in urlsplit(url).path.lower():
+            continue
+        if _fetch_feed(url, headers, deadline):
+            return url
+    return None
+
+
+def feed_for(source, listing_url, headers=None, deadline=None):
+    """The remembered feed for a listing page, discovering it when it is unknown or stale"""
+    if listing_url in FEED_OVERRIDES:
+        return FEED_OVERRIDES[listing_url] or None
+    entry = load_all().get(source, {}).get(listing_url)
+    if entry:
+        if entry.get('feed'):
+            return entry['feed']
+        if datetime.now() - datetime.fromisoformat(entry['checked']) < REDISCOVER_AFTER:
+            return None
+
+    print(f"🔎 Looking for a feed for {listing_url}")
+    feed_url = discover_feed(listing_url, headers=headers, deadline=deadline)
+    if feed_url:
+        print(f"  📡 Found feed: {feed_url}")
+    else:
+        print(f"  ℹ️  No feed found, using the HTML listing (next check in {REDISCOVER_AFTER.days} days)")
+    _remember(source, listing_url, feed_url)
+    return feed_url
+
+
+def known_feed(source, listing_url):
+    """The feed remembered for a listing page, without looking for one"""
+    if listing_url in FEED_OVERRIDES:
+        return FEED_OVERRIDES[listing_url] or None
+    return (load_all().get(source, {}).get(listing_url) or {}).get('feed')
+
+
+def feed_links(source, listing_url, headers=None, deadline=None):
+    """
+    Article URLs from the feed of a listing page, newest first.
+    Returns (True, links) when the feed answered, with links None if it has
+    not changed since the last run, and (False, None) when there is no
+    usable feed and the caller should parse the listing page instead.
+    """
+    if not USE_FEEDS:
+        return False, None
+    feed_url = feed_for(source, listing_url, headers=headers, deadline=deadline)
+    if not feed_url:
+        return False, None
+
+    try:
+        response = http_transport.get_conditional(feed_url, headers=headers, timeout=15, deadline=deadline)
+    except requests.RequestException as e:
+        print(f"⚠️  Feed unavailable ({e}), using the HTML listing")
+        return False, None
+    if response.status_code == 304:
+        print("⏸️  Feed not modified since last run, skipping")
+        return True, None
+    entries = parse_feed(response.content, feed_url) if response.status_code == 200 else None
+    if entries is None:
+        # The feed went away; discovery runs again after REDISCOVER_AFTER
+        print(f"⚠️  {feed_url} is no longer a feed (HTTP {response.status_code}), using the HTML listing")
+        _remember(source, listing_url, None)
+        return False, None
+
+    links = list(LinkSet(entry['url'] for entry in entries))
+    print(f"📡 Found {len(links)} articles in the feed")
+    return True, links
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Dedupe from the page <head> before the full article download
+Reads only the leading bytes of each new page, takes og:title,
+article:published_time and the canonical URL from them, and drops pages
+that match an article we already have
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from urllib.parse import urljoin
+
+import requests
+from bs4 import BeautifulSoup
+
+import http_transport
+from async_fetch import host_of
+from scheduler import get_scheduler
+from urls import canonical
+
+# Shared by all scrapers, one section per source; lives next to the scripts
+INDEX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "head_index.json")
+
+_file_lock = threading.Lock()
+
+
+def _meta(soup, *names):
+    """First non-empty <meta> content among property/name values"""
+    for name in names:
+        tag = soup.find('meta', attrs={'property': name}) or soup.find('meta', attrs={'name': name})
+        if tag and tag.get('content', '').strip():
+            return tag['content'].strip()
+    return None
+
+
+def head_metadata(head, page_url):
+    """
+    Title, publish time and canonical URL from the leading bytes of a page.
+    A relative canonical is resolved against page_url.
+    """
+    soup = BeautifulSoup(head, 'html.parser')
+    title = _meta(soup, 'og:title')
+    if not title and soup.title:
+        title = soup.title.get_text(strip=True)
+    link = soup.find('link', rel='canonical')
+    href = link.get('href') if link else _meta(soup, 'og:url')
+    return {
+        'title': title,
+        'published': _meta(soup, 'article:published_time', 'datePublished', 'date'),
+        'canonical': canonical(urljoin(canonical(page_url), href.strip())) if href else None,
+    }
+
+
+def head_key(meta):
+    """
+    Dedupe key from title plus publish time, or None when either is missing.
+    A title alone is not enough: notices like "Obavijest" repeat every week.
+    """
+    if not meta or not meta['title'] or not meta['published']:
+        return None
+    text = f"{' '.join(meta['title'].split()).lower()}|{meta['published']}"
+    return hashlib.md5(text.encode()).hexdigest()[:12]
+
+
+def load_all():
+    """Return the whole index as {source: {key: url}}"""
+    try:
+        with open(INDEX_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+class HeadIndex:
+    """Head keys of the articles one source has already saved"""
+
+    def __init__(self, source):
+        self.source = source
+        self.keys = load_all().get(source, {})
+        self.seen = {}      # url -> head metadata read in this run
+        self._changed = False
+
+    def _read(self, url, headers, deadline):
+        try:
+            head = http_transport.get_head(url, headers=headers, timeout=10, deadline=deadline)
+        except requests.RequestException:
+            return None
+        return head_metadata(head, url) if head else None
+
+    async def _read_all(self, urls, headers, deadline):
+        futures = {url: get_scheduler().submit(host_of(url), self._read, url, headers, deadline)
+                   for url in urls}
+        return {url: await asyncio.wrap_future(future) for url, future in futures.items()}
+
+    def check(self, urls, scraped_urls, headers=None, deadline=None):
+        """
+        Read the <head> of each URL and return {url: reason} for the ones that
+        are already known: their canonical URL is in scraped_urls (a
+        urls.LinkSet, so http/https and trailing slashes match), or their
+        title and publish time match a saved article. Pages whose head could
+        not be read are left for the full download to decide.
+        """
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return {}
+        print(f"🔎 Reading the <head> of {len(urls)} new pages...")
+        self.seen.update(asyncio.run(self._read_all(urls, headers, deadline)))
+
+        batch = {}
+        duplicates = {}
+        for url in urls:
+            meta = self.seen.get(url)
+            if not meta:
+                continue
+            canonical = meta['canonical']
+            if canonical and canonical in scraped_urls:
+                duplicates[url] = f"canonical URL {canonical} was already scraped"
+                continue
+            key = head_key(meta)
+            if key in self.keys:
+                duplicates[url] = f"same title and date as {self.keys[key]}"
+            elif key in batch:
+                duplicates[url] = f"same title and date as {batch[key]}"
+            elif key:
+                batch[key] = url
+        if duplicates:
+            print(f"  ⏩ {len(duplicates)} pages are already known from their <head>")
+        return duplicates
+
+    def add(self, url):
+        """Remember the head of a page that was saved (or found to be a duplicate)"""
+        key = head_key(self.seen.get(url))
+        if key and self.keys.get(key) != url:
+            self.keys[key] = url
+            self._changed = True
+
+    def save(self):
+        """Write this source's section back, leaving the other sources alone"""
+        if not self._changed:
+            return
+        with _file_lock:
+            index = load_all()
+            index[self.source] = self.keys
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(INDEX_FILE), suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(index, f, indent=2, ensure_ascii=False)
+                os.replace(tmp_path, INDEX_FILE)
+                self._changed = False
+            except Exception as e:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                print(f"⚠️  Could not save head index: {e}")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Optional HTTP/2 for the shared transport
+A requests adapter that sends through one httpx client, so every request
+to a host is multiplexed over a single connection. httpx negotiates the
+protocol per host and falls back to HTTP/1.1 where HTTP/2 is not offered.
+Needs: pip install "httpx[http2]"
+"""
+
+import threading
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+try:
+    import httpx
+    import h2  # noqa: F401  (httpx only speaks HTTP/2 when h2 is installed)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    httpx = None
+    HTTP2_AVAILABLE = False
+
+MAX_CONNECTIONS = 20        # one per host is enough with HTTP/2; HTTP/1.1 fallbacks need more
+# Connection-specific headers are not allowed in HTTP/2; httpx manages the connection itself
+HOP_BY_HOP = {'connection', 'keep-alive', 'proxy-connection', 'transfer-encoding', 'upgrade'}
+
+
+class _StreamReader:
+    """File-like view of an httpx streamed body, as requests expects in Response.raw"""
+
+    def __init__(self, response):
+        self._response = response
+        self._chunks = response.iter_bytes()
+        self._buffer = b''
+
+    def read(self, amt=None, **kwargs):
+        while amt is None or len(self._buffer) < amt:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if amt is None:
+            data, self._buffer = self._buffer, b''
+        else:
+            data, self._buffer = self._buffer[:amt], self._buffer[amt:]
+        return data
+
+    def close(self):
+        self._response.close()
+
+    def release_conn(self):
+        self._response.close()
+
+
+class HTTP2Adapter(BaseAdapter):
+    """requests adapter backed by a shared httpx client with HTTP/2 enabled"""
+
+    def __init__(self):
+        super().__init__()
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = httpx.Client(http2=True, follow_redirects=False,
+                                                limits=httpx.Limits(max_connections=MAX_CONNECTIONS))
+        return self._client
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            timeout = httpx.Timeout(read, connect=connect)
+        client = self._get_client()
+        headers = {k: v for k, v in request.headers.items() if k.lower() not in HOP_BY_HOP}
+        outgoing = client.build_request(request.method, request.url, headers=headers,
+                                        content=request.body, timeout=timeout)
+        try:
+            incoming = client.send(outgoing, stream=True)
+        except httpx.TimeoutException as e:
+            raise requests.Timeout(e, request=request)
+        except httpx.TransportError as e:
+            raise requests.ConnectionError(e, request=request)
+
+        response = requests.Response()
+        response.status_code = incoming.status_code
+        response.reason = incoming.reason_phrase
+        response.headers = CaseInsensitiveDict(incoming.headers.items())
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = str(incoming.url)
+        response.raw = _StreamReader(incoming)
+        response.request = request
+        response.connection = self
+        response.http_version = incoming.http_version
+        if not stream:
+            response.content
+        return response
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
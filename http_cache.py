@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+HTTP caching helpers shared by the scrapers, the dashboard and the debug tools
+- ETag / Last-Modified validators so listing pages can be revalidated
+- a compressed on-disk response cache with per-host TTLs and LRU eviction
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+
+# Everything lives next to the scripts, whatever the current directory is
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "http_cache")
+VALIDATORS_FILE = os.path.join(CACHE_DIR, "validators.json")
+
+_validators = None
+# Validators not saved yet, per thread: run_sources.py runs each source in its own
+# thread, and one source's save must not store another's unfinished listings
+_pending = {}
+_lock = threading.Lock()
+
+
+def _write_json_atomic(path, data):
+    """Write JSON through a temp file so a crash never leaves half a file"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _load_validators():
+    """Load stored validators from disk once per process"""
+    global _validators
+    if _validators is None:
+        try:
+            with open(VALIDATORS_FILE, 'r', encoding='utf-8') as f:
+                _validators = json.load(f)
+        except (OSError, ValueError):
+            _validators = {}
+    return _validators
+
+
+def conditional_headers(url):
+    """Return If-None-Match / If-Modified-Since headers for a URL, if known"""
+    with _lock:
+        entry = _load_validators().get(url)
+    headers = {}
+    if entry:
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+    return headers
+
+
+def remember_validators(url, response):
+    """
+    Keep the validators of a fresh 200 response in memory.
+    They only reach disk through save_validators(), which the scrapers call
+    together with their own state, so a run that crashes before saving
+    state never turns the next run's listing fetch into a 304.
+    """
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+    if not etag and not last_modified:
+        return
+    with _lock:
+        _pending.setdefault(threading.get_ident(), {})[url] = {'etag': etag, 'last_modified': last_modified}
+
+
+def discard_validators(urls):
+    """
+    Drop the validators of listings whose links were not all handled, both
+    this run's and any stored ones, so the next run fetches them in full
+    instead of getting a 304 and skipping the links left over
+    """
+    urls = [url for url in urls if url]
+    with _lock:
+        pending = _pending.get(threading.get_ident(), {})
+        for url in urls:
+            pending.pop(url, None)
+        validators = _load_validators()
+        try:
+            with open(VALIDATORS_FILE, 'r', encoding='utf-8') as f:
+                validators.update(json.load(f))
+        except (OSError, ValueError):
+            return
+        stored = [url for url in urls if url in validators]
+        if not stored:
+            return
+        for url in stored:
+            del validators[url]
+        try:
+            _write_json_atomic(VALIDATORS_FILE, validators)
+        except Exception as e:
+            print(f"⚠️  Could not save HTTP validators: {e}")
+
+
+def save_validators():
+    """Persist validators remembered during this run by the calling thread"""
+    with _lock:
+        pending = _pending.pop(threading.get_ident(), None)
+        if not pending:
+            return
+        validators = _load_validators()
+        # Merge with what other scrapers may have written since we loaded
+        try:
+            with open(VALIDATORS_FILE, 'r', encoding='utf-8') as f:
+                validators.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+        validators.update(pending)
+        try:
+            _write_json_atomic(VALIDATORS_FILE, validators)
+        except Exception as e:
+            print(f"⚠️  Could not save HTTP validators: {e}")
+
+
+# ===== ON-DISK RESPONSE CACHE =====
+# Bodies are stored zlib-compressed under their SHA-256, so identical pages
+# share one file; an SQLite index maps URLs to bodies and tracks LRU order.
+RESPONSES_DIR = os.path.join(CACHE_DIR, "responses")
+INDEX_FILE = os.path.join(CACHE_DIR, "index.sqlite")
+MAX_CACHE_BYTES = 200 * 1024 * 1024
+DEFAULT_TTL = 15 * 60
+# Per-host freshness in seconds; hosts not listed use DEFAULT_TTL
+HOST_TTLS = {
+    'www.oslobodjenje.ba': 30 * 60,
+    'vladausk.ba': 30 * 60,
+    'www.vodovod-bihac.ba': 60 * 60,
+    'komrad-bihac.ba': 60 * 60,
+}
+# Only these response headers are kept with a cached body
+STORED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+_local = threading.local()
+
+
+def _db():
+    """Return this thread's connection to the cache index"""
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        os.makedirs(RESPONSES_DIR, exist_ok=True)
+        conn = sqlite3.connect(INDEX_FILE, timeout=30)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " url TEXT PRIMARY KEY, host TEXT, digest TEXT, size INTEGER,"
+            " headers TEXT, stored_at REAL, last_access REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries(last_access)")
+        conn.commit()
+        _local.conn = conn
+    return conn
+
+
+def ttl_for(host):
+    """Freshness lifetime for responses from a host"""
+    return HOST_TTLS.get(host, DEFAULT_TTL)
+
+
+def _body_path(digest):
+    return os.path.join(RESPONSES_DIR, digest[:2], digest + ".z")
+
+
+def lookup(url, host):
+    """
+    Return (body, headers, fresh) for a cached URL, or None.
+    A stale entry is still returned so its validators can be used to
+    revalidate it; `fresh` tells the caller whether that is needed.
+    """
+    try:
+        conn = _db()
+        row = conn.execute(
+            "SELECT digest, headers, stored_at FROM entries WHERE url = ?", (url,)
+        ).fetchone()
+        if not row:
+            return None
+        digest, headers, stored_at = row
+        with open(_body_path(digest), 'rb') as f:
+            body = zlib.decompress(f.read())
+        conn.execute("UPDATE entries SET last_access = ? WHERE url = ?", (time.time(), url))
+        conn.commit()
+        fresh = time.time() - stored_at < ttl_for(host)
+        return body, json.loads(headers), fresh
+    except (OSError, sqlite3.Error, zlib.error, ValueError):
+        return None
+
+
+def touch(url):
+    """Mark a revalidated entry as fresh again"""
+    try:
+        conn = _db()
+        now = time.time()
+        conn.execute("UPDATE entries SET stored_at = ?, last_access = ? WHERE url = ?", (now, now, url))
+        conn.commit()
+    except sqlite3.Error:
+        pass
+
+
+def store(url, host, body, response_headers):
+    """Store a 200 response body and evict old entries over the byte budget"""
+    if 'no-store' in response_headers.get('Cache-Control', ''):
+        return
+    digest = hashlib.sha256(body).hexdigest()
+    path = _body_path(digest)
+    try:
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, 'wb') as f:
+                f.write(zlib.compress(body, 6))
+            os.replace(tmp_path, path)
+        size = os.path.getsize(path)
+        headers = {k: response_headers[k] for k in STORED_HEADERS if k in response_headers}
+        now = time.time()
+        conn = _db()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (url, host, digest, size, headers, stored_at, last_access)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (url, host, digest, size, json.dumps(headers), now, now)
+        )
+        conn.commit()
+        _evict(conn)
+    except (OSError, sqlite3.Error) as e:
+        print(f"⚠️  Could not cache {url}: {e}")
+
+
+def _evict(conn):
+    """Drop least recently used entries until the cache fits MAX_CACHE_BYTES"""
+    # Bodies shared by several URLs are only counted once
+    total = conn.execute(
+        "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM entries)"
+    ).fetchone()[0]
+    if total <= MAX_CACHE_BYTES:
+        return
+    for url, digest in conn.execute("SELECT url, digest FROM entries ORDER BY last_access").fetchall():
+        if total <= MAX_CACHE_BYTES:
+            break
+        conn.execute("DELETE FROM entries WHERE url = ?", (url,))
+        still_used = conn.execute("SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (digest,)).fetchone()
+        if not still_used:
+            path = _body_path(digest)
+            try:
+                total -= os.path.getsize(path)
+                os.remove(path)
+            except OSError:
+                pass
+    conn.commit()
@@ -0,0 +1,635 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP transport for the scrapers and the dashboard
+Keep-alive connection pooling, compression, DNS cache, per-run memo,
+streamed bodies with size caps, retries with a per-host circuit breaker,
+per-host rate limits and per-host counters
+"""
+
+import codecs
+import random
+import re
+import socket
+import threading
+import time
+from urllib.parse import urlparse, urlsplit
+from urllib.robotparser import RobotFileParser
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from bs4 import BeautifulSoup
+from urllib3.util.request import ACCEPT_ENCODING
+
+import concurrency
+import http_cache
+import rate_limit
+import urls
+from http2_adapter import HTTP2Adapter, HTTP2_AVAILABLE
+
+# Configuration
+DEFAULT_TIMEOUT = 15
+POOL_CONNECTIONS = 20   # number of hosts kept in the pool
+POOL_MAXSIZE = 10       # keep-alive connections per host
+DNS_CACHE_TTL = 300     # seconds
+USE_RESPONSE_CACHE = True   # serve fresh GETs from the on-disk cache in http_cache
+MAX_BODY_BYTES = 5 * 1024 * 1024   # bodies larger than this are abandoned
+# Per-host body caps in bytes; hosts not listed use MAX_BODY_BYTES
+HOST_MAX_BYTES = {}
+CHUNK_SIZE = 64 * 1024
+HEAD_BYTES = 32 * 1024  # get_head() reads at most this much of a page
+RETRIES = 2             # extra attempts for transient GET failures
+BACKOFF_BASE = 1.0      # seconds; doubled for every retry
+BACKOFF_MAX = 8.0
+# Per-host retry counts; hosts not listed use RETRIES
+HOST_RETRIES = {}
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+BREAKER_THRESHOLD = 4   # consecutive failed attempts before a host is given up for the run
+ROBOTS_USER_AGENT = '*'     # robots.txt group whose Crawl-delay we follow
+USE_HTTP2 = True            # let sources opt into HTTP/2 with enable_http2(); needs httpx[http2]
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    # "gzip,deflate" plus "br" when a brotli decoder is installed
+    'Accept-Encoding': ACCEPT_ENCODING,
+    'Connection': 'keep-alive',
+}
+
+_session = None
+_session_lock = threading.Lock()
+_http2_adapter = None
+_stats = {}
+_stats_lock = threading.Lock()
+
+# Run-scoped memo: one process is one run, so nothing here is persisted
+_memo = {}
+_soups = {}
+_memo_lock = threading.Lock()
+# Encoding each host's pages turned out to be in, so later pages skip sniffing
+_host_encodings = {}
+_META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.I)
+_HEAD_END = re.compile(rb'</head\s*>', re.I)
+
+
+_breaker = {}
+_breaker_lock = threading.Lock()
+_robots_checked = set()
+_robots_lock = threading.Lock()
+
+
+class BodyTooLarge(requests.RequestException):
+    """The response body is bigger than the cap for its host"""
+
+
+class SkippedRequest(requests.RequestException):
+    """A request was dropped on purpose and has already been reported"""
+
+
+class NotHTML(SkippedRequest):
+    """An HTML page was expected but the server sent something else"""
+
+
+class HostUnavailable(SkippedRequest):
+    """The circuit breaker for this host is open for the rest of the run"""
+
+
+class DeadlineExceeded(SkippedRequest):
+    """The time budget of the run or source is used up"""
+
+# ===== DNS CACHE =====
+_dns_cache = {}
+_dns_lock = threading.Lock()
+_original_getaddrinfo = socket.getaddrinfo
+
+
+def _cached_getaddrinfo(host, port, *args, **kwargs):
+    """socket.getaddrinfo with a small TTL cache in front of it"""
+    key = (host, port, args, tuple(sorted(kwargs.items())))
+    now = time.monotonic()
+    with _dns_lock:
+        entry = _dns_cache.get(key)
+        if entry and entry[0] > now:
+            return entry[1]
+    result = _original_getaddrinfo(host, port, *args, **kwargs)
+    with _dns_lock:
+        _dns_cache[key] = (now + DNS_CACHE_TTL, result)
+    return result
+
+
+socket.getaddrinfo = _cached_getaddrinfo
+
+
+# ===== SESSION =====
+def get_session():
+    """Return the process-wide pooled session, creating it on first use"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers.update(DEFAULT_HEADERS)
+                _session = session
+    return _session
+
+
+def enable_http2(site):
+    """
+    Send every request for a site (URL or bare host) over HTTP/2, so they
+    share one multiplexed connection. Hosts that do not offer HTTP/2 are
+    spoken to over HTTP/1.1 by the same client. Returns False, and keeps
+    the plain requests pool, when HTTP/2 is off or httpx is not installed.
+    """
+    global _http2_adapter
+    if not USE_HTTP2:
+        return False
+    if not HTTP2_AVAILABLE:
+        print("  ℹ️  HTTP/2 requested but httpx[http2] is not installed, using HTTP/1.1")
+        return False
+    host = urlparse(site).netloc.lower() or site.lower()
+    session = get_session()
+    with _session_lock:
+        if _http2_adapter is None:
+            _http2_adapter = HTTP2Adapter()
+        session.mount(f"https://{host}/", _http2_adapter)
+    return True
+
+
+# ===== PER-RUN MEMO =====
+def memo_key(url):
+    """Key that identifies the same page within a run"""
+    return urls.url_key(url)
+
+
+def _memo_get(url):
+    with _memo_lock:
+        return _memo.get(memo_key(url))
+
+
+def _memo_put(url, response):
+    """Remember a response under the requested and the final (redirected) URL"""
+    with _memo_lock:
+        _memo[memo_key(url)] = response
+        if response.url:
+            _memo[memo_key(response.url)] = response
+
+
+def _declared_encoding(response):
+    """Charset from a <meta> tag, else from the Content-Type header, if it is a known codec"""
+    match = _META_CHARSET.search(response.content[:4096])
+    candidates = [match.group(1).decode('ascii', 'ignore') if match else None]
+    if 'charset' in response.headers.get('Content-Type', '').lower():
+        candidates.append(get_encoding_from_headers(response.headers))
+    for name in candidates:
+        if not name:
+            continue
+        try:
+            return codecs.lookup(name).name
+        except LookupError:
+            continue
+    return None
+
+
+def _parse_with_encoding_cache(response):
+    """
+    Parse with the charset the page declares or, when it declares none, the
+    encoding this host's pages are known to use, so BeautifulSoup can skip
+    charset sniffing. If the page does not decode with it, BeautifulSoup
+    falls back to full detection on its own and the host's cached encoding
+    is replaced by whatever it found.
+    """
+    host = urlparse(response.url or '').netloc.lower()
+    encoding = _declared_encoding(response)
+    if not encoding:
+        with _memo_lock:
+            encoding = _host_encodings.get(host)
+    if encoding:
+        soup = BeautifulSoup(response.content, 'html.parser', from_encoding=encoding)
+    else:
+        soup = BeautifulSoup(response.content, 'html.parser')
+    detected = soup.original_encoding
+    if detected:
+        with _memo_lock:
+            _host_encodings[host] = detected
+    return soup
+
+
+def parse_html(response):
+    """
+    Parse a response with BeautifulSoup, once per run.
+    The same soup object is handed out again for the same response, so
+    callers that decompose() tags should only do so on pages they parse once.
+    """
+    key = memo_key(response.url or '')
+    with _memo_lock:
+        entry = _soups.get(key)
+    if entry and entry[0] is response:
+        return entry[1]
+    soup = _parse_with_encoding_cache(response)
+    with _memo_lock:
+        _soups[key] = (response, soup)
+    return soup
+
+
+def clear_memo():
+    """Forget responses and soups from this run"""
+    with _memo_lock:
+        _memo.clear()
+        _soups.clear()
+
+
+# ===== STREAMED BODIES =====
+def max_bytes_for(host):
+    """Largest body accepted from a host"""
+    return HOST_MAX_BYTES.get(host, MAX_BODY_BYTES)
+
+
+def is_html(content_type):
+    """True for HTML content types; a missing header is given the benefit of the doubt"""
+    content_type = (content_type or '').lower()
+    return not content_type or 'html' in content_type
+
+
+def _default_non_html_handler(url, response):
+    """Log and drop a non-HTML body without reading it"""
+    print(f"  📎 Skipping non-HTML content ({response.headers.get('Content-Type')}): {url}")
+
+
+_non_html_handler = _default_non_html_handler
+
+
+def set_non_html_handler(handler):
+    """
+    Route non-HTML responses to handler(url, response) instead of the parser.
+    The body has not been read yet; the handler may consume it with
+    response.iter_content() and the connection is closed afterwards.
+    """
+    global _non_html_handler
+    _non_html_handler = handler or _default_non_html_handler
+
+
+def _read_body(response, host):
+    """Read a streamed body into response.content, giving up past the host cap"""
+    limit = max_bytes_for(host)
+    declared = response.headers.get('Content-Length')
+    if declared and declared.isdigit() and int(declared) > limit:
+        response.close()
+        raise BodyTooLarge(f"{response.url} is {int(declared) // 1024} KB, cap is {limit // 1024} KB")
+
+    body = bytearray()
+    for chunk in response.iter_content(CHUNK_SIZE):
+        body.extend(chunk)
+        if len(body) > limit:
+            response.close()
+            raise BodyTooLarge(f"{response.url} exceeded the {limit // 1024} KB cap")
+    response._content = bytes(body)
+    response._content_consumed = True
+    return len(body)
+
+
+# ===== POLITENESS =====
+def _ensure_robots(url, host, deadline):
+    """Read a host's robots.txt once per run and apply its Crawl-delay"""
+    with _robots_lock:
+        if host in _robots_checked:
+            return
+        _robots_checked.add(host)
+    parts = urlsplit(url)
+    try:
+        response = request('GET', f"{parts.scheme}://{parts.netloc}/robots.txt", timeout=10,
+                           deadline=deadline, polite=False)
+    except requests.RequestException:
+        return
+    if response.status_code != 200:
+        return
+    parser = RobotFileParser()
+    parser.parse(response.text.splitlines())
+    delay = parser.crawl_delay(ROBOTS_USER_AGENT) or 0
+    request_rate = parser.request_rate(ROBOTS_USER_AGENT)
+    if request_rate and request_rate.requests:
+        delay = max(delay, request_rate.seconds / request_rate.requests)
+    rate_limit.set_crawl_delay(host, delay)
+
+
+# ===== RETRIES AND CIRCUIT BREAKER =====
+def _backoff(attempt):
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def breaker_open(host):
+    """True once a host has failed BREAKER_THRESHOLD times in a row"""
+    with _breaker_lock:
+        return _breaker.get(host, 0) >= BREAKER_THRESHOLD
+
+
+def _attempt_failed(host):
+    with _breaker_lock:
+        _breaker[host] = _breaker.get(host, 0) + 1
+        opened = _breaker[host] == BREAKER_THRESHOLD
+    if opened:
+        print(f"  🔌 {host} failed {BREAKER_THRESHOLD} times in a row, skipping it for the rest of this run")
+
+
+def _attempt_succeeded(host):
+    with _breaker_lock:
+        _breaker[host] = 0
+
+
+def _send(method, url, host, headers, timeout, deadline, polite, kwargs):
+    """
+    Send one request, retrying transient GET failures with backoff.
+    Connection errors, timeouts and RETRY_STATUSES count against the
+    host's circuit breaker; once it is open, HostUnavailable is raised
+    without touching the network. With a deadline, every attempt gets
+    at most the time that is left and none is started once it has passed.
+    Polite requests wait for the host's rate limit first; a Retry-After
+    answer holds back every request to that host, not just this one.
+    Requests with polite=False (webhooks, robots.txt) keep the caller's
+    timeout and neither count against nor are stopped by the breaker,
+    which would otherwise stay open for the life of a long-running process.
+    """
+    retries = HOST_RETRIES.get(host, RETRIES) if method == 'GET' else 0
+    for attempt in range(retries + 1):
+        if polite and breaker_open(host):
+            raise HostUnavailable(f"{host} is unavailable, skipping {url}")
+        attempt_timeout = timeout
+        if polite:
+            _ensure_robots(url, host, deadline)
+            rate_limit.acquire(host, deadline)
+            # The host's own latency sets the timeout once enough of it is known
+            attempt_timeout = concurrency.timeout(host, timeout)
+        if deadline is not None:
+            if deadline.expired():
+                raise DeadlineExceeded(f"out of time, skipping {url}")
+            attempt_timeout = deadline.timeout(attempt_timeout)
+        start = time.monotonic()
+        try:
+            response = get_session().request(method, url, headers=headers, timeout=attempt_timeout,
+                                             stream=True, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            _record(host, 0, time.monotonic() - start, error=True)
+            if polite:
+                concurrency.observe(host, time.monotonic() - start, ok=False)
+                _attempt_failed(host)
+            if attempt == retries or (polite and breaker_open(host)):
+                raise
+        else:
+            if polite:
+                concurrency.observe(host, time.monotonic() - start, ok=response.status_code not in RETRY_STATUSES)
+            if response.status_code not in RETRY_STATUSES:
+                if polite:
+                    _attempt_succeeded(host)
+                # Only permanent hops are remembered; next time the request goes straight there
+                if response.history and all(hop.status_code in (301, 308) for hop in response.history):
+                    urls.learn_redirect(url, response.url)
+                return response, start
+            retry_after = rate_limit.parse_retry_after(response.headers.get('Retry-After'))
+            if retry_after is not None:
+                rate_limit.pause(host, retry_after)
+            if polite:
+                _attempt_failed(host)
+            if attempt == retries or (polite and breaker_open(host)):
+                return response, start
+            _record(host, 0, time.monotonic() - start, error=True)
+            response.close()
+            if retry_after is not None and polite:
+                # The rate limiter waits out Retry-After before the next attempt
+                continue
+        if deadline is not None:
+            deadline.sleep(_backoff(attempt))
+        else:
+            time.sleep(_backoff(attempt))
+
+
+def _record(host, nbytes, elapsed, error=False, cache_hit=False, skipped=False):
+    """Add one request to the per-host counters"""
+    with _stats_lock:
+        stats = _stats.setdefault(host, {'requests': 0, 'cache_hits': 0, 'errors': 0,
+                                         'skipped': 0, 'bytes': 0, 'seconds': 0.0})
+        if cache_hit:
+            stats['cache_hits'] += 1
+            return
+        if skipped:
+            stats['skipped'] += 1
+        stats['requests'] += 1
+        stats['bytes'] += nbytes
+        stats['seconds'] += elapsed
+        if error:
+            stats['errors'] += 1
+
+
+def _cached_response(url, body, headers):
+    """Build a requests.Response around a body served from the disk cache"""
+    response = requests.Response()
+    response.status_code = 200
+    response.reason = 'OK'
+    response.url = url
+    response._content = body
+    response.headers = CaseInsensitiveDict(headers)
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.from_cache = True
+    return response
+
+
+def request(method, url, headers=None, timeout=DEFAULT_TIMEOUT, use_cache=True, html_only=False,
+            deadline=None, polite=True, **kwargs):
+    """
+    Send a request through the shared session and record its cost.
+    A page already fetched in this run is returned from the memo; otherwise
+    GETs are answered from the on-disk cache while fresh, and stale entries
+    are revalidated with their stored validators before being reused.
+    Transient GET failures are retried, and a host that keeps failing is
+    skipped for the rest of the run (HostUnavailable). A deadline.Deadline
+    shortens the timeout to the time left and stops new requests once it
+    has passed (DeadlineExceeded). Polite requests (the default) go through
+    the per-host rate limit, which also follows robots.txt Crawl-delay.
+    GETs for a URL that permanently redirected before go to its final URL.
+    Bodies are streamed and capped per host (BodyTooLarge). With html_only,
+    the Content-Type is checked before the body is read and anything that is
+    not HTML goes to the non-HTML handler and raises NotHTML.
+    """
+    if method == 'GET':
+        url = urls.resolve(url)
+    host = urlparse(url).netloc.lower()
+    memoizable = method == 'GET' and not kwargs.get('stream')
+    if memoizable:
+        memoized = _memo_get(url)
+        if memoized is not None:
+            if html_only and not is_html(memoized.headers.get('Content-Type')):
+                raise NotHTML(f"{url} is {memoized.headers.get('Content-Type')}")
+            return memoized
+
+    cacheable = USE_RESPONSE_CACHE and use_cache and method == 'GET' and not kwargs.get('stream')
+    cached = http_cache.lookup(url, host) if cacheable else None
+    if cached:
+        body, cached_headers, fresh = cached
+        if fresh:
+            if html_only and not is_html(cached_headers.get('Content-Type')):
+                raise NotHTML(f"{url} is {cached_headers.get('Content-Type')}")
+            _record(host, 0, 0, cache_hit=True)
+            response = _cached_response(url, body, cached_headers)
+            _memo_put(url, response)
+            return response
+        headers = dict(headers or {})
+        if cached_headers.get('ETag'):
+            headers['If-None-Match'] = cached_headers['ETag']
+        if cached_headers.get('Last-Modified'):
+            headers['If-Modified-Since'] = cached_headers['Last-Modified']
+
+    caller_streams = kwargs.pop('stream', False)
+    response, start = _send(method, url, host, headers, timeout, deadline, polite, kwargs)
+    if caller_streams:
+        _record(host, 0, time.monotonic() - start, error=response.status_code >= 500)
+        return response
+
+    # Look at the headers before pulling the body over the wire
+    if html_only and response.status_code == 200 and not is_html(response.headers.get('Content-Type')):
+        try:
+            _non_html_handler(url, response)
+        finally:
+            response.close()
+        _record(host, 0, time.monotonic() - start, skipped=True)
+        raise NotHTML(f"{url} is {response.headers.get('Content-Type')}")
+    try:
+        nbytes = _read_body(response, host)
+    except Exception:
+        _record(host, 0, time.monotonic() - start, error=True)
+        raise
+    _record(host, nbytes, time.monotonic() - start, error=response.status_code >= 500)
+
+    if cached and response.status_code == 304:
+        http_cache.touch(url)
+        response = _cached_response(url, cached[0], cached[1])
+        if html_only and not is_html(response.headers.get('Content-Type')):
+            raise NotHTML(f"{url} is {response.headers.get('Content-Type')}")
+    elif cacheable and response.status_code == 200:
+        http_cache.store(url, host, response.content, response.headers)
+    if memoizable and response.status_code == 200:
+        _memo_put(url, response)
+    return response
+
+
+def get_head(url, headers=None, timeout=DEFAULT_TIMEOUT, max_bytes=HEAD_BYTES, deadline=None):
+    """
+    Return the leading bytes of an HTML page, up to its </head>, without
+    downloading the rest. A byte range is asked for and the stream is also
+    cut locally, for servers that ignore Range. Pages already fetched in
+    this run or fresh in the disk cache cost no request. Returns None for
+    error answers and for anything that is not HTML.
+    """
+    url = urls.resolve(url)
+    host = urlparse(url).netloc.lower()
+    memoized = _memo_get(url)
+    if memoized is not None:
+        return memoized.content[:max_bytes]
+    if USE_RESPONSE_CACHE:
+        cached = http_cache.lookup(url, host)
+        if cached and cached[2]:
+            _record(host, 0, 0, cache_hit=True)
+            return cached[0][:max_bytes]
+
+    headers = dict(headers or {})
+    headers['Range'] = f"bytes=0-{max_bytes - 1}"
+    response, start = _send('GET', url, host, headers, timeout, deadline, True, {})
+    head = bytearray()
+    try:
+        if response.status_code not in (200, 206) or not is_html(response.headers.get('Content-Type')):
+            return None
+        for chunk in response.iter_content(4096):
+            head.extend(chunk)
+            if len(head) >= max_bytes or _HEAD_END.search(head):
+                break
+        return bytes(head[:max_bytes])
+    finally:
+        # Closing a half-read response drops its connection instead of draining the body
+        response.close()
+        _record(host, len(head), time.monotonic() - start, error=response.status_code >= 500)
+
+
+def get(url, headers=None, timeout=DEFAULT_TIMEOUT, **kwargs):
+    """GET a URL through the shared session"""
+    return request('GET', url, headers=headers, timeout=timeout, **kwargs)
+
+
+def post(url, headers=None, timeout=DEFAULT_TIMEOUT, **kwargs):
+    """POST to a URL through the shared session"""
+    return request('POST', url, headers=headers, timeout=timeout, **kwargs)
+
+
+def get_conditional(url, headers=None, timeout=DEFAULT_TIMEOUT, **kwargs):
+    """
+    GET a listing page, revalidating it with the validators from the last run.
+    Returns a 304 response when the page has not changed; callers should then
+    skip parsing and link extraction for it.
+    """
+    merged = dict(headers or {})
+    merged.update(http_cache.conditional_headers(url))
+    # Revalidation has its own validators; a cached copy would hide the 304
+    response = get(url, headers=merged, timeout=timeout, use_cache=False, **kwargs)
+    if response.status_code == 200:
+        http_cache.remember_validators(url, response)
+    return response
+
+
+def save_validators():
+    """Persist listing-page validators and learned redirects; call together with the scraper state"""
+    http_cache.save_validators()
+    urls.save_redirects()
+
+
+def discard_validators(urls):
+    """Forget the validators of listing pages whose links were not all handled this run"""
+    http_cache.discard_validators(urls)
+
+
+class Client:
+    """Session-like wrapper with its own default headers over the shared pool"""
+
+    def __init__(self, headers=None, deadline=None):
+        self.headers = dict(headers or {})
+        # Applied to every request unless the call passes its own
+        self.deadline = deadline
+
+    def _merge(self, headers):
+        merged = dict(self.headers)
+        if headers:
+            merged.update(headers)
+        return merged
+
+    def get(self, url, headers=None, timeout=DEFAULT_TIMEOUT, **kwargs):
+        kwargs.setdefault('deadline', self.deadline)
+        return get(url, headers=self._merge(headers), timeout=timeout, **kwargs)
+
+    def get_conditional(self, url, headers=None, timeout=DEFAULT_TIMEOUT, **kwargs):
+        kwargs.setdefault('deadline', self.deadline)
+        return get_conditional(url, headers=self._merge(headers), timeout=timeout, **kwargs)
+
+    def post(self, url, headers=None, timeout=DEFAULT_TIMEOUT, **kwargs):
+        kwargs.setdefault('deadline', self.deadline)
+        return post(url, headers=self._merge(headers), timeout=timeout, **kwargs)
+
+
+# ===== STATS =====
+def host_stats():
+    """Return a copy of the per-host request counters"""
+    with _stats_lock:
+        return {host: dict(stats) for host, stats in _stats.items()}
+
+
+def print_stats():
+    """Print per-host bytes and latency for this run"""
+    stats = host_stats()
+    if not stats:
+        return
+    adaptive = concurrency.snapshot()
+    print("\n🌐 HTTP transport stats:")
+    for host, s in sorted(stats.items()):
+        avg_ms = s['seconds'] / s['requests'] * 1000 if s['requests'] else 0
+        print(f"  {host}: {s['requests']} requests, {s['cache_hits']} cache hits, "
+              f"{s['bytes'] / 1024:.1f} KB, avg {avg_ms:.0f} ms, {s['errors']} errors, "
+              f"{s['skipped']} non-HTML skipped")
+        if adaptive.get(host, {}).get('p95') is not None:
+            print(f"    p95 {adaptive[host]['p95'] * 1000:.0f} ms, concurrency {adaptive[host]['limit']}")
@@ -4,17 +4,26 @@ KC Bihać News Scraper for Facebook Auto-Posting
 Scrapes: https://kcbihac.ba/novosti.php
 """
 
-import requests
-from bs4 import BeautifulSoup
 import json
 import os
 import hashlib
 from datetime import datetime
 import re
 from urllib.parse import urljoin
-import time
 import sys
 
+import feeds
+import http_transport
+import pagination
+import rate_limit
+import sitemaps
+from async_fetch import fetch, fetch_all
+from failure_ledger import FailureLedger, failure_reason
+from deadline import source_deadline
+from head_index import HeadIndex
+from keywords import Matcher
+from urls import LinkSet
+
 # Configuration
 BASE_URL = "https://kcbihac.ba/novosti.php"
 OUTPUT_DIR = "facebook_ready_posts"
@@ -23,6 +32,33 @@ HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
 }
 
+# Fetch article pages concurrently instead of one by one
+ASYNC_FETCH = True
+MAX_CONCURRENCY_PER_HOST = 4
+
+# Read only the <head> of new pages first and skip the full download of
+# articles we already have (same canonical URL, or same title and date)
+HEAD_CHECK = True
+
+# Take every article changed since the last run from the site's sitemaps
+# (by <lastmod>) instead of the first few links on the listing page
+USE_SITEMAP = True
+SITEMAP_URL_PATTERN = r'novosti\.php\?|clanak\.php\?|vijest\.php\?|/novosti/'
+
+# Politeness towards the host: sustained requests per second and burst size.
+# robots.txt Crawl-delay and Retry-After can only slow this down.
+RATE_PER_SECOND = 0.5
+RATE_BURST = 4
+
+# Link texts that announce news
+NEWS_WORDS = Matcher(['vijest', 'novost', 'clanak', 'objava', 'obavijest', 'news', 'article'])
+# Links in listing tables that lead to news
+NEWS_HREF_WORDS = Matcher(['?id=', 'clanak', 'vijest'])
+# Paragraphs with these are page furniture, not news text
+BOILERPLATE_WORDS = Matcher(['copyright', 'sva prava', 'design', 'menu', 'home'])
+# Image URLs of icons and spacers rather than photos
+ICON_WORDS = Matcher(['icon', 'logo', 'spacer', 'pixel'])
+
 # Get script name hash for file naming
 SCRIPT_NAME = os.path.basename(sys.argv[0])
 SCRIPT_NAME_HASH = hashlib.md5(SCRIPT_NAME.encode()).hexdigest()[:12]
@@ -43,8 +79,8 @@ def load_scraped_data():
     if os.path.exists(STATE_FILE):
         with open(STATE_FILE, 'r') as f:
             data = json.load(f)
-            return set(data.get('scraped_urls', [])), set(data.get('content_hashes', []))
-    return set(), set()
+            return LinkSet(data.get('scraped_urls', [])), set(data.get('content_hashes', []))
+    return LinkSet(), set()
 
 def save_scraped_data(scraped_urls, content_hashes):
     """Save scraped data to state file"""
@@ -57,6 +93,7 @@ def save_scraped_data(scraped_urls, content_hashes):
     }
     with open(STATE_FILE, 'w') as f:
         json.dump(state, f, indent=2, ensure_ascii=False)
+    http_transport.save_validators()
 
 def clean_text(text):
     """Clean and normalize text"""
@@ -67,14 +104,17 @@ def clean_text(text):
     text = re.sub(r'\s+', ' ', text)
     return text.strip()
 
-def extract_news_details(news_url):
+def extract_news_details(news_url, response=None, deadline=None):
     """Extract full details from a news article page"""
     try:
         print(f"  Fetching: {news_url}")
-        response = requests.get(news_url, headers=HEADERS, timeout=10)
+        if response is None:
+            response = http_transport.get(news_url, headers=HEADERS, timeout=10, html_only=True, deadline=deadline)
+        elif isinstance(response, Exception):
+            raise response
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = http_transport.parse_html(response)
         
         # Extract title
         title = "No Title"
@@ -157,7 +197,7 @@ def extract_news_details(news_url):
             meaningful_paras = []
             for p in paragraphs:
                 text = clean_text(p.get_text())
-                if len(text) > 30 and not any(word in text.lower() for word in ['copyright', 'sva prava', 'design', 'menu', 'home']):
+                if len(text) > 30 and not BOILERPLATE_WORDS.search(text):
                     meaningful_paras.append(text)
             
             if meaningful_paras:
@@ -241,7 +281,7 @@ def extract_news_details(news_url):
                         img_src = elem.get('src')
                         # Skip tiny images (likely icons)
                         if (img_src and 
-                            not any(word in img_src.lower() for word in ['icon', 'logo', 'spacer', 'pixel']) and
+                            not ICON_WORDS.search(img_src) and
                             not img_src.endswith(('.gif', '.ico'))):
                             image_url = urljoin(news_url, img_src)
                             break
@@ -270,6 +310,9 @@ def extract_news_details(news_url):
             'image_url': image_url
         }
         
+    except http_transport.SkippedRequest:
+        # Non-HTML page or unreachable host, already reported by the transport
+        return None
     except Exception as e:
         print(f"  Error extracting details: {e}")
         return None
@@ -312,14 +355,37 @@ def format_for_facebook(news_data):
     
     return fb_post, post_id, content_hash
 
-def scrape_news_links():
-    """Scrape the main page for news links"""
+def listing_links(soup, page_url):
+    """News links on one page of the listing, without the page-number links"""
+    links = LinkSet()
+    for link in soup.find_all('a', href=re.compile(r'novosti\.php\?|clanak\.php\?', re.I)):
+        if not pagination.PAGE_LINK.search(link['href']):
+            links.add(urljoin(page_url, link['href']))
+    return list(links)
+
+def scrape_news_links(deadline=None, seen=()):
+    """Scrape the main page for news links, following its pages while `seen` does not cover them"""
+    # Sitemaps list every changed article, not just what fits on the listing page
+    if USE_SITEMAP:
+        sitemap_urls = sitemaps.sitemap_links(SCRIPT_NAME, BASE_URL, SITEMAP_URL_PATTERN, headers=HEADERS,
+                                              deadline=deadline)
+        if sitemap_urls is not None:
+            return sitemap_urls
+    
+    # The site's feed, when it has one, replaces the listing page heuristics below
+    found, feed_urls = feeds.feed_links(SCRIPT_NAME, BASE_URL, headers=HEADERS, deadline=deadline)
+    if found:
+        return feed_urls
+    
     try:
-        response = requests.get(BASE_URL, headers=HEADERS, timeout=15)
+        response = http_transport.get_conditional(BASE_URL, headers=HEADERS, timeout=15, deadline=deadline)
         response.raise_for_status()
+        if response.status_code == 304:
+            print("⏸️  Listing page not modified since last run, skipping")
+            return None
         
-        soup = BeautifulSoup(response.content, 'html.parser')
-        news_links = []
+        soup = http_transport.parse_html(response)
+        news_links = LinkSet()
         
         print(f"Looking for news links on: {BASE_URL}")
         
@@ -340,8 +406,8 @@ def scrape_news_links():
             href = link.get('href', '')
             link_text = clean_text(link.get_text())
             
-            # Skip empty or non-news links
-            if not href or href.startswith(('#', 'javascript:', 'mailto:')):
+            # Skip empty, non-news and page-number links
+            if not href or href.startswith(('#', 'javascript:', 'mailto:')) or pagination.PAGE_LINK.search(href):
                 continue
             
             # Check if it's a news link
@@ -354,16 +420,13 @@ def scrape_news_links():
                     break
             
             # Check link text for news indicators
-            if not is_news_link and len(link_text) > 10:
-                news_keywords = ['vijest', 'novost', 'clanak', 'objava', 'obavijest', 'news', 'article']
-                if any(keyword in link_text.lower() for keyword in news_keywords):
-                    is_news_link = True
+            if not is_news_link and len(link_text) > 10 and NEWS_WORDS.search(link_text):
+                is_news_link = True
             
             # Check if it's not the current page or navigation
             if is_news_link and href != 'novosti.php' and not href.startswith('http'):
                 full_url = urljoin(BASE_URL, href)
-                if full_url not in news_links and full_url != BASE_URL:
-                    news_links.append(full_url)
+                if full_url != BASE_URL and news_links.add(full_url):
                     print(f"  Found link: {link_text[:50]}... -> {href}")
         
         # Strategy 2: Look for tables that might contain news (common in PHP sites)
@@ -378,43 +441,18 @@ def scrape_news_links():
                         links = row.find_all('a', href=True)
                         for link in links:
                             href = link.get('href')
-                            if href and any(pattern in href for pattern in ['?id=', 'clanak', 'vijest']):
-                                full_url = urljoin(BASE_URL, href)
-                                if full_url not in news_links:
-                                    news_links.append(full_url)
-        
-        # Strategy 3: Look for pagination to get more news
-        pagination_links = soup.find_all('a', href=re.compile(r'novosti\.php\?.*strana=|.*page=|.*start=', re.I))
-        if pagination_links and len(news_links) < 10:
-            print("Found pagination, checking next page...")
-            for page_link in pagination_links[:2]:  # Check first 2 pagination links
-                page_text = page_link.get_text().strip()
-                if page_text in ['2', '>>', 'next', 'dalje']:
-                    page_url = urljoin(BASE_URL, page_link.get('href'))
-                    try:
-                        response2 = requests.get(page_url, headers=HEADERS, timeout=10)
-                        soup2 = BeautifulSoup(response2.content, 'html.parser')
-                        
-                        # Extract links from page 2
-                        for link in soup2.find_all('a', href=re.compile(r'novosti\.php\?|clanak\.php\?', re.I)):
-                            href = link.get('href')
-                            if href:
-                                full_url = urljoin(BASE_URL, href)
-                                if full_url not in news_links:
-                                    news_links.append(full_url)
-                    except:
-                        print("Could not fetch additional page")
-        
-        # Remove duplicates and limit
-        unique_links = []
-        seen = set()
-        for link in news_links:
-            if link not in seen:
-                seen.add(link)
-                unique_links.append(link)
+                            if NEWS_HREF_WORDS.search(href):
+                                news_links.add(urljoin(BASE_URL, href))
+        
+        # Strategy 3: keep paging while the listing still shows news we have not scraped
+        news_links.update(pagination.follow(soup, BASE_URL, news_links, listing_links, seen,
+                                            headers=HEADERS, deadline=deadline))
+        
+        # One entry per page already; paging stopped where the known news begins
+        unique_links = list(news_links)
         
         print(f"Found {len(unique_links)} unique news links")
-        return unique_links[:10]  # Limit to 10 articles
+        return unique_links
         
     except Exception as e:
         print(f"Error scraping news links: {e}")
@@ -428,13 +466,23 @@ def scrape_latest_news():
     
     ensure_dirs()
     scraped_urls, content_hashes = load_scraped_data()
+    failures = FailureLedger(SCRIPT_NAME)
+    heads = HeadIndex(SCRIPT_NAME)
+    deadline = source_deadline(SCRIPT_NAME)
+    rate_limit.configure(BASE_URL, RATE_PER_SECOND, RATE_BURST)
     new_posts = []
     
     # Get news links
-    news_links = scrape_news_links()
+    news_links = scrape_news_links(deadline, scraped_urls)
+    
+    # Listing page unchanged since the last run
+    if news_links is None:
+        return []
     
     if not news_links:
         print("No news links found!")
+        # A quiet sitemap still moves the mark and keeps its validators for the next run
+        sitemaps.commit(SCRIPT_NAME, [])
         return []
     
     print(f"\nProcessing {len(news_links)} links...")
@@ -442,7 +490,25 @@ def scrape_latest_news():
     counter = 1
     processed = 0
     
+    # Known articles are recognised from their <head>, before the full download
+    pending = [u for u in news_links if u not in scraped_urls and not failures.should_skip(u)]
+    head_duplicates = {}
+    if HEAD_CHECK:
+        head_duplicates = heads.check(pending, scraped_urls, headers=HEADERS, deadline=deadline)
+    
+    # Download all unseen pages up front; the loop below only parses them
+    prefetched = {}
+    if ASYNC_FETCH:
+        pending = [u for u in pending if u not in head_duplicates]
+        prefetched = fetch_all(pending, headers=HEADERS, timeout=10,
+                               per_host=MAX_CONCURRENCY_PER_HOST, deadline=deadline)
+    
     for news_url in news_links:
+        # Out of time: stop here, what was scraped so far is still saved below
+        if deadline.expired():
+            print(f"\n⏰ Time budget used up, stopping with partial results")
+            break
+        
         processed += 1
         print(f"\n[{processed}/{len(news_links)}] Checking: {news_url}")
         
@@ -451,11 +517,28 @@ def scrape_latest_news():
             print("  ⏩ Already processed")
             continue
         
+        # Failed on an earlier run and not due for another try yet
+        if failures.should_skip(news_url):
+            print(f"  ⏳ Skipping, {failures.describe(news_url)}")
+            continue
+        
+        # Already have this article under another URL or with the same title and date
+        if news_url in head_duplicates:
+            print(f"  ⚠️  Duplicate, {head_duplicates[news_url]}")
+            scraped_urls.add(news_url)
+            continue
+        
         # Extract details
-        news_details = extract_news_details(news_url)
+        # The page as fetched, or the error, so a broken URL can be told apart from a timeout
+        response = prefetched.get(news_url)
+        if response is None:
+            response = fetch(news_url, headers=HEADERS, timeout=10, deadline=deadline)
+        news_details = extract_news_details(news_url, response, deadline)
         if not news_details:
             print("  ❌ Could not extract details")
+            failures.record_failure(news_url, failure_reason(response))
             continue
+        failures.record_success(news_url)
         
         # Format for Facebook
         fb_post, post_id, content_hash = format_for_facebook(news_details)
@@ -469,6 +552,7 @@ def scrape_latest_news():
         if content_hash in content_hashes:
             print(f"  ⚠️  Duplicate content detected")
             scraped_urls.add(news_url)
+            heads.add(news_url)
             continue
         
         # Save to file
@@ -485,6 +569,7 @@ def scrape_latest_news():
             # Update tracking
             scraped_urls.add(news_url)
             content_hashes.add(content_hash)
+            heads.add(news_url)
             new_posts.append({
                 'filename': filename,
                 'title': news_details['title'],
@@ -497,11 +582,18 @@ def scrape_latest_news():
         except Exception as e:
             print(f"  ❌ Error saving: {e}")
         
-        # Be polite to the server
-        time.sleep(2)
+    
+    # A listing only counts as read once all its links were handled; otherwise the next run reads it again
+    unhandled = [u for u in news_links if u not in scraped_urls and not failures.recorded(u)]
+    if unhandled:
+        http_transport.discard_validators([BASE_URL, feeds.known_feed(SCRIPT_NAME, BASE_URL)])
     
     # Save state
     save_scraped_data(scraped_urls, content_hashes)
+    failures.save()
+    heads.save()
+    # The sitemap high-water mark stops short of any URL it gave us that was not handled
+    sitemaps.commit(SCRIPT_NAME, unhandled)
     
     print(f"\n" + "=" * 60)
     print(f"Scraping completed!")
@@ -532,6 +624,7 @@ def main():
     else:
         print("\nℹ️  No new posts found.")
     
+    http_transport.print_stats()
     print(f"✅ Check the '{OUTPUT_DIR}' directory for JSON files.")
     print("=" * 60)
 
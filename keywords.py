@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Compiled keyword matching for link classification and text filtering
+A keyword list is folded (lowercase, no diacritics) and compiled into one
+regex alternation once, when the scraper module loads; each test is then
+a single scan in C instead of a Python loop of `word in text.lower()`
+"""
+
+import re
+import unicodedata
+
+# Combining marks left over after NFKD splits "č" into "c" + caron
+_COMBINING = re.compile('[\u0300-\u036f]+')
+
+
+def fold(text):
+    """Lowercase text without diacritics: "Bihać" -> "bihac", "Đurđevak" -> "djurdjevak" """
+    text = (text or '').lower()
+    if text.isascii():
+        return text
+    # đ has no decomposition; ASCII Bosnian writes it "dj"
+    return _COMBINING.sub('', unicodedata.normalize('NFKD', text.replace('đ', 'dj')))
+
+
+def _keyword_pattern(word):
+    """Regex for one folded keyword, with "*" standing for the rest of a word"""
+    return re.escape(fold(word)).replace(r'\*', r'\w*')
+
+
+class Matcher:
+    """
+    Keywords matched anywhere in a text, ignoring case and diacritics.
+    With whole_words, keywords must start and end on word boundaries; a "*"
+    in a keyword stands for any word characters, for inflected endings
+    ("bihać*" matches "Bihaću" and "Bihaćkoj").
+    """
+
+    def __init__(self, words, whole_words=False):
+        self.words = tuple(dict.fromkeys(word for word in words if word))
+        # Longest first, so the most specific keyword wins at a position
+        order = sorted(range(len(self.words)), key=lambda i: len(self.words[i]), reverse=True)
+        patterns = [_keyword_pattern(self.words[i]) for i in order]
+        # Groups slow the scan down a lot, so only find() and findall() use the named copy
+        pattern = '|'.join(patterns)
+        named = '|'.join(f"(?P<k{i}>{p})" for i, p in zip(order, patterns))
+        if whole_words:
+            pattern, named = rf'\b(?:{pattern})\b', rf'\b(?:{named})\b'
+        self._regex = re.compile(pattern) if patterns else None
+        self._named = re.compile(named) if patterns else None
+
+    def _match(self, regex, text):
+        if not text or regex is None:
+            return None
+        text = text.lower()
+        # Most hits need no folding; only non-ASCII text is folded and scanned again
+        match = regex.search(text)
+        if match is None and not text.isascii():
+            match = regex.search(fold(text))
+        return match
+
+    def search(self, text):
+        """True when any keyword occurs in text"""
+        return self._match(self._regex, text) is not None
+
+    def find(self, text):
+        """The first keyword occurring in text, as it was given, or None"""
+        match = self._match(self._named, text)
+        return self.words[int(match.lastgroup[1:])] if match else None
+
+    def findall(self, text):
+        """Every distinct keyword occurring in text, in order of appearance"""
+        if not text or self._named is None:
+            return []
+        found = (self.words[int(match.lastgroup[1:])] for match in self._named.finditer(fold(text)))
+        return list(dict.fromkeys(found))
+
+    def __repr__(self):
+        return f"Matcher({list(self.words)!r})"
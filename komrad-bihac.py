@@ -4,7 +4,6 @@ Komrad Bihać Scraper
 Matches format of other scrapers with state file and proper JSON output
 """
 
-import requests
 import hashlib
 import json
 import os
@@ -12,7 +11,15 @@ import sys
 import re
 from datetime import datetime
 from urllib.parse import urljoin
-from bs4 import BeautifulSoup
+
+import feeds
+import http_transport
+import wp_api
+from failure_ledger import FailureLedger, failure_reason
+from deadline import source_deadline
+from head_index import HeadIndex
+from keywords import Matcher
+from urls import LinkSet
 
 class KomradBihacScraper:
     def __init__(self):
@@ -21,6 +28,7 @@ class KomradBihacScraper:
         self.script_hash = self.get_script_hash()[:12]
         self.output_dir = "/home/bihac-danas/web-scraper/facebook_ready_posts"
         self.state_file = "komrad_bihac_state.json"
+        self.default_image_url = "https://komrad-bihac.ba/images/logo.png"
         
         # URLs to scrape
         self.target_urls = [
@@ -31,9 +39,20 @@ class KomradBihacScraper:
         ]
         
         # State tracking
-        self.scraped_urls = set()
+        self.scraped_urls = LinkSet()
         self.content_hashes = set()
         self.new_posts = []
+        self.failures = FailureLedger(self.script_name)
+        self.heads = HeadIndex(self.script_name)
+        # Read only the <head> of new pages first and skip the full download of known articles
+        self.head_check = True
+        # Paragraphs with these are navigation and footers, not announcement text
+        self.boilerplate_words = Matcher(['menu', 'home', 'contact', 'copyright', 'privacy', 'login', 'search'])
+        # Take new posts from the WordPress REST API; the HTML pages are the fallback
+        self.use_wp_api = True
+        self.wp_synced_at = None    # when the API was last read completely
+        self.last_error = None
+        self.deadline = None
         
         # Create directories
         os.makedirs(self.output_dir, exist_ok=True)
@@ -42,10 +61,12 @@ class KomradBihacScraper:
         self.load_state()
         
         # Setup session
-        self.session = requests.Session()
+        self.session = http_transport.Client()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
         })
+        # All pages come from one host: multiplex them over a single HTTP/2 connection
+        http_transport.enable_http2(self.base_url)
     
     def get_script_hash(self):
         """Get script hash"""
@@ -62,13 +83,14 @@ class KomradBihacScraper:
                 with open(self.state_file, 'r', encoding='utf-8') as f:
                     state = json.load(f)
                     
-                    self.scraped_urls = set(state.get('scraped_urls', []))
+                    self.scraped_urls = LinkSet(state.get('scraped_urls', []))
                     self.content_hashes = set(state.get('content_hashes', []))
+                    self.wp_synced_at = state.get('wp_synced_at')
                     
                     print(f"📁 Loaded state: {len(self.scraped_urls)} URLs, {len(self.content_hashes)} hashes")
             except Exception as e:
                 print(f"⚠️  Error loading state: {e}")
-                self.scraped_urls = set()
+                self.scraped_urls = LinkSet()
                 self.content_hashes = set()
         else:
             print("📁 No state file found, starting fresh")
@@ -78,6 +100,7 @@ class KomradBihacScraper:
         state = {
             "scraped_urls": list(self.scraped_urls),
             "content_hashes": list(self.content_hashes),
+            "wp_synced_at": self.wp_synced_at,
             "last_run": datetime.now().isoformat(),
             "script_name": self.script_name,
             "script_hash": self.script_hash
@@ -86,6 +109,9 @@ class KomradBihacScraper:
         try:
             with open(self.state_file, 'w', encoding='utf-8') as f:
                 json.dump(state, f, ensure_ascii=False, indent=2)
+            http_transport.save_validators()
+            self.failures.save()
+            self.heads.save()
             print(f"\n💾 State saved to {self.state_file}")
         except Exception as e:
             print(f"❌ Error saving state: {e}")
@@ -104,19 +130,36 @@ class KomradBihacScraper:
         print("=" * 60)
     
     def fetch_page(self, url):
-        """Fetch webpage"""
+        """Fetch and parse webpage"""
+        self.last_error = None
+        try:
+            resp = self.session.get(url, timeout=15, html_only=True)
+            resp.raise_for_status()
+            return http_transport.parse_html(resp)
+        except http_transport.SkippedRequest as e:
+            self.last_error = e
+            return None
+        except Exception as e:
+            self.last_error = e
+            print(f"  ❌ Error: {e}")
+            return None
+    
+    def fetch_listing(self, url):
+        """Fetch and parse a listing page, revalidating it against the last run"""
         try:
-            resp = self.session.get(url, timeout=15)
+            resp = self.session.get_conditional(url, timeout=15)
             resp.raise_for_status()
-            return resp.text
+            if resp.status_code == 304:
+                print(f"  ⏸️  Not modified since last run, skipping")
+                return None
+            return http_transport.parse_html(resp)
         except Exception as e:
             print(f"  ❌ Error: {e}")
             return None
     
-    def find_announcement_links(self, html, source_url):
+    def find_announcement_links(self, soup, source_url):
         """Find announcement links on page"""
-        soup = BeautifulSoup(html, 'html.parser')
-        announcement_urls = []
+        announcement_urls = LinkSet()
         
         # Komrad Bihać specific selectors
         selectors = [
@@ -149,12 +192,11 @@ class KomradBihacScraper:
                 href = link.get('href')
                 if href:
                     full_url = urljoin(source_url, href)
-                    if (self.base_url in full_url and 
-                        full_url not in announcement_urls and
+                    if (self.base_url in full_url and
                         not any(ext in full_url.lower() for ext in ['.jpg', '.png', '.pdf', '.zip', '.doc', '.xls'])):
-                        announcement_urls.append(full_url)
+                        announcement_urls.add(full_url)
         
-        return list(set(announcement_urls))[:20]
+        return list(announcement_urls)[:20]
     
     def extract_image_url(self, soup, url):
         """Extract main image from announcement"""
@@ -189,11 +231,10 @@ class KomradBihacScraper:
             return urljoin(url, logo.get('src'))
         
         # Default fallback
-        return "https://komrad-bihac.ba/images/logo.png"
+        return self.default_image_url
     
-    def parse_announcement(self, url, html):
+    def parse_announcement(self, url, soup):
         """Parse announcement and return data in required JSON format"""
-        soup = BeautifulSoup(html, 'html.parser')
         
         # 1. Title
         title = "Obavijest - JKP Komrad Bihać"
@@ -221,10 +262,7 @@ class KomradBihacScraper:
                         title = title_text
                         break
         
-        # 2. Generate ID (8 char hex)
-        announcement_id = hashlib.md5(url.encode()).hexdigest()[:8]
-        
-        # 3. Date
+        # 2. Date
         date_str = datetime.now().strftime('%Y-%m-%d')
         date_selectors = [
             '.date',
@@ -258,7 +296,7 @@ class KomradBihacScraper:
                             date_str = found
                         break
         
-        # 4. Content
+        # 3. Content
         content = ""
         content_selectors = [
             '.content',
@@ -292,13 +330,27 @@ class KomradBihacScraper:
             for p in paragraphs:
                 text = p.get_text(strip=True)
                 if (len(text) > 20 and 
-                    not any(word in text.lower() for word in 
-                           ['menu', 'home', 'contact', 'copyright', 'privacy', 'login', 'search'])):
+                    not self.boilerplate_words.search(text)):
                     text_parts.append(text)
             
             if text_parts:
                 content = '\n'.join(text_parts[:10])
         
+        # 4. Image URL
+        image_url = self.extract_image_url(soup, url)
+        
+        return self.build_post(url, title, date_str, content, image_url)
+    
+    def parse_wp_post(self, post):
+        """Build a post from a WordPress API post, without fetching the announcement page"""
+        fields = wp_api.post_fields(post)
+        return self.build_post(fields['url'], fields['title'] or "Obavijest - JKP Komrad Bihać", fields['date'],
+                               fields['content'], fields['image_url'] or self.default_image_url)
+    
+    def build_post(self, url, title, date_str, content, image_url):
+        """Add type, signature, link and content hash, and return the post in the required JSON format"""
+        announcement_id = hashlib.md5(url.encode()).hexdigest()[:8]
+        
         # Determine announcement type
         announcement_type = "Opća obavijest"
         if "nabavk" in url.lower():
@@ -318,14 +370,10 @@ class KomradBihacScraper:
         else:
             content = f"{announcement_type}\n\n🚛 JKP Komrad Bihać\n\n📄 Detalji: {url}"
         
-        # 5. Content hash (12 chars)
+        # Content hash (12 chars)
         content_for_hash = f"{title}{content[:1000]}".encode('utf-8')
         content_hash = hashlib.md5(content_for_hash).hexdigest()[:12]
         
-        # 6. Image URL
-        image_url = self.extract_image_url(soup, url)
-        
-        # Build JSON
         return {
             "title": title,
             "id": announcement_id,
@@ -377,23 +425,44 @@ class KomradBihacScraper:
     def run(self):
         """Main execution"""
         self.print_header()
+        self.deadline = source_deadline(self.script_name)
+        self.session.deadline = self.deadline
         
         print(f"Scraping Komrad Bihać...")
         
         all_new_urls = []
         
-        # Process each target URL
-        for target_url in self.target_urls:
+        # On WordPress, new posts arrive with their content in one API request
+        sync_started = wp_api.now()
+        wp_posts, wp_complete = None, False
+        if self.use_wp_api:
+            wp_posts, wp_complete = wp_api.new_posts(self.base_url, self.wp_synced_at,
+                                                     headers=self.session.headers, deadline=self.deadline)
+        if wp_posts is not None:
+            all_new_urls = [url for url in wp_posts if url not in self.scraped_urls]
+            print(f"  New announcements: {len(all_new_urls)}")
+        
+        # Process each target URL; the API answer, when there is one, already lists everything
+        target_urls = self.target_urls if wp_posts is None else []
+        for target_url in target_urls:
+            if self.deadline.expired():
+                print("\n⏰ Time budget used up, skipping the remaining pages")
+                break
             print(f"\n📂 Checking: {target_url}")
             
-            # Fetch page
-            page_html = self.fetch_page(target_url)
-            if not page_html:
-                print(f"  ❌ Failed to fetch page")
+            # The page's feed, when it has one, replaces parsing the page
+            found, announcement_urls = feeds.feed_links(self.script_name, target_url,
+                                                        headers=self.session.headers, deadline=self.deadline)
+            if not found:
+                # Fetch page
+                page_soup = self.fetch_listing(target_url)
+                if not page_soup:
+                    continue
+                
+                # Find announcement links
+                announcement_urls = self.find_announcement_links(page_soup, target_url)
+            if announcement_urls is None:
                 continue
-            
-            # Find announcement links
-            announcement_urls = self.find_announcement_links(page_html, target_url)
             print(f"  Found {len(announcement_urls)} announcements")
             
             # Filter out already scraped URLs
@@ -406,48 +475,92 @@ class KomradBihacScraper:
             all_new_urls.extend(new_urls)
         
         # Remove duplicates
-        all_new_urls = list(set(all_new_urls))
+        all_new_urls = list(LinkSet(all_new_urls))
         
         if not all_new_urls:
             print("\n✅ No new announcements found.")
+            if wp_complete:
+                self.wp_synced_at = sync_started
             self.save_state()
             return
         
         print(f"\n📊 Total unique new announcements: {len(all_new_urls)}")
         print(f"\nProcessing announcements...\n")
         
+        # Known articles are recognised from their <head>, before the full download
+        head_duplicates = {}
+        if self.head_check:
+            # API posts already carry their content; reading their <head> would save nothing
+            pending = [u for u in all_new_urls
+                       if not self.failures.should_skip(u) and not (wp_posts and u in wp_posts)]
+            head_duplicates = self.heads.check(pending, self.scraped_urls, headers=self.session.headers,
+                                               deadline=self.deadline)
+        
         for i, url in enumerate(all_new_urls, 1):
+            # Out of time: stop here, what was scraped so far is still saved below
+            if self.deadline.expired():
+                print(f"\n⏰ Time budget used up, stopping with partial results")
+                break
+            
             print(f"[{i}/{len(all_new_urls)}] Processing: {url}")
             
-            # Fetch announcement page
-            announcement_html = self.fetch_page(url)
-            if not announcement_html:
-                print(f"  ❌ Failed to fetch")
+            # Failed on an earlier run and not due for another try yet
+            if self.failures.should_skip(url):
+                print(f"  ⏳ Skipping, {self.failures.describe(url)}")
+                continue
+            
+            # Already have this article under another URL or with the same title and date
+            if url in head_duplicates:
+                print(f"  ⚠️  Duplicate, {head_duplicates[url]}")
+                self.scraped_urls.add(url)
                 continue
             
-            # Parse announcement
-            post_data = self.parse_announcement(url, announcement_html)
+            if wp_posts and url in wp_posts:
+                # Content came with the API answer, no page to fetch
+                post_data = self.parse_wp_post(wp_posts[url])
+            else:
+                # Fetch announcement page
+                announcement_soup = self.fetch_page(url)
+                if not announcement_soup:
+                    print(f"  ❌ Failed to fetch")
+                    self.failures.record_failure(url, failure_reason(self.last_error))
+                    continue
+                self.failures.record_success(url)
+                
+                # Parse announcement
+                post_data = self.parse_announcement(url, announcement_soup)
             
             # Check for duplicate content
             if post_data['content_hash'] in self.content_hashes:
                 print(f"  ⚠️  Duplicate content (hash: {post_data['content_hash']})")
                 # Still add URL to scraped list
                 self.scraped_urls.add(url)
-                continue
-            
-            # Save to facebook_ready_posts
-            filename = self.save_post(post_data)
-            
-            # Update state
-            self.scraped_urls.add(url)
-            self.content_hashes.add(post_data['content_hash'])
-            self.new_posts.append((filename, post_data))
+            else:
+                # Save to facebook_ready_posts
+                filename = self.save_post(post_data)
+                
+                # Update state
+                self.scraped_urls.add(url)
+                self.content_hashes.add(post_data['content_hash'])
+                self.new_posts.append((filename, post_data))
+                
+                print(f"  ✅ Saved: {filename}")
+                print(f"    Title: {post_data['title'][:50]}...")
+                print(f"    Date: {post_data['date']}")
+                print(f"    Type: {'Javna nabavka' if 'nabavk' in url.lower() else 'Obavijest'}")
+                print(f"    Content hash: {post_data['content_hash']}\n")
             
-            print(f"  ✅ Saved: {filename}")
-            print(f"    Title: {post_data['title'][:50]}...")
-            print(f"    Date: {post_data['date']}")
-            print(f"    Type: {'Javna nabavka' if 'nabavk' in url.lower() else 'Obavijest'}")
-            print(f"    Content hash: {post_data['content_hash']}\n")
+            # Known from its <head> from now on, saved or duplicate
+            self.heads.add(url)
+        
+        # Next run asks the API only for posts published after this one, unless it stopped early
+        if wp_complete and not self.deadline.expired():
+            self.wp_synced_at = sync_started
+        
+        # A listing only counts as read once all its links were handled; otherwise the next run reads it again
+        if any(u not in self.scraped_urls and not self.failures.recorded(u) for u in all_new_urls):
+            http_transport.discard_validators(self.target_urls + [feeds.known_feed(self.script_name, u)
+                                                                  for u in self.target_urls])
         
         # Print summary
         print("=" * 60)
@@ -468,6 +581,7 @@ class KomradBihacScraper:
                 else:
                     print(f"    📢 Type: Opća obavijest")
         
+        http_transport.print_stats()
         print(f"\n✅ Check the 'facebook_ready_posts' directory for JSON files.")
         
         # Save state
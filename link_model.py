@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Per-host URL-pattern model for skipping non-article links
+Links are reduced to path templates (/clanak/{n}/{slug}), and each source
+remembers how often a template led to a saved post versus a duplicate,
+an error or a near-empty page. Templates that keep failing are skipped
+before their pages are fetched
+"""
+
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+from urllib.parse import parse_qsl, urlsplit
+
+# Shared by all scrapers, one section per source; lives next to the scripts
+MODEL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "link_model.json")
+MIN_SAMPLES = 4         # a template is only judged after this many outcomes
+SKIP_BELOW = 0.15       # skip templates whose smoothed success rate is lower
+EXPLORE_RATE = 0.1      # share of skippable links still fetched, so a template can recover
+MAX_COUNT = 50          # counts are halved past this, so old history fades
+SHORT_CONTENT = 200     # saved pages with less text than this count as misses
+
+_SLUG = re.compile(r'[^\W_]+(?:[-_][^\W_]+){2,}(?:\.\w+)?')
+_file_lock = threading.Lock()
+
+
+def path_template(url):
+    """Host plus path with numbers, slugs and ids replaced, and the query's parameter names"""
+    parts = urlsplit(url)
+    segments = []
+    for segment in parts.path.split('/'):
+        if not segment:
+            continue
+        if segment.isdigit():
+            segments.append('{n}')
+        elif _SLUG.fullmatch(segment):
+            segments.append('{slug}')
+        elif re.search(r'\d', segment) and len(segment) > 6:
+            segments.append('{id}')
+        else:
+            segments.append(segment.lower())
+    template = f"{parts.netloc.lower()}/{'/'.join(segments)}"
+    names = sorted({name for name, _ in parse_qsl(parts.query, keep_blank_values=True)})
+    return template + (f"?{'&'.join(names)}" if names else '')
+
+
+def load_all():
+    """Return the whole model as {source: {template: [hits, misses]}}"""
+    try:
+        with open(MODEL_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+class LinkModel:
+    """What one source's URL templates have produced so far"""
+
+    def __init__(self, source):
+        self.source = source
+        self.templates = load_all().get(source, {})
+        self._changed = False
+
+    def score(self, url):
+        """Smoothed share of this URL's template that produced posts (0.5 when unknown)"""
+        hits, misses = self.templates.get(path_template(url), (0, 0))
+        return (hits + 1) / (hits + misses + 2)
+
+    def should_skip(self, url):
+        hits, misses = self.templates.get(path_template(url), (0, 0))
+        if hits + misses < MIN_SAMPLES or self.score(url) >= SKIP_BELOW:
+            return False
+        return random.random() >= EXPLORE_RATE
+
+    def filter(self, links, scraped_urls=()):
+        """Drop new links whose template rarely led anywhere; known links are left alone"""
+        kept = [url for url in links if url in scraped_urls or not self.should_skip(url)]
+        if len(kept) < len(links):
+            print(f"🧭 Skipping {len(links) - len(kept)} links whose URL pattern rarely holds an article")
+        return kept
+
+    def record(self, url, hit):
+        """Count one outcome: hit for a saved post, miss for a duplicate, error or empty page"""
+        template = path_template(url)
+        hits, misses = self.templates.get(template, (0, 0))
+        if hit:
+            hits += 1
+        else:
+            misses += 1
+        if hits + misses > MAX_COUNT:
+            hits, misses = hits // 2, misses // 2
+        self.templates[template] = [hits, misses]
+        self._changed = True
+
+    def save(self):
+        """Write this source's section back, leaving the other sources alone"""
+        if not self._changed:
+            return
+        with _file_lock:
+            model = load_all()
+            model[self.source] = self.templates
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(MODEL_FILE), suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(model, f, indent=2, ensure_ascii=False)
+                os.replace(tmp_path, MODEL_FILE)
+                self._changed = False
+            except Exception as e:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                print(f"⚠️  Could not save link model: {e}")
@@ -7,13 +7,19 @@ import os
 import json
 import hashlib
 import re
-import time
 from datetime import datetime
-from urllib.parse import urljoin, quote
-import requests
-from bs4 import BeautifulSoup
+from urllib.parse import urljoin, quote, urlencode, urlparse
 import logging
 import random
+import tempfile
+
+import http_transport
+import pagination
+import rate_limit
+from failure_ledger import FailureLedger, failure_reason
+from deadline import source_deadline
+from keywords import Matcher
+from urls import LinkSet, canonical
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -27,6 +33,47 @@ SEARCH_TERM = "bihac"
 SOURCE_NAME = "Oslobođenje"
 SOURCE_HASH = hashlib.md5(b"oslobodjenje.py").hexdigest()[:12]
 
+# Politeness: sustained requests per second and burst size for oslobodjenje.ba.
+# robots.txt Crawl-delay and Retry-After can only slow this down.
+RATE_PER_SECOND = 0.5
+RATE_BURST = 2
+
+# Structured search: the JSON endpoint the search page's scripts call, or the
+# JSON payload embedded in the page. The HTML result pages are the fallback.
+USE_SEARCH_API = True
+SEARCH_API_URL = None       # set to skip discovery, e.g. "https://www.oslobodjenje.ba/api/search"
+# Endpoint found on an earlier run; lives next to the scripts
+SEARCH_API_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "oslobodjenje_search_api.json")
+ARTICLE_PATH = re.compile(r'/(clanak|vijesti)/')
+# How the search page's scripts reach their backend (same patterns as debug_api.py)
+API_PATTERNS = [
+    r'fetch\(["\']([^"\']+)["\']',
+    r'axios\.(?:get|post)\(["\']([^"\']+)["\']',
+    r'\$\.(?:ajax|get|post)\(["\']([^"\']+)["\']',
+    r'url:\s*["\']([^"\']+)["\']',
+    r'apiUrl:\s*["\']([^"\']+)["\']',
+    r'endpoint:\s*["\']([^"\']+)["\']',
+]
+JSON_SCRIPT = re.compile(r'<script[^>]+type=["\']application/(?:ld\+)?json["\'][^>]*>(.*?)</script>', re.S | re.I)
+INLINE_SCRIPT = re.compile(r'<script(?![^>]*\bsrc=)[^>]*>(.*?)</script>', re.S | re.I)
+SEARCH_WORDS = Matcher(['search', 'pretraga', 'query'])     # script URLs that look like the search backend
+ARTICLE_WORDS = Matcher(['clanak', 'vijesti'])             # result links that lead to articles
+
+# Search results are only downloaded when their title and snippet are about
+# Bihać and Una-Sana Canton: the weights of the places they mention must add
+# up to RELEVANCE_THRESHOLD. "*" allows inflected endings ("Bihaću", "Cazinu").
+# Results that come without a snippet are always downloaded.
+USE_RELEVANCE_FILTER = True
+RELEVANCE_THRESHOLD = 2
+GAZETTEER = {
+    'bihać*': 3, 'usk': 3, 'unsko-sansk*': 3, 'una-sana': 3,
+    'cazin*': 2, 'kladuš*': 2, 'bužim*': 2, 'bosansk* krup*': 2, 'sansk* most*': 2,
+    'bosansk* petrov*': 2, 'ključ': 1, 'drvar*': 1,
+    'izačić*': 2, 'maljevac': 2, 'vučjak*': 2, 'lipa kamp*': 2, 'kampu lipa': 2,
+    'krajin*': 1, 'unsk*': 1,
+}
+GAZETTEER_WORDS = Matcher(GAZETTEER, whole_words=True)
+
 # User-Agent rotation to avoid detection
 USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -40,14 +87,13 @@ def get_random_user_agent():
     """Return a random user agent"""
     return random.choice(USER_AGENTS)
 
-def create_session():
-    """Create a requests session with headers to mimic a real browser"""
-    session = requests.Session()
+def create_session(deadline=None):
+    """Create a client on the shared transport with headers to mimic a real browser"""
+    session = http_transport.Client(deadline=deadline)
     session.headers.update({
         'User-Agent': get_random_user_agent(),
         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
         'Accept-Language': 'en-US,en;q=0.5',
-        'Accept-Encoding': 'gzip, deflate, br',
         'DNT': '1',
         'Connection': 'keep-alive',
         'Upgrade-Insecure-Requests': '1',
@@ -106,18 +152,25 @@ def extract_date(article_soup, article_url):
         logger.warning(f"Could not extract date: {e}")
         return datetime.now().strftime('%Y-%m-%d')
 
-def scrape_article(article_url, session):
+def fetch_article(article_url, session):
+    """The article page, or the exception raised fetching it, for failure_reason()"""
+    try:
+        return session.get(article_url, timeout=30, html_only=True)
+    except Exception as e:
+        return e
+
+def scrape_article(article_url, session, response=None):
     """Scrape individual article page"""
     try:
         logger.info(f"Scraping article: {article_url}")
         
-        # Add delay to be polite
-        time.sleep(random.uniform(1, 3))
-        
-        response = session.get(article_url, timeout=30)
+        if response is None:
+            response = session.get(article_url, timeout=30, html_only=True)
+        elif isinstance(response, Exception):
+            raise response
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = http_transport.parse_html(response)
         
         # Extract title
         title = ""
@@ -205,13 +258,201 @@ def scrape_article(article_url, session):
             'id': article_id
         }
         
+    except http_transport.SkippedRequest as e:
+        logger.info(f"Skipping article: {e}")
+        return None
     except Exception as e:
         logger.error(f"Error scraping article {article_url}: {e}")
         return None
 
-def search_articles(session, max_pages=3):
-    """Search for articles and return article URLs"""
-    articles = []
+def is_article_path(value):
+    """An article URL or path; section pages like /vijesti/bih/ are navigation, not articles"""
+    if not (isinstance(value, str) and value.startswith(('/', 'http')) and ARTICLE_PATH.search(value)):
+        return False
+    last = urlparse(value).path.rstrip('/').rsplit('/', 1)[-1]
+    return '-' in last or any(c.isdigit() for c in last)
+
+def article_urls_in_json(data, found=None, snippets=None):
+    """
+    Every article URL or path anywhere in a decoded JSON document, in order.
+    With snippets, the other texts of the object holding a URL (its title,
+    lead, excerpt) are collected there under the URL.
+    """
+    if found is None:
+        found = LinkSet()
+    if isinstance(data, dict):
+        for value in data.values():
+            article_urls_in_json(value, found, snippets)
+        if snippets is not None:
+            texts = [v for v in data.values() if isinstance(v, str) and not v.startswith(('/', 'http'))]
+            for value in filter(is_article_path, data.values()):
+                snippets[canonical(urljoin(BASE_URL, value))] = ' '.join(texts)
+    elif isinstance(data, list):
+        for value in data:
+            article_urls_in_json(value, found, snippets)
+    elif is_article_path(data):
+        found.add(urljoin(BASE_URL, data))
+    return found
+
+def result_snippet(link):
+    """Title and snippet of the search result a link belongs to: its largest ancestor with no other article link"""
+    target = urljoin(BASE_URL, link['href'])
+    node = link
+    while node.parent is not None and node.parent.name not in ('body', 'html', '[document]'):
+        if any(ARTICLE_WORDS.search(a['href']) and urljoin(BASE_URL, a['href']) != target
+               for a in node.parent.find_all('a', href=True)):
+            break
+        node = node.parent
+    return node.get_text(' ', strip=True)[:600]
+
+def relevance(text):
+    """Summed GAZETTEER weights of the places a title or snippet mentions"""
+    return sum(GAZETTEER[word] for word in GAZETTEER_WORDS.findall(text))
+
+def relevant_results(links, snippets):
+    """
+    Search results whose title and snippet are about the area; results
+    without a snippet are kept, since there is nothing to judge them by
+    """
+    links = list(links)
+    if not USE_RELEVANCE_FILTER:
+        return links
+    kept = [url for url in links if not snippets.get(url) or relevance(snippets[url]) >= RELEVANCE_THRESHOLD]
+    if len(kept) < len(links):
+        logger.info(f"Skipping {len(links) - len(kept)} results whose snippet is not about Bihać/USK")
+    return kept
+
+def load_search_api_state():
+    """Remembered search endpoint and the endpoints that turned out not to be JSON"""
+    try:
+        with open(SEARCH_API_FILE, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = {}
+    return {'endpoint': state.get('endpoint'), 'rejected': state.get('rejected', [])}
+
+def save_search_api_state(state):
+    """Write the search endpoint state"""
+    state['checked'] = datetime.now().isoformat()
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(SEARCH_API_FILE), suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, SEARCH_API_FILE)
+    except OSError as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        logger.warning(f"Could not save search endpoint: {e}")
+
+def discover_search_api(html):
+    """Search endpoint referenced by the search page's inline scripts, or None"""
+    for script in INLINE_SCRIPT.findall(html):
+        for pattern in API_PATTERNS:
+            for match in re.findall(pattern, script, re.IGNORECASE):
+                if SEARCH_WORDS.search(match):
+                    return urljoin(BASE_URL, match)
+    return None
+
+def search_api_page(session, endpoint, page, snippets=None):
+    """Article URLs from one page of the JSON search endpoint, or None if it is not JSON"""
+    params = urlencode({'search': SEARCH_TERM, 'page': page})
+    url = f"{endpoint}{'&' if '?' in endpoint else '?'}{params}"
+    response = session.get(url, headers={'Accept': 'application/json'}, timeout=30)
+    if response.status_code != 200:
+        return None
+    try:
+        return article_urls_in_json(response.json(), snippets=snippets)
+    except ValueError:
+        return None
+
+def search_api_pages(session, endpoint, seen=(), max_pages=pagination.MAX_PAGES):
+    """
+    Article URLs from the endpoint, page by page until a page has nothing
+    outside `seen`; None if its first page is not JSON or lists no articles,
+    which is what a script URL that only looked like the search backend gives
+    """
+    articles = LinkSet()
+    listed = LinkSet()
+    snippets = {}
+    for page in range(1, max_pages + 1):
+        page_urls = search_api_page(session, endpoint, page, snippets)
+        if not page_urls and page == 1:
+            return None
+        new_urls = [url for url in page_urls or [] if listed.add(url)]
+        if not new_urls:
+            break
+        # Only results about the area are downloaded, and only they keep the paging going
+        new_urls = relevant_results(new_urls, snippets)
+        articles.update(new_urls)
+        if not seen or not pagination.has_unseen(new_urls, seen):
+            break
+    return list(articles)
+
+def search_structured(session, seen=(), max_pages=pagination.MAX_PAGES):
+    """
+    Article URLs from structured search data instead of HTML result pages:
+    the JSON endpoint when one is known, otherwise the JSON embedded in the
+    first result page (whose scripts are also checked for the endpoint, for
+    the next run). Returns None when neither is there.
+    """
+    state = load_search_api_state()
+    endpoint = SEARCH_API_URL or state['endpoint']
+    if endpoint:
+        articles = search_api_pages(session, endpoint, seen, max_pages)
+        if articles is not None:
+            logger.info(f"Search API: {len(articles)} articles")
+            return articles
+        logger.warning(f"Search endpoint {endpoint} did not answer with search results, falling back")
+        if not SEARCH_API_URL:
+            state['endpoint'] = None
+            state['rejected'].append(endpoint)
+            save_search_api_state(state)
+    
+    # The first result page is also what the HTML fallback starts from; it is memoized
+    response = session.get(f"{SEARCH_URL}?search={quote(SEARCH_TERM)}", timeout=30)
+    if response.status_code != 200:
+        return None
+    html = response.text
+    endpoint = discover_search_api(html)
+    if endpoint and not SEARCH_API_URL and endpoint not in state['rejected']:
+        # Only kept once it really answers with search results
+        articles = search_api_pages(session, endpoint, seen, max_pages)
+        if articles is not None:
+            logger.info(f"Found search endpoint {endpoint}, Search API: {len(articles)} articles")
+            state['endpoint'] = endpoint
+            save_search_api_state(state)
+            return articles
+        logger.info(f"Script URL {endpoint} is not a search endpoint, ignoring it")
+        state['rejected'].append(endpoint)
+        save_search_api_state(state)
+    
+    articles = LinkSet()
+    snippets = {}
+    for payload in JSON_SCRIPT.findall(html):
+        try:
+            article_urls_in_json(json.loads(payload), articles, snippets)
+        except ValueError:
+            continue
+    if not articles:
+        return None
+    articles = relevant_results(articles, snippets)
+    logger.info(f"Embedded search data: {len(articles)} articles")
+    return articles
+
+def search_articles(session, seen=(), max_pages=pagination.MAX_PAGES):
+    """
+    Search for articles and return article URLs. Result pages are followed
+    while they still list articles outside `seen`, up to max_pages.
+    """
+    if USE_SEARCH_API:
+        try:
+            articles = search_structured(session, seen, max_pages)
+            if articles is not None:
+                return articles
+        except Exception as e:
+            logger.warning(f"Structured search failed ({e}), using the HTML result pages")
+    
+    articles = LinkSet()
     
     try:
         for page in range(1, max_pages + 1):
@@ -224,17 +465,14 @@ def search_articles(session, max_pages=3):
             
             search_page_url = SEARCH_URL + search_params
             
-            # Add delay between pages
-            if page > 1:
-                time.sleep(random.uniform(2, 4))
-            
             response = session.get(search_page_url, timeout=30)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = http_transport.parse_html(response)
             
             # Find article links - adjust selectors based on actual page structure
-            article_links = []
+            article_links = LinkSet()
+            snippets = {}
             
             # Try multiple possible selectors for article links
             link_selectors = [
@@ -251,26 +489,33 @@ def search_articles(session, max_pages=3):
                 links = soup.select(selector)
                 for link in links:
                     href = link.get('href')
-                    if href and 'clanak' in href or 'vijesti' in href:
+                    if ARTICLE_WORDS.search(href):
                         full_url = urljoin(BASE_URL, href)
-                        if full_url not in article_links:
-                            article_links.append(full_url)
+                        article_links.add(full_url)
+                        snippet = result_snippet(link)
+                        if len(snippet) > len(snippets.get(canonical(full_url), '')):
+                            snippets[canonical(full_url)] = snippet
             
             if not article_links:
                 logger.warning(f"No article links found on page {page}")
                 break
             
-            # Add to articles list
-            articles.extend(article_links)
+            # Only results about the area are downloaded, and only they keep the paging going
+            article_links = relevant_results(article_links, snippets)
+            articles.update(article_links)
             logger.info(f"Found {len(article_links)} articles on page {page}")
             
+            # Everything on this page was saved before, so the older pages were too
+            if not seen or not pagination.has_unseen(article_links, seen):
+                break
+            
             # Check if there are more pages
             next_button = soup.select_one('.next, .pagination-next, a[rel="next"]')
             if not next_button:
                 break
         
-        # Remove duplicates
-        articles = list(dict.fromkeys(articles))
+        # One entry per article already
+        articles = list(articles)
         logger.info(f"Total unique articles found: {len(articles)}")
         
         return articles
@@ -279,6 +524,22 @@ def search_articles(session, max_pages=3):
         logger.error(f"Error searching articles: {e}")
         return []
 
+def load_seen_urls():
+    """URLs of the articles this scraper has already saved"""
+    seen = LinkSet()
+    if not os.path.exists(OUTPUT_DIR):
+        return seen
+    for filename in os.listdir(OUTPUT_DIR):
+        if filename.startswith(SOURCE_HASH) and filename.endswith('.json'):
+            try:
+                with open(os.path.join(OUTPUT_DIR, filename), 'r', encoding='utf-8') as f:
+                    url = json.load(f).get('url')
+            except (OSError, ValueError):
+                continue
+            if url:
+                seen.add(url)
+    return seen
+
 def check_if_exists(content_hash):
     """Check if article already exists in output directory"""
     if not os.path.exists(OUTPUT_DIR):
@@ -339,35 +600,55 @@ def main():
     logger.info(f"Starting Oslobođenje scraper for '{SEARCH_TERM}'")
     
     # Create session
-    session = create_session()
+    deadline = source_deadline("oslobodjenje.py")
+    rate_limit.configure(BASE_URL, RATE_PER_SECOND, RATE_BURST)
+    session = create_session(deadline)
     
-    # Search for articles
-    article_urls = search_articles(session)
+    # Search for articles, paging back only as far as the ones already saved
+    seen_urls = load_seen_urls()
+    article_urls = search_articles(session, seen_urls)
     
     if not article_urls:
         logger.info("No articles found")
         return
     
     # Scrape each article
+    failures = FailureLedger("oslobodjenje.py")
     new_articles_count = 0
     for url in article_urls:
+        # Out of time: stop here with what was saved so far
+        if deadline.expired():
+            logger.warning("Time budget used up, stopping with partial results")
+            break
+        
+        if url in seen_urls:
+            continue
+        
+        # Failed on an earlier run and not due for another try yet
+        if failures.should_skip(url):
+            logger.info(f"Skipping {url}: {failures.describe(url)}")
+            continue
         try:
-            article_data = scrape_article(url, session)
+            # The page as fetched, or the error, so a broken URL can be told apart from a timeout
+            response = fetch_article(url, session)
+            article_data = scrape_article(url, session, response)
             if article_data:
+                failures.record_success(url)
                 # Check if article already exists
                 if not check_if_exists(article_data['content_hash']):
                     if save_article(article_data):
                         new_articles_count += 1
-                    # Be polite - delay between articles
-                    time.sleep(random.uniform(1, 2))
                 else:
                     logger.info(f"Article already exists: {article_data['title'][:50]}...")
             else:
                 logger.warning(f"Failed to scrape article: {url}")
+                failures.record_failure(url, failure_reason(response))
         except Exception as e:
             logger.error(f"Error processing article {url}: {e}")
     
+    failures.save()
     logger.info(f"Scraping complete. New articles: {new_articles_count}/{len(article_urls)}")
+    http_transport.print_stats()
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Seen-aware pagination for listing pages
+Keeps following "next page" while a page still has article links we have
+not scraped, and stops at the first page that is entirely known: one page
+on a quiet day, as many as needed after downtime
+"""
+
+import re
+from urllib.parse import urljoin
+
+import requests
+
+import http_transport
+from urls import LinkSet
+
+MAX_PAGES = 15          # hard stop for one listing, whatever the pages contain
+PAGER = re.compile(r'pagination|pager|paging|page-numbers', re.I)
+# Page-number and archive links, which turn up among a listing's article links
+PAGE_LINK = re.compile(r'[?&](strana|page|paged|start)=|/page/\d+', re.I)
+NEXT_TEXTS = {'next', 'sljedeća', 'sljedeca', 'dalje', 'naprijed', '»', '>', '>>', '›'}
+
+
+def has_unseen(links, seen):
+    """True when a page has links and at least one of them is new"""
+    return bool(links) and any(link not in seen for link in links)
+
+
+def find_next_page(soup, page_url, page_number):
+    """URL of the page after `page_number`: rel=next, a "next" link, or the link labelled page_number + 1"""
+    link = soup.select_one('a[rel~="next"][href], link[rel~="next"][href]')
+    if link:
+        return urljoin(page_url, link['href'])
+    # Stay inside the pager when there is one; sliders have "next" arrows too
+    pager = soup.find(['nav', 'ul', 'div'], class_=PAGER) or soup
+    numbered = None
+    for a in pager.find_all('a', href=True):
+        text = a.get_text(strip=True).lower()
+        if text in NEXT_TEXTS:
+            return urljoin(page_url, a['href'])
+        if numbered is None and text == str(page_number + 1):
+            numbered = urljoin(page_url, a['href'])
+    return numbered
+
+
+def follow(soup, page_url, page_links, extract_links, seen, headers=None, deadline=None,
+           next_page=find_next_page, max_pages=MAX_PAGES):
+    """
+    Walk the pages after an already parsed first page and return their links.
+    extract_links(soup, url) gives a page's article links. Paging goes on
+    while the page just read still had an unseen link. With nothing seen
+    yet (a first run) there is nothing to compare against, so only the
+    first page is used.
+    """
+    links = LinkSet()
+    visited = LinkSet([page_url])
+    page_number = 1
+    while seen and has_unseen(page_links, seen) and page_number < max_pages:
+        next_url = next_page(soup, page_url, page_number)
+        if deadline is not None and deadline.expired():
+            break
+        if not next_url or not visited.add(next_url):
+            break
+        try:
+            response = http_transport.get(next_url, headers=headers, timeout=10, html_only=True, deadline=deadline)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            print(f"  ⚠️  Could not fetch listing page {page_number + 1}: {e}")
+            break
+        soup = http_transport.parse_html(response)
+        page_url = next_url
+        page_number += 1
+        page_links = [link for link in extract_links(soup, page_url) if links.add(link)]
+    if page_number > 1:
+        print(f"  📄 Read {page_number} listing pages, {len(links)} links beyond the first")
+    return list(links)
@@ -4,17 +4,25 @@ Radio Bihać News Scraper for Facebook Auto-Posting
 Scrapes: https://www.radiobihac.com
 """
 
-import requests
-from bs4 import BeautifulSoup
 import json
 import os
 import hashlib
 from datetime import datetime
 import re
 from urllib.parse import urljoin
-import time
 import sys
 
+import feeds
+import http_transport
+import rate_limit
+from async_fetch import fetch, fetch_all
+from failure_ledger import FailureLedger, failure_reason
+from deadline import source_deadline
+from head_index import HeadIndex
+from link_model import LinkModel, SHORT_CONTENT
+from keywords import Matcher
+from urls import LinkSet
+
 # Configuration
 BASE_URL = "https://www.radiobihac.com"
 OUTPUT_DIR = "facebook_ready_posts"
@@ -23,6 +31,28 @@ HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
 }
 
+# Fetch article pages concurrently instead of one by one
+ASYNC_FETCH = True
+MAX_CONCURRENCY_PER_HOST = 4
+
+# Read only the <head> of new pages first and skip the full download of
+# articles we already have (same canonical URL, or same title and date)
+HEAD_CHECK = True
+
+# Skip new links whose URL pattern has mostly led to duplicates, errors or
+# empty pages on earlier runs, before they are fetched
+URL_MODEL = True
+
+# Politeness towards the host: sustained requests per second and burst size.
+# robots.txt Crawl-delay and Retry-After can only slow this down.
+RATE_PER_SECOND = 0.5
+RATE_BURST = 4
+
+# Link texts with these words lead to programme and station pages, not news
+NON_NEWS_WORDS = Matcher(['emisija', 'program', 'kontakt', 'o nama'])
+# URL words that mark a news article
+NEWS_URL_WORDS = Matcher(['clanak', 'vijest', 'novost', 'news', 'article'])
+
 # Get script name hash for file naming
 SCRIPT_NAME = os.path.basename(sys.argv[0])
 SCRIPT_NAME_HASH = hashlib.md5(SCRIPT_NAME.encode()).hexdigest()[:12]
@@ -43,8 +73,8 @@ def load_scraped_data():
     if os.path.exists(STATE_FILE):
         with open(STATE_FILE, 'r') as f:
             data = json.load(f)
-            return set(data.get('scraped_urls', [])), set(data.get('content_hashes', []))
-    return set(), set()
+            return LinkSet(data.get('scraped_urls', [])), set(data.get('content_hashes', []))
+    return LinkSet(), set()
 
 def save_scraped_data(scraped_urls, content_hashes):
     """Save scraped data to state file"""
@@ -57,6 +87,7 @@ def save_scraped_data(scraped_urls, content_hashes):
     }
     with open(STATE_FILE, 'w') as f:
         json.dump(state, f, indent=2, ensure_ascii=False)
+    http_transport.save_validators()
 
 def clean_text(text):
     """Clean and normalize text"""
@@ -67,14 +98,17 @@ def clean_text(text):
     text = re.sub(r'\s+', ' ', text)
     return text.strip()
 
-def extract_news_details(news_url):
+def extract_news_details(news_url, response=None, deadline=None):
     """Extract full details from a news article page"""
     try:
         print(f"  Fetching: {news_url}")
-        response = requests.get(news_url, headers=HEADERS, timeout=10)
+        if response is None:
+            response = http_transport.get(news_url, headers=HEADERS, timeout=10, html_only=True, deadline=deadline)
+        elif isinstance(response, Exception):
+            raise response
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = http_transport.parse_html(response)
         
         # Extract title
         title = "No Title"
@@ -224,6 +258,9 @@ def extract_news_details(news_url):
             'source': 'Radio Bihać'
         }
         
+    except http_transport.SkippedRequest:
+        # Non-HTML page or unreachable host, already reported by the transport
+        return None
     except Exception as e:
         print(f"  Error extracting details: {e}")
         return None
@@ -267,15 +304,23 @@ def format_for_facebook(news_data):
     
     return fb_post, post_id, content_hash
 
-def scrape_news_links():
+def scrape_news_links(deadline=None):
     """Scrape the main page for news links"""
+    # The site's feed, when it has one, replaces the listing page heuristics below
+    found, feed_urls = feeds.feed_links(SCRIPT_NAME, BASE_URL, headers=HEADERS, deadline=deadline)
+    if found:
+        return feed_urls
+    
     try:
         print(f"Scraping Radio Bihać: {BASE_URL}")
-        response = requests.get(BASE_URL, headers=HEADERS, timeout=15)
+        response = http_transport.get_conditional(BASE_URL, headers=HEADERS, timeout=15, deadline=deadline)
         response.raise_for_status()
+        if response.status_code == 304:
+            print("⏸️  Listing page not modified since last run, skipping")
+            return None
         
-        soup = BeautifulSoup(response.content, 'html.parser')
-        news_links = []
+        soup = http_transport.parse_html(response)
+        news_links = LinkSet()
         
         # Strategy 1: Look for article links in the "AKTUELNO" section
         # The site shows date-stamped news items
@@ -296,11 +341,11 @@ def scrape_news_links():
             is_news_article = False
             
             # Check link text length and content
-            if len(link_text) > 20 and not any(word in link_text.lower() for word in ['emisija', 'program', 'kontakt', 'o nama']):
+            if len(link_text) > 20 and not NON_NEWS_WORDS.search(link_text):
                 is_news_article = True
             
             # Check URL pattern
-            if any(pattern in href.lower() for pattern in ['clanak', 'vijest', 'novost', 'news', 'article']):
+            if NEWS_URL_WORDS.search(href):
                 is_news_article = True
             
             if is_news_article:
@@ -310,8 +355,7 @@ def scrape_news_links():
                 else:
                     full_url = href
                 
-                if full_url not in news_links and full_url != BASE_URL:
-                    news_links.append(full_url)
+                if full_url != BASE_URL and news_links.add(full_url):
                     print(f"  Found: {link_text[:60]}...")
         
         # Strategy 2: Look for date-stamped items (like in the provided content)
@@ -329,13 +373,7 @@ def scrape_news_links():
             # Extract news directly from main page content
             return []  # We'll handle this differently below
         
-        # Remove duplicates
-        unique_links = []
-        seen = set()
-        for link in news_links:
-            if link not in seen:
-                seen.add(link)
-                unique_links.append(link)
+        unique_links = list(news_links)
         
         print(f"Total unique article links: {len(unique_links)}")
         return unique_links[:10]  # Limit to 10 articles
@@ -344,14 +382,14 @@ def scrape_news_links():
         print(f"Error scraping news links: {e}")
         return []
 
-def extract_news_from_main_page():
+def extract_news_from_main_page(deadline=None):
     """Extract news directly from the main page (if no separate article pages)"""
     try:
         print("Extracting news from main page content...")
-        response = requests.get(BASE_URL, headers=HEADERS, timeout=15)
+        response = http_transport.get(BASE_URL, headers=HEADERS, timeout=15, deadline=deadline)
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = http_transport.parse_html(response)
         news_items = []
         
         # Get all text
@@ -408,10 +446,19 @@ def scrape_latest_news():
     
     ensure_dirs()
     scraped_urls, content_hashes = load_scraped_data()
+    failures = FailureLedger(SCRIPT_NAME)
+    heads = HeadIndex(SCRIPT_NAME)
+    model = LinkModel(SCRIPT_NAME)
+    deadline = source_deadline(SCRIPT_NAME)
+    rate_limit.configure(BASE_URL, RATE_PER_SECOND, RATE_BURST)
     new_posts = []
     
     # Try to get news links first
-    news_links = scrape_news_links()
+    news_links = scrape_news_links(deadline)
+    
+    # Listing page unchanged since the last run
+    if news_links is None:
+        return []
     
     if news_links:
         # Process individual article pages
@@ -419,7 +466,29 @@ def scrape_latest_news():
         
         counter = 1
         
+        # Links whose URL pattern rarely held an article are not fetched at all
+        if URL_MODEL:
+            news_links = model.filter(news_links, scraped_urls)
+        
+        # Known articles are recognised from their <head>, before the full download
+        pending = [u for u in news_links if u not in scraped_urls and not failures.should_skip(u)]
+        head_duplicates = {}
+        if HEAD_CHECK:
+            head_duplicates = heads.check(pending, scraped_urls, headers=HEADERS, deadline=deadline)
+        
+        # Download all unseen pages up front; the loop below only parses them
+        prefetched = {}
+        if ASYNC_FETCH:
+            pending = [u for u in pending if u not in head_duplicates]
+            prefetched = fetch_all(pending, headers=HEADERS, timeout=10,
+                                   per_host=MAX_CONCURRENCY_PER_HOST, deadline=deadline)
+        
         for news_url in news_links:
+            # Out of time: stop here, what was scraped so far is still saved below
+            if deadline.expired():
+                print(f"\n⏰ Time budget used up, stopping with partial results")
+                break
+            
             print(f"\n[{counter}/{len(news_links)}] Checking: {news_url}")
             
             # Skip if already scraped
@@ -428,12 +497,36 @@ def scrape_latest_news():
                 counter += 1
                 continue
             
+            # Failed on an earlier run and not due for another try yet
+            if failures.should_skip(news_url):
+                print(f"  ⏳ Skipping, {failures.describe(news_url)}")
+                counter += 1
+                continue
+            
+            # Already have this article under another URL or with the same title and date
+            if news_url in head_duplicates:
+                print(f"  ⚠️  Duplicate, {head_duplicates[news_url]}")
+                scraped_urls.add(news_url)
+                model.record(news_url, False)
+                counter += 1
+                continue
+            
             # Extract details
-            news_details = extract_news_details(news_url)
+            # The page as fetched, or the error, so a broken URL can be told apart from a timeout
+            response = prefetched.get(news_url)
+            if response is None:
+                response = fetch(news_url, headers=HEADERS, timeout=10, deadline=deadline)
+            news_details = extract_news_details(news_url, response, deadline)
             if not news_details:
                 print("  ❌ Could not extract details")
+                reason = failure_reason(response)
+                failures.record_failure(news_url, reason)
+                # Timeouts and outages say nothing about the URL pattern
+                if reason is not None:
+                    model.record(news_url, False)
                 counter += 1
                 continue
+            failures.record_success(news_url)
             
             print(f"  Title: {news_details['title'][:60]}...")
             print(f"  Content: {len(news_details['content'])} chars")
@@ -447,6 +540,8 @@ def scrape_latest_news():
             if content_hash in content_hashes:
                 print(f"  ⚠️  Duplicate content detected")
                 scraped_urls.add(news_url)
+                heads.add(news_url)
+                model.record(news_url, False)
                 counter += 1
                 continue
             
@@ -464,6 +559,8 @@ def scrape_latest_news():
                 # Update tracking
                 scraped_urls.add(news_url)
                 content_hashes.add(content_hash)
+                heads.add(news_url)
+                model.record(news_url, len(news_details['content']) >= SHORT_CONTENT)
                 new_posts.append({
                     'filename': filename,
                     'title': news_details['title'],
@@ -475,12 +572,11 @@ def scrape_latest_news():
                 print(f"  ❌ Error saving: {e}")
             
             counter += 1
-            time.sleep(2)
     
     else:
         # If no individual article pages, extract from main page
         print("\nNo individual article pages found, extracting from main page...")
-        news_items = extract_news_from_main_page()
+        news_items = extract_news_from_main_page(deadline)
         
         if news_items:
             print(f"\nProcessing {len(news_items)} news items from main page...")
@@ -530,8 +626,16 @@ def scrape_latest_news():
                 
                 counter += 1
     
+    # A listing only counts as read once all its links were handled; otherwise the next run reads it again
+    unhandled = [u for u in news_links if u not in scraped_urls and not failures.recorded(u)]
+    if unhandled:
+        http_transport.discard_validators([BASE_URL, feeds.known_feed(SCRIPT_NAME, BASE_URL)])
+    
     # Save state
     save_scraped_data(scraped_urls, content_hashes)
+    failures.save()
+    heads.save()
+    model.save()
     
     print(f"\n" + "=" * 60)
     print(f"Scraping completed!")
@@ -562,6 +666,7 @@ def main():
     else:
         print("\nℹ️  No new posts found.")
     
+    http_transport.print_stats()
     print(f"✅ Check the '{OUTPUT_DIR}' directory for JSON files.")
     print("=" * 60)
 
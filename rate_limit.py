@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Per-host politeness for the shared HTTP transport
+A token bucket per host lets a few requests through at once and then paces
+the rest; robots.txt Crawl-delay and Retry-After can only slow it down
+"""
+
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+# Defaults for hosts no scraper has configured
+DEFAULT_RATE = 1.0      # sustained requests per second
+DEFAULT_BURST = 4       # requests allowed back to back after an idle spell
+MAX_RETRY_AFTER = 120   # longer Retry-After values are cut to this many seconds
+
+_buckets = {}
+_lock = threading.Lock()
+
+
+class TokenBucket:
+    """Token bucket that hands out waits instead of refusing requests"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.crawl_rate = None      # from robots.txt, caps whatever is configured
+
+    def reserve(self):
+        """Take a token and return how long the caller must wait before using it"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(wait, self.blocked_until - now)
+
+
+def _bucket(host):
+    bucket = _buckets.get(host)
+    if bucket is None:
+        bucket = _buckets[host] = TokenBucket(DEFAULT_RATE, DEFAULT_BURST)
+    return bucket
+
+
+def configure(site, rate, burst):
+    """
+    Set the rate for a site (URL or bare host) as configured by its scraper.
+    A Crawl-delay already read from robots.txt still caps it.
+    """
+    host = urlparse(site).netloc.lower() or site.lower()
+    with _lock:
+        bucket = _bucket(host)
+        bucket.rate = min(rate, bucket.crawl_rate) if bucket.crawl_rate else rate
+        bucket.burst = 1 if bucket.crawl_rate else burst
+        bucket.tokens = min(bucket.tokens, bucket.burst)
+
+
+def set_crawl_delay(host, delay):
+    """Apply robots.txt Crawl-delay: one request per `delay` seconds, no bursts"""
+    if not delay or delay <= 0:
+        return
+    with _lock:
+        bucket = _bucket(host)
+        bucket.crawl_rate = 1.0 / delay
+        bucket.rate = min(bucket.rate, bucket.crawl_rate)
+        bucket.burst = 1
+        bucket.tokens = min(bucket.tokens, 1)
+    print(f"  🤖 {host} asks for a crawl delay of {delay}s")
+
+
+def pause(host, seconds):
+    """Hold all requests to a host for a while, e.g. after Retry-After"""
+    seconds = min(seconds, MAX_RETRY_AFTER)
+    with _lock:
+        bucket = _bucket(host)
+        bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + seconds)
+
+
+def parse_retry_after(value):
+    """Seconds from a Retry-After header (delta or HTTP date), or None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return int(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def acquire(host, deadline=None):
+    """Wait until the host's bucket allows another request"""
+    with _lock:
+        wait = _bucket(host).reserve()
+    if wait > 0:
+        if deadline is not None:
+            deadline.sleep(wait)
+        else:
+            time.sleep(wait)
@@ -4,17 +4,24 @@ RTV USK News Scraper - WORKING VERSION
 Scrapes: https://www.rtvusk.ba/kategorija/kanton-krajina/2
 """
 
-import requests
-from bs4 import BeautifulSoup
 import json
 import os
 import hashlib
 from datetime import datetime
 import re
 from urllib.parse import urljoin
-import time
 import sys
 
+import feeds
+import http_transport
+import rate_limit
+from async_fetch import fetch, fetch_all
+from failure_ledger import FailureLedger, failure_reason
+from deadline import source_deadline
+from head_index import HeadIndex
+from keywords import Matcher
+from urls import LinkSet
+
 # Configuration
 BASE_URL = "https://www.rtvusk.ba/kategorija/kanton-krajina/2"
 OUTPUT_DIR = "facebook_ready_posts"
@@ -23,6 +30,22 @@ HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
 }
 
+# Fetch article pages concurrently instead of one by one
+ASYNC_FETCH = True
+MAX_CONCURRENCY_PER_HOST = 4
+
+# Read only the <head> of new pages first and skip the full download of
+# articles we already have (same canonical URL, or same title and date)
+HEAD_CHECK = True
+
+# Politeness towards the host: sustained requests per second and burst size.
+# robots.txt Crawl-delay and Retry-After can only slow this down.
+RATE_PER_SECOND = 0.5
+RATE_BURST = 4
+
+# Paragraphs with these are share buttons and comment boxes, not article text
+SHARE_WORDS = Matcher(['share', 'facebook', 'twitter', 'komentar'])
+
 # Get script name hash
 SCRIPT_NAME = os.path.basename(sys.argv[0])
 SCRIPT_NAME_HASH = hashlib.md5(SCRIPT_NAME.encode()).hexdigest()[:12]
@@ -40,8 +63,8 @@ def load_scraped_data():
     if os.path.exists(STATE_FILE):
         with open(STATE_FILE, 'r') as f:
             data = json.load(f)
-            return set(data.get('scraped_urls', [])), set(data.get('content_hashes', []))
-    return set(), set()
+            return LinkSet(data.get('scraped_urls', [])), set(data.get('content_hashes', []))
+    return LinkSet(), set()
 
 def save_scraped_data(scraped_urls, content_hashes):
     state = {
@@ -52,6 +75,7 @@ def save_scraped_data(scraped_urls, content_hashes):
     }
     with open(STATE_FILE, 'w') as f:
         json.dump(state, f, indent=2, ensure_ascii=False)
+    http_transport.save_validators()
 
 def clean_text(text):
     if not text:
@@ -61,13 +85,16 @@ def clean_text(text):
     text = re.sub(r'\s+', ' ', text)
     return text.strip()
 
-def extract_news_details(news_url):
+def extract_news_details(news_url, response=None, deadline=None):
     try:
         print(f"  Fetching: {news_url}")
-        response = requests.get(news_url, headers=HEADERS, timeout=10)
+        if response is None:
+            response = http_transport.get(news_url, headers=HEADERS, timeout=10, html_only=True, deadline=deadline)
+        elif isinstance(response, Exception):
+            raise response
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = http_transport.parse_html(response)
         
         # Extract title - from h1 or h2
         title = "No Title"
@@ -106,7 +133,7 @@ def extract_news_details(news_url):
             meaningful = []
             for p in paragraphs:
                 text = clean_text(p.get_text())
-                if len(text) > 30 and not any(word in text.lower() for word in ['share', 'facebook', 'twitter', 'komentar']):
+                if len(text) > 30 and not SHARE_WORDS.search(text):
                     meaningful.append(text)
             
             if meaningful:
@@ -147,6 +174,9 @@ def extract_news_details(news_url):
             'source': 'RTV USK'
         }
         
+    except http_transport.SkippedRequest:
+        # Non-HTML page or unreachable host, already reported by the transport
+        return None
     except Exception as e:
         print(f"  Error extracting details: {e}")
         return None
@@ -186,19 +216,27 @@ def format_for_facebook(news_data):
     
     return fb_post, post_id, content_hash
 
-def scrape_news_links():
+def scrape_news_links(deadline=None):
     """Scrape news links from h2 elements (as shown in diagnostic)"""
+    # The site's feed, when it has one, replaces the listing page heuristics below
+    found, feed_urls = feeds.feed_links(SCRIPT_NAME, BASE_URL, headers=HEADERS, deadline=deadline)
+    if found:
+        return feed_urls
+    
     try:
         print(f"Scraping RTV USK: {BASE_URL}")
-        response = requests.get(BASE_URL, headers=HEADERS, timeout=15)
+        response = http_transport.get_conditional(BASE_URL, headers=HEADERS, timeout=15, deadline=deadline)
         response.raise_for_status()
+        if response.status_code == 304:
+            print("⏸️  Listing page not modified since last run, skipping")
+            return None
         
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = http_transport.parse_html(response)
         
         # Find all h2 elements - they contain article links
         h2_elements = soup.find_all('h2')
         
-        news_links = []
+        news_links = LinkSet()
         
         print(f"Found {len(h2_elements)} h2 elements")
         
@@ -226,30 +264,20 @@ def scrape_news_links():
                     href = urljoin(BASE_URL, href)
                 
                 # Only include /clanak/ URLs
-                if '/clanak/' in href and href not in news_links:
-                    news_links.append(href)
+                if '/clanak/' in href and news_links.add(href):
                     print(f"  Found: {text[:50]}...")
         
         # Also look for other article links
         all_links = soup.find_all('a', href=True)
         for link in all_links:
             href = link.get('href')
-            if '/clanak/' in href and href not in news_links:
-                full_url = urljoin(BASE_URL, href)
-                if full_url not in news_links:
-                    news_links.append(full_url)
+            if '/clanak/' in href:
+                news_links.add(urljoin(BASE_URL, href))
         
         print(f"Total article links found: {len(news_links)}")
         
-        # Return unique links, limit to 10
-        unique_links = []
-        seen = set()
-        for link in news_links[:15]:  # Check first 15
-            if link not in seen:
-                seen.add(link)
-                unique_links.append(link)
-        
-        return unique_links
+        # Links are unique already; check the first 15
+        return list(news_links)[:15]
         
     except Exception as e:
         print(f"Error scraping links: {e}")
@@ -258,10 +286,18 @@ def scrape_news_links():
 def scrape_latest_news():
     ensure_dirs()
     scraped_urls, content_hashes = load_scraped_data()
+    failures = FailureLedger(SCRIPT_NAME)
+    heads = HeadIndex(SCRIPT_NAME)
+    deadline = source_deadline(SCRIPT_NAME)
+    rate_limit.configure(BASE_URL, RATE_PER_SECOND, RATE_BURST)
     new_posts = []
     
     # Get news links
-    news_links = scrape_news_links()
+    news_links = scrape_news_links(deadline)
+    
+    # Listing page unchanged since the last run
+    if news_links is None:
+        return []
     
     if not news_links:
         print("No news links found!")
@@ -271,7 +307,25 @@ def scrape_latest_news():
     
     counter = 1
     
+    # Known articles are recognised from their <head>, before the full download
+    pending = [u for u in news_links if u not in scraped_urls and not failures.should_skip(u)]
+    head_duplicates = {}
+    if HEAD_CHECK:
+        head_duplicates = heads.check(pending, scraped_urls, headers=HEADERS, deadline=deadline)
+    
+    # Download all unseen pages up front; the loop below only parses them
+    prefetched = {}
+    if ASYNC_FETCH:
+        pending = [u for u in pending if u not in head_duplicates]
+        prefetched = fetch_all(pending, headers=HEADERS, timeout=10,
+                               per_host=MAX_CONCURRENCY_PER_HOST, deadline=deadline)
+    
     for news_url in news_links:
+        # Out of time: stop here, what was scraped so far is still saved below
+        if deadline.expired():
+            print(f"\n⏰ Time budget used up, stopping with partial results")
+            break
+        
         print(f"\n[{counter}/{len(news_links)}] Checking: {news_url}")
         
         # Skip if already scraped
@@ -280,12 +334,31 @@ def scrape_latest_news():
             counter += 1
             continue
         
+        # Failed on an earlier run and not due for another try yet
+        if failures.should_skip(news_url):
+            print(f"  ⏳ Skipping, {failures.describe(news_url)}")
+            counter += 1
+            continue
+        
+        # Already have this article under another URL or with the same title and date
+        if news_url in head_duplicates:
+            print(f"  ⚠️  Duplicate, {head_duplicates[news_url]}")
+            scraped_urls.add(news_url)
+            counter += 1
+            continue
+        
         # Extract details
-        news_details = extract_news_details(news_url)
+        # The page as fetched, or the error, so a broken URL can be told apart from a timeout
+        response = prefetched.get(news_url)
+        if response is None:
+            response = fetch(news_url, headers=HEADERS, timeout=10, deadline=deadline)
+        news_details = extract_news_details(news_url, response, deadline)
         if not news_details:
             print("  ❌ Could not extract details")
+            failures.record_failure(news_url, failure_reason(response))
             counter += 1
             continue
+        failures.record_success(news_url)
         
         print(f"  Title: {news_details['title'][:60]}...")
         print(f"  Content: {len(news_details['content'])} chars")
@@ -299,6 +372,7 @@ def scrape_latest_news():
         if content_hash in content_hashes:
             print(f"  ⚠️  Duplicate content detected")
             scraped_urls.add(news_url)
+            heads.add(news_url)
             counter += 1
             continue
         
@@ -316,6 +390,7 @@ def scrape_latest_news():
             # Update tracking
             scraped_urls.add(news_url)
             content_hashes.add(content_hash)
+            heads.add(news_url)
             new_posts.append({
                 'filename': filename,
                 'title': news_details['title'],
@@ -327,10 +402,16 @@ def scrape_latest_news():
             print(f"  ❌ Error saving: {e}")
         
         counter += 1
-        time.sleep(2)  # Be polite
+    
+    # A listing only counts as read once all its links were handled; otherwise the next run reads it again
+    unhandled = [u for u in news_links if u not in scraped_urls and not failures.recorded(u)]
+    if unhandled:
+        http_transport.discard_validators([BASE_URL, feeds.known_feed(SCRIPT_NAME, BASE_URL)])
     
     # Save state
     save_scraped_data(scraped_urls, content_hashes)
+    failures.save()
+    heads.save()
     
     print(f"\n" + "=" * 60)
     print(f"Scraping completed!")
@@ -360,6 +441,7 @@ def main():
     else:
         print("\nℹ️  No new posts found.")
     
+    http_transport.print_stats()
     print(f"✅ Check the '{OUTPUT_DIR}' directory for JSON files.")
     print("=" * 60)
 
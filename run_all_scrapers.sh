@@ -25,6 +25,13 @@ LOG_FILE="/home/bihac-danas/web-scraper/scraper_log.txt"
 OUTPUT_DIR="/home/bihac-danas/web-scraper/facebook_ready_posts"
 EMAIL_LOG="/home/bihac-danas/web-scraper/email_sent.log"
 
+# Time budget for the whole run in seconds; stays under the dashboard's 300s limit.
+# Each scraper gets its own slice (see deadline.py) and stops with partial results.
+RUN_BUDGET=${SCRAPER_RUN_BUDGET:-270}
+export SCRAPER_RUN_DEADLINE=$(( $(date +%s) + RUN_BUDGET ))
+# Grace period after the run deadline before a scraper is killed outright
+KILL_GRACE=30
+
 # Colors for output
 RED='\033[0;31m'
 GREEN='\033[0;32m'
@@ -60,9 +67,17 @@ for scraper in "${SCRAPERS[@]}"; do
         continue
     fi
 
-    # Run the scraper with virtual environment Python
+    # Nothing left of the run budget
     START_TIME=$(date +%s)
-    $PYTHON "$scraper" 2>&1 | tee -a "$LOG_FILE"
+    if [ "$START_TIME" -ge "$SCRAPER_RUN_DEADLINE" ]; then
+        echo -e "  ${YELLOW}⏰ Run time budget used up, skipping${NC}" | tee -a "$LOG_FILE"
+        FAILED_SCRAPERS+=("$scraper")
+        continue
+    fi
+
+    # Run the scraper with virtual environment Python; it stops itself at the
+    # deadline, the timeout only catches one that hangs
+    timeout $(( SCRAPER_RUN_DEADLINE - START_TIME + KILL_GRACE )) $PYTHON "$scraper" 2>&1 | tee -a "$LOG_FILE"
     SCRAPER_EXIT=${PIPESTATUS[0]}
     END_TIME=$(date +%s)
     DURATION=$((END_TIME - START_TIME))
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Run several scrapers in one process
+The sources share the HTTP transport, its caches and the fair download
+scheduler, so article downloads from all of them take turns host by host
+Usage: python3 run_sources.py [scraper.py ...]
+"""
+
+import importlib.util
+import os
+import sys
+import threading
+import time
+
+import http_transport
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Same sources as run_all_scrapers.sh
+SOURCES = [
+    "vladausk.py",
+    "kbbihac.py",
+    "kcbihac.py",
+    "rtvusk.py",
+    "radiobihac.py",
+    "vodovod-bihac.py",
+    "usnkrajina.py",
+    "bihac-org.py",
+]
+
+
+def load_source(script):
+    """Import a scraper script as a module; its name may contain dashes"""
+    path = os.path.join(SCRIPT_DIR, script)
+    name = os.path.splitext(script)[0].replace('-', '_')
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    # The procedural scrapers name their output files after sys.argv[0]
+    argv0 = sys.argv[0]
+    sys.argv[0] = path
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        sys.argv[0] = argv0
+    return module
+
+
+def run_source(script, module, results):
+    """Run one scraper's main() and record how it went"""
+    start = time.monotonic()
+    try:
+        module.main()
+        results[script] = ('success', time.monotonic() - start)
+    except Exception as e:
+        print(f"❌ {script} failed: {e}")
+        results[script] = ('failed', time.monotonic() - start)
+
+
+def main():
+    scripts = sys.argv[1:] or SOURCES
+    print(f"🚀 Running {len(scripts)} sources in one process")
+
+    # Import one by one (sys.argv[0] is swapped per script), then run side by side
+    modules = {}
+    results = {}
+    for script in scripts:
+        try:
+            modules[script] = load_source(script)
+        except Exception as e:
+            print(f"❌ Could not load {script}: {e}")
+            results[script] = ('failed', 0.0)
+
+    threads = [threading.Thread(target=run_source, args=(script, module, results), name=script)
+               for script, module in modules.items()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # The sources share the run's memo while they run; nothing needs it afterwards
+    http_transport.clear_memo()
+
+    print("\n" + "=" * 60)
+    print("📊 RESUME:")
+    for script in scripts:
+        status, seconds = results.get(script, ('failed', 0.0))
+        icon = "✓" if status == 'success' else "✗"
+        print(f"  {icon} {script}: {status} ({seconds:.0f}s)")
+    http_transport.print_stats()
+
+    return 0 if all(status == 'success' for status, _ in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
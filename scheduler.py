@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Fair scheduling of page downloads across hosts
+Every host gets its own queue and the queues are served round-robin under
+one global concurrency cap, so a long backlog on one host cannot starve
+the others
+"""
+
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+import concurrency
+
+# Configuration
+GLOBAL_CONCURRENCY = 16     # downloads running at once, over all hosts
+DEFAULT_PER_HOST = 4        # downloads running at once against one host, when not adaptive
+ADAPTIVE_PER_HOST = True    # let concurrency.py pick each host's limit from its latency
+# Jobs a host may start per round-robin turn; hosts not listed get 1
+HOST_WEIGHTS = {}
+
+
+class FairScheduler:
+    """Weighted round-robin over per-host FIFO queues, run by a fixed pool of threads"""
+
+    def __init__(self, max_workers=GLOBAL_CONCURRENCY, per_host=DEFAULT_PER_HOST):
+        self.max_workers = max_workers
+        self.default_per_host = per_host
+        self._queues = {}           # host -> deque of (future, fn, args, kwargs)
+        self._rotation = deque()    # hosts with queued work, next one first
+        self._active = {}           # host -> running jobs
+        self._limits = {}           # host -> per-host concurrency
+        self._credit = {}           # host -> jobs left in its current turn
+        self._cond = threading.Condition()
+        self._workers = []
+
+    def submit(self, host, fn, *args, per_host=None, **kwargs):
+        """
+        Queue fn(*args, **kwargs) for a host and return a Future for its result.
+        `per_host` only applies when ADAPTIVE_PER_HOST is off.
+        """
+        future = Future()
+        with self._cond:
+            if per_host is not None:
+                self._limits[host] = per_host
+            queue = self._queues.setdefault(host, deque())
+            if not queue and host not in self._rotation:
+                self._rotation.append(host)
+            queue.append((future, fn, args, kwargs))
+            if len(self._workers) < self.max_workers:
+                worker = threading.Thread(target=self._work, daemon=True)
+                self._workers.append(worker)
+                worker.start()
+            self._cond.notify()
+        return future
+
+    def _runnable(self, host):
+        if ADAPTIVE_PER_HOST:
+            host_limit = concurrency.limit(host)
+        else:
+            host_limit = self._limits.get(host, self.default_per_host)
+        return self._active.get(host, 0) < host_limit
+
+    def _next_job(self):
+        """Pick the next job, taking turns between hosts; waits while nothing can run"""
+        with self._cond:
+            while True:
+                for _ in range(len(self._rotation)):
+                    host = self._rotation[0]
+                    if not self._runnable(host):
+                        self._rotation.rotate(-1)
+                        continue
+                    credit = self._credit.get(host) or HOST_WEIGHTS.get(host, 1)
+                    job = self._queues[host].popleft()
+                    self._active[host] = self._active.get(host, 0) + 1
+                    if not self._queues[host]:
+                        # Nothing left; the host rejoins at the back when work arrives
+                        self._rotation.popleft()
+                        self._credit.pop(host, None)
+                    elif credit > 1:
+                        self._credit[host] = credit - 1
+                    else:
+                        self._credit.pop(host, None)
+                        self._rotation.rotate(-1)
+                    return host, job
+                self._cond.wait()
+
+    def _work(self):
+        while True:
+            host, (future, fn, args, kwargs) = self._next_job()
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                except BaseException as e:
+                    future.set_exception(e)
+            with self._cond:
+                self._active[host] -= 1
+                self._cond.notify_all()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Return the process-wide scheduler, shared by every source in the process"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = FairScheduler()
+    return _scheduler
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Incremental article discovery from sitemaps
+Sitemaps are fetched conditionally and parsed while they stream in, and
+only URLs whose <lastmod> is newer than the source's high-water mark are
+returned, so a busy day is never cut off at a fixed number of links
+"""
+
+import json
+import os
+import re
+import tempfile
+import threading
+import zlib
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+
+import requests
+
+import http_cache
+import http_transport
+from urls import LinkSet, url_key
+
+# High-water marks and discovered sitemaps per source; lives next to the scripts
+SITEMAPS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sitemaps.json")
+USE_SITEMAPS = True
+REDISCOVER_AFTER = timedelta(days=7)    # look again this long after finding no sitemap
+FIRST_RUN_WINDOW = timedelta(days=2)    # without a high-water mark, only this much history is taken
+# Tried after the Sitemap: lines of robots.txt
+SITEMAP_PATHS = ['/sitemap.xml', '/sitemap_index.xml', '/wp-sitemap.xml']
+# Child sitemaps that never list articles (WordPress core, Yoast, Rank Math, Joomla)
+SKIP_SITEMAPS = re.compile(r'categor|tag|author|user|taxonom|page-sitemap|posts-page|attachment|menu', re.I)
+
+SM = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+_file_lock = threading.Lock()
+_pending = {}       # source -> (high-water mark, [(url, response)], {url key: lastmod}) waiting for commit()
+_pending_lock = threading.Lock()
+
+
+def load_all():
+    """Return all sources as {source: {'sitemaps', 'high_water', 'checked'}}"""
+    try:
+        with open(SITEMAPS_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save(source, entry):
+    with _file_lock:
+        data = load_all()
+        data[source] = entry
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(SITEMAPS_FILE), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, SITEMAPS_FILE)
+        except Exception as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            print(f"⚠️  Could not save sitemap state: {e}")
+
+
+def parse_lastmod(value):
+    """W3C datetime (full or date only) as an aware UTC datetime, or None"""
+    value = (value or '').strip()
+    if not value:
+        return None
+    try:
+        moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+
+def _stream(url, headers, deadline):
+    """
+    Yield ('sitemap' | 'url', loc, lastmod) while the document downloads.
+    Returns the response (None on 304 or failure) as the generator's value.
+    """
+    merged = dict(headers or {})
+    merged.update(http_cache.conditional_headers(url))
+    try:
+        response = http_transport.get(url, headers=merged, timeout=20, use_cache=False, stream=True,
+                                      deadline=deadline)
+    except requests.RequestException as e:
+        print(f"  ⚠️  Could not fetch {url}: {e}")
+        return None
+    if response.status_code != 200:
+        response.close()
+        return None
+
+    parser = ET.XMLPullParser(events=('end',))
+    # .xml.gz files are usually served as gzip files rather than with Content-Encoding
+    gunzip = None
+    if urlsplit(url).path.endswith('.gz') and not response.headers.get('Content-Encoding'):
+        gunzip = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    try:
+        for chunk in response.iter_content(http_transport.CHUNK_SIZE):
+            parser.feed(gunzip.decompress(chunk) if gunzip else chunk)
+            for _, elem in parser.read_events():
+                if elem.tag in (f'{SM}url', f'{SM}sitemap'):
+                    kind = 'url' if elem.tag == f'{SM}url' else 'sitemap'
+                    yield kind, (elem.findtext(f'{SM}loc') or '').strip(), elem.findtext(f'{SM}lastmod')
+                    # Entries are done with; keep memory flat on large sitemaps
+                    elem.clear()
+    except ET.ParseError as e:
+        print(f"  ⚠️  {url} is not a valid sitemap: {e}")
+        return None
+    finally:
+        response.close()
+    return response
+
+
+def discover_sitemaps(site, headers=None, deadline=None):
+    """Sitemap URLs for a site: robots.txt Sitemap: lines first, then the usual locations"""
+    parts = urlsplit(site)
+    root = f"{parts.scheme}://{parts.netloc}"
+    candidates = []
+    try:
+        # Already fetched for Crawl-delay, so normally served from the run memo
+        robots = http_transport.get(f"{root}/robots.txt", timeout=10, deadline=deadline, polite=False)
+        if robots.status_code == 200:
+            for line in robots.text.splitlines():
+                if line.lower().startswith('sitemap:'):
+                    candidates.append(line.split(':', 1)[1].strip())
+    except requests.RequestException:
+        pass
+    candidates.extend(root + path for path in SITEMAP_PATHS)
+
+    for url in dict.fromkeys(candidates):
+        try:
+            response = http_transport.get(url, headers=headers, timeout=15, deadline=deadline)
+        except requests.RequestException:
+            continue
+        if response.status_code == 200 and re.search(rb'<(urlset|sitemapindex)\b', response.content[:2048]):
+            return [url]
+    return []
+
+
+def sitemap_links(source, site, url_pattern=None, headers=None, deadline=None):
+    """
+    URLs from the site's sitemaps with a <lastmod> newer than the source's
+    high-water mark, optionally only those matching `url_pattern`. Child
+    sitemaps of an index are only opened when their own lastmod is newer.
+    Returns None when the site has no sitemap, or its entries carry no
+    <lastmod> to compare, so the caller can fall back.
+    Call commit() once the URLs have been processed to move the mark.
+    """
+    if not USE_SITEMAPS:
+        return None
+    entry = load_all().get(source) or {}
+    sitemaps = entry.get('sitemaps')
+    checked = entry.get('checked')
+    if not sitemaps and (not checked or datetime.now() - datetime.fromisoformat(checked) >= REDISCOVER_AFTER):
+        print(f"🔎 Looking for a sitemap for {site}")
+        sitemaps = discover_sitemaps(site, headers=headers, deadline=deadline)
+        entry = {'sitemaps': sitemaps, 'high_water': entry.get('high_water'),
+                 'checked': datetime.now().isoformat()}
+        _save(source, entry)
+    if not sitemaps:
+        return None
+
+    high_water = parse_lastmod(entry.get('high_water'))
+    if high_water is None:
+        high_water = datetime.now(timezone.utc) - FIRST_RUN_WINDOW
+    newest = high_water
+    pattern = re.compile(url_pattern, re.I) if url_pattern else None
+    links = []
+    lastmods = {}
+    dated = undated = 0
+    fetched = []
+    queue = list(sitemaps)
+    seen = set()
+    complete = True
+    while queue:
+        url = queue.pop(0)
+        if url in seen:
+            continue
+        if deadline is not None and deadline.expired():
+            complete = False
+            break
+        seen.add(url)
+        stream = _stream(url, headers, deadline)
+        try:
+            while True:
+                kind, loc, lastmod = next(stream)
+                modified = parse_lastmod(lastmod)
+                if kind == 'sitemap':
+                    if not SKIP_SITEMAPS.search(loc) and (modified is None or modified > high_water):
+                        queue.append(loc)
+                    continue
+                if modified is None:
+                    undated += 1
+                    continue
+                dated += 1
+                if modified > high_water and (not pattern or pattern.search(loc)):
+                    links.append(loc)
+                    lastmods[url_key(loc)] = modified
+                    newest = max(newest, modified)
+        except StopIteration as done:
+            if done.value is not None:
+                fetched.append((url, done.value))
+
+    # Without any <lastmod> nothing can be told apart from old entries (WordPress core, Joomla)
+    if undated and not dated:
+        print("🗺️  Sitemap entries have no <lastmod>, not using the sitemap")
+        return None
+
+    # A sitemap left unread keeps the old mark, so its entries come back next run
+    if complete:
+        with _pending_lock:
+            _pending[source] = (newest, fetched, lastmods)
+    links = list(LinkSet(links))
+    print(f"🗺️  Sitemap: {len(links)} URLs changed since {high_water:%Y-%m-%d %H:%M}")
+    return links
+
+
+def commit(source, unhandled=()):
+    """
+    Store the high-water mark and sitemap validators from this run's
+    sitemap_links(). `unhandled` are the returned URLs that were neither
+    scraped nor recorded as failed (transient errors, the deadline): the
+    mark then stops just below the oldest of them and the sitemaps are not
+    marked as unchanged, so the next run reads those entries again.
+    """
+    with _pending_lock:
+        pending = _pending.pop(source, None)
+    if not pending:
+        return
+    newest, fetched, lastmods = pending
+    left = [lastmods[key] for key in map(url_key, unhandled) if key in lastmods]
+    if left:
+        newest = min(newest, min(left) - timedelta(microseconds=1))
+        print(f"🗺️  {len(left)} sitemap URLs not handled, keeping them for the next run")
+    else:
+        for url, response in fetched:
+            http_cache.remember_validators(url, response)
+        http_cache.save_validators()
+    entry = load_all().get(source) or {}
+    entry['high_water'] = newest.isoformat()
+    _save(source, entry)
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+URL canonicalization shared by the scrapers
+One form per article: lowercase host, no default port, fragment or
+tracking parameters, and learned permanent redirects applied, so the
+same page found as http/https, with or without a trailing slash or
+behind an old 301 is fetched and remembered once
+"""
+
+import json
+import os
+import re
+import tempfile
+import threading
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Learned permanent redirects per host; lives next to the scripts
+REDIRECTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "redirects.json")
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = re.compile(r'^(utm_\w+|fbclid|gclid|dclid|msclkid|mc_cid|mc_eid|igshid|_ga)$', re.I)
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+MAX_HOPS = 5        # redirect chains longer than this are not followed from the map
+
+_redirects = None
+_changed = False
+_lock = threading.Lock()
+
+
+def clean(url):
+    """URL without the parts that never change the page"""
+    parts = urlsplit((url or '').strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = parts.query
+    if query:
+        params = parse_qsl(query, keep_blank_values=True)
+        kept = [(name, value) for name, value in params if not TRACKING_PARAMS.match(name)]
+        if len(kept) != len(params):
+            query = urlencode(kept)
+    return urlunsplit((scheme, host, parts.path or '/', query, ''))
+
+
+def _key(cleaned):
+    """Identity of a cleaned URL: scheme and trailing slash do not count"""
+    parts = urlsplit(cleaned)
+    path = parts.path.rstrip('/') or '/'
+    return f"{parts.netloc}{path}" + (f"?{parts.query}" if parts.query else '')
+
+
+def _load_redirects():
+    global _redirects
+    if _redirects is None:
+        try:
+            with open(REDIRECTS_FILE, 'r', encoding='utf-8') as f:
+                _redirects = json.load(f)
+        except (OSError, ValueError):
+            _redirects = {}
+    return _redirects
+
+
+def resolve(url):
+    """The end of a learned permanent redirect chain starting at url, or url itself"""
+    cleaned = clean(url)
+    with _lock:
+        redirects = _load_redirects()
+        for _ in range(MAX_HOPS):
+            target = redirects.get(urlsplit(cleaned).netloc, {}).get(_key(cleaned))
+            if not target or target == cleaned:
+                break
+            cleaned = target
+    return cleaned
+
+
+def canonical(url):
+    """The one form of a URL the scrapers fetch and store"""
+    return resolve(url)
+
+
+def url_key(url):
+    """Key under which equivalent URLs compare equal"""
+    return _key(canonical(url))
+
+
+def learn_redirect(url, final_url):
+    """Remember that url permanently moves to final_url; saved by save_redirects()"""
+    global _changed
+    source, target = clean(url), clean(final_url)
+    if source == target:
+        return
+    with _lock:
+        entries = _load_redirects().setdefault(urlsplit(source).netloc, {})
+        if entries.get(_key(source)) != target:
+            entries[_key(source)] = target
+            _changed = True
+
+
+def save_redirects():
+    """Write the redirect map, merged with what other scrapers saved meanwhile"""
+    global _changed
+    with _lock:
+        if not _changed:
+            return
+        redirects = _load_redirects()
+        try:
+            with open(REDIRECTS_FILE, 'r', encoding='utf-8') as f:
+                for host, entries in json.load(f).items():
+                    redirects[host] = {**entries, **redirects.get(host, {})}
+        except (OSError, ValueError):
+            pass
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(REDIRECTS_FILE), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(redirects, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, REDIRECTS_FILE)
+            _changed = False
+        except Exception as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            print(f"⚠️  Could not save redirects: {e}")
+
+
+class LinkSet:
+    """Ordered set of URLs: one canonical entry per page, in the order first added"""
+
+    def __init__(self, urls=()):
+        self._links = {}
+        self.update(urls)
+
+    def add(self, url):
+        """Add a URL; False when the same page is already in the set"""
+        target = canonical(url)
+        key = _key(target)
+        if key in self._links:
+            return False
+        self._links[key] = target
+        return True
+
+    def update(self, urls):
+        for url in urls:
+            self.add(url)
+
+    def discard(self, url):
+        self._links.pop(url_key(url), None)
+
+    def __contains__(self, url):
+        return url_key(url) in self._links
+
+    def __iter__(self):
+        return iter(list(self._links.values()))
+
+    def __len__(self):
+        return len(self._links)
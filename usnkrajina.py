@@ -4,7 +4,6 @@ USN Krajina News Scraper
 Updated with better content extraction
 """
 
-import requests
 import hashlib
 import json
 import os
@@ -12,7 +11,16 @@ import sys
 import re
 from datetime import datetime
 from urllib.parse import urljoin
-from bs4 import BeautifulSoup
+
+import feeds
+import http_transport
+import sitemaps
+import wp_api
+from failure_ledger import FailureLedger, failure_reason
+from deadline import source_deadline
+from head_index import HeadIndex
+from keywords import Matcher
+from urls import LinkSet
 
 class USNKrajinaScraper:
     def __init__(self):
@@ -21,21 +29,41 @@ class USNKrajinaScraper:
         self.script_hash = self.get_script_hash()[:12]
         self.output_dir = "/home/bihac-danas/web-scraper/facebook_ready_posts"
         self.state_file = "usnkrajina_state.json"
+        self.default_image_url = "https://usnkrajina.com.ba/wp-content/uploads/2021/11/cropped-usn_logo-1.png"
         
         # State tracking
-        self.scraped_urls = set()
+        self.scraped_urls = LinkSet()
         self.content_hashes = set()
         self.new_posts = []
+        self.failures = FailureLedger(self.script_name)
+        self.heads = HeadIndex(self.script_name)
+        # Read only the <head> of new pages first and skip the full download of known articles
+        self.head_check = True
+        # Paragraphs with these are navigation, footers and share bars, not article text
+        self.boilerplate_words = Matcher(['menu', 'home', 'contact', 'copyright', 'privacy', 'terms', 'cookie',
+                                          'facebook', 'twitter', 'instagram', 'linkedin', 'youtube',
+                                          'search', 'login', 'register', 'subscribe'])
+        # Take new posts from the WordPress REST API; the HTML pages are the fallback
+        self.use_wp_api = True
+        self.wp_synced_at = None    # when the API was last read completely
+        # Without the API, take every post changed since the last run from the sitemaps
+        self.use_sitemap = True
+        # Sections read after the homepage when neither the API, the sitemaps nor a feed answer
+        self.news_sections = ['/novosti/', '/vijesti/', '/aktuelnosti/', '/category/novosti/', '/blog/']
+        self.last_error = None
+        self.deadline = None
         
         os.makedirs(self.output_dir, exist_ok=True)
         
         # Load existing state
         self.load_state()
         
-        self.session = requests.Session()
+        self.session = http_transport.Client()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
         })
+        # All pages come from one host: multiplex them over a single HTTP/2 connection
+        http_transport.enable_http2(self.base_url)
     
     def get_script_hash(self):
         """Get script hash"""
@@ -52,13 +80,14 @@ class USNKrajinaScraper:
                 with open(self.state_file, 'r', encoding='utf-8') as f:
                     state = json.load(f)
                     
-                    self.scraped_urls = set(state.get('scraped_urls', []))
+                    self.scraped_urls = LinkSet(state.get('scraped_urls', []))
                     self.content_hashes = set(state.get('content_hashes', []))
+                    self.wp_synced_at = state.get('wp_synced_at')
                     
                     print(f"📁 Loaded state: {len(self.scraped_urls)} URLs, {len(self.content_hashes)} hashes")
             except Exception as e:
                 print(f"⚠️  Error loading state: {e}")
-                self.scraped_urls = set()
+                self.scraped_urls = LinkSet()
                 self.content_hashes = set()
         else:
             print("📁 No state file found, starting fresh")
@@ -68,6 +97,7 @@ class USNKrajinaScraper:
         state = {
             "scraped_urls": list(self.scraped_urls),
             "content_hashes": list(self.content_hashes),
+            "wp_synced_at": self.wp_synced_at,
             "last_run": datetime.now().isoformat(),
             "script_name": self.script_name,
             "script_hash": self.script_hash
@@ -76,6 +106,9 @@ class USNKrajinaScraper:
         try:
             with open(self.state_file, 'w', encoding='utf-8') as f:
                 json.dump(state, f, ensure_ascii=False, indent=2)
+            http_transport.save_validators()
+            self.failures.save()
+            self.heads.save()
             print(f"\n💾 State saved to {self.state_file}")
         except Exception as e:
             print(f"❌ Error saving state: {e}")
@@ -94,15 +127,36 @@ class USNKrajinaScraper:
         print("=" * 60)
     
     def fetch_page(self, url):
-        """Fetch webpage with better error handling"""
+        """Fetch and parse webpage with better error handling"""
+        self.last_error = None
+        try:
+            print(f"  🌐 Fetching: {url}")
+            # Content-Type is checked before the body is downloaded
+            resp = self.session.get(url, timeout=15, html_only=True)
+            resp.raise_for_status()
+            return http_transport.parse_html(resp)
+                
+        except http_transport.SkippedRequest as e:
+            self.last_error = e
+            return None
+        except Exception as e:
+            self.last_error = e
+            print(f"  ❌ Error fetching: {e}")
+            return None
+    
+    def fetch_listing(self, url):
+        """Fetch and parse a listing page, revalidating it against the last run"""
         try:
             print(f"  🌐 Fetching: {url}")
-            resp = self.session.get(url, timeout=15)
+            resp = self.session.get_conditional(url, timeout=15)
             resp.raise_for_status()
             
-            # Check if it's HTML
+            if resp.status_code == 304:
+                print(f"  ⏸️  Not modified since last run, skipping")
+                return None
+            
             if 'text/html' in resp.headers.get('Content-Type', ''):
-                return resp.text
+                return http_transport.parse_html(resp)
             else:
                 print(f"  ⚠️  Not HTML content: {resp.headers.get('Content-Type')}")
                 return None
@@ -111,10 +165,9 @@ class USNKrajinaScraper:
             print(f"  ❌ Error fetching: {e}")
             return None
     
-    def find_articles(self, html):
+    def find_articles(self, soup):
         """Find article links on page"""
-        soup = BeautifulSoup(html, 'html.parser')
-        article_urls = []
+        article_urls = LinkSet()
         
         print(f"  🔍 Looking for article links...")
         
@@ -147,9 +200,8 @@ class USNKrajinaScraper:
                 found_urls = strategy()
                 for href in found_urls:
                     full_url = urljoin(self.base_url, href)
-                    if (full_url not in article_urls and
-                        not any(ext in full_url.lower() for ext in ['.jpg', '.png', '.pdf', '.zip'])):
-                        article_urls.append(full_url)
+                    if not any(ext in full_url.lower() for ext in ['.jpg', '.png', '.pdf', '.zip']):
+                        article_urls.add(full_url)
                 
                 if article_urls:
                     print(f"  ✅ Found {len(article_urls)} articles using strategy")
@@ -165,11 +217,9 @@ class USNKrajinaScraper:
             for post in recent_posts:
                 href = post.get('href')
                 if href:
-                    full_url = urljoin(self.base_url, href)
-                    if full_url not in article_urls:
-                        article_urls.append(full_url)
+                    article_urls.add(urljoin(self.base_url, href))
         
-        return list(set(article_urls))[:15]
+        return list(article_urls)[:15]
     
     def extract_content(self, soup):
         """Extract article content with multiple strategies"""
@@ -236,10 +286,7 @@ class USNKrajinaScraper:
                 text = p.get_text(strip=True)
                 # Filter out short text and navigation/menu items
                 if (len(text) > 50 and 
-                    not any(word in text.lower() for word in 
-                           ['menu', 'home', 'contact', 'copyright', 'privacy', 'terms', 'cookie',
-                            'facebook', 'twitter', 'instagram', 'linkedin', 'youtube',
-                            'search', 'login', 'register', 'subscribe'])):
+                    not self.boilerplate_words.search(text)):
                     text_parts.append(text)
             
             if text_parts:
@@ -281,11 +328,10 @@ class USNKrajinaScraper:
             return urljoin(url, logo.get('src'))
         
         # Default fallback
-        return "https://usnkrajina.com.ba/wp-content/uploads/2021/11/cropped-usn_logo-1.png"
+        return self.default_image_url
     
-    def parse_article(self, url, html):
+    def parse_article(self, url, soup):
         """Parse article and return data in required JSON format"""
-        soup = BeautifulSoup(html, 'html.parser')
         
         print(f"    📝 Parsing article...")
         
@@ -318,10 +364,7 @@ class USNKrajinaScraper:
                         print(f"    ✅ Title from {selector}: {title[:50]}...")
                         break
         
-        # 2. Generate ID (8 char hex)
-        article_id = hashlib.md5(url.encode()).hexdigest()[:8]
-        
-        # 3. Date
+        # 2. Date
         date_str = datetime.now().strftime('%Y-%m-%d')
         date_selectors = [
             'time.entry-date',
@@ -365,7 +408,7 @@ class USNKrajinaScraper:
                         print(f"    ✅ Date from {selector}: {date_str}")
                         break
         
-        # 4. Content
+        # 3. Content
         content = self.extract_content(soup)
         
         if not content or len(content.strip()) < 50:
@@ -379,6 +422,23 @@ class USNKrajinaScraper:
                 content = re.sub(r'\n\s*\n', '\n\n', content)
                 print(f"    ℹ️  Using body text: {len(content)} chars")
         
+        # 4. Image URL
+        image_url = self.extract_image_url(soup, url)
+        print(f"    🖼️  Image: {image_url[:50]}...")
+        
+        return self.build_post(url, title, date_str, content, image_url)
+    
+    def parse_wp_post(self, post):
+        """Build a post from a WordPress API post, without fetching the article page"""
+        fields = wp_api.post_fields(post)
+        print(f"    📝 From the WordPress API: {fields['title'][:50]}...")
+        return self.build_post(fields['url'], fields['title'] or "Nema naslova", fields['date'],
+                               fields['content'], fields['image_url'] or self.default_image_url)
+    
+    def build_post(self, url, title, date_str, content, image_url):
+        """Add the read-more link and content hash, and return the post in the required JSON format"""
+        article_id = hashlib.md5(url.encode()).hexdigest()[:8]
+        
         # Add "Read more" link
         if content:
             if len(content) > 1500:
@@ -388,15 +448,10 @@ class USNKrajinaScraper:
             content = f"Nema dostupnog sadržaja za ovu vijest.\n\n📖 Pročitajte više: {url}"
             print(f"    ⚠️  No content found for this article")
         
-        # 5. Content hash (12 chars)
+        # Content hash (12 chars)
         content_for_hash = f"{title}{content[:1000]}".encode('utf-8')
         content_hash = hashlib.md5(content_for_hash).hexdigest()[:12]
         
-        # 6. Image URL
-        image_url = self.extract_image_url(soup, url)
-        print(f"    🖼️  Image: {image_url[:50]}...")
-        
-        # Build JSON
         return {
             "title": title,
             "id": article_id,
@@ -448,63 +503,122 @@ class USNKrajinaScraper:
     def run(self):
         """Main execution"""
         self.print_header()
+        self.deadline = source_deadline(self.script_name)
+        self.session.deadline = self.deadline
         
         print(f"Scraping USN Krajina: {self.base_url}")
         print("Looking for news articles...")
         
-        # Start with main page
-        main_html = self.fetch_page(self.base_url)
-        if not main_html:
-            print("❌ Failed to fetch main page")
-            self.save_state()
-            return
+        # On WordPress, new posts arrive with their content in one API request
+        sync_started = wp_api.now()
+        wp_posts, wp_complete = None, False
+        if self.use_wp_api:
+            wp_posts, wp_complete = wp_api.new_posts(self.base_url, self.wp_synced_at,
+                                                     headers=self.session.headers, deadline=self.deadline)
+        
+        # Otherwise the sitemaps, which list every changed post by <lastmod>
+        sitemap_urls = None
+        if wp_posts is None and self.use_sitemap:
+            sitemap_urls = sitemaps.sitemap_links(self.script_name, self.base_url, headers=self.session.headers,
+                                                  deadline=self.deadline)
+        
+        # Otherwise the site's feed, when it has one, replaces the homepage and section pages
+        found, feed_urls = False, None
+        if wp_posts is None and sitemap_urls is None:
+            found, feed_urls = feeds.feed_links(self.script_name, self.base_url, headers=self.session.headers,
+                                                deadline=self.deadline)
+        
+        if wp_posts is not None:
+            article_urls = list(wp_posts)
+        elif sitemap_urls is not None:
+            article_urls = sitemap_urls
+        elif found:
+            article_urls = feed_urls or []
+        else:
+            # Start with main page (skipped when unchanged since the last run)
+            main_soup = self.fetch_listing(self.base_url)
         
-        # Find article URLs
-        article_urls = self.find_articles(main_html)
+            # Find article URLs
+            article_urls = self.find_articles(main_soup) if main_soup else []
         
-        # Also check common news sections
-        news_sections = ['/novosti/', '/vijesti/', '/aktuelnosti/', '/category/novosti/', '/blog/']
-        for section in news_sections:
-            section_url = urljoin(self.base_url, section)
-            print(f"\n📂 Checking section: {section_url}")
-            section_html = self.fetch_page(section_url)
-            if section_html:
-                section_urls = self.find_articles(section_html)
-                article_urls.extend(section_urls)
+            # Also check common news sections
+            for section in self.news_sections:
+                if self.deadline.expired():
+                    print("\n⏰ Time budget used up, skipping the remaining pages")
+                    break
+                section_url = urljoin(self.base_url, section)
+                print(f"\n📂 Checking section: {section_url}")
+                section_soup = self.fetch_listing(section_url)
+                if section_soup:
+                    section_urls = self.find_articles(section_soup)
+                    article_urls.extend(section_urls)
         
         # Remove duplicates and already scraped URLs
-        unique_new_urls = []
-        for url in set(article_urls):
-            if url not in self.scraped_urls:
-                unique_new_urls.append(url)
+        article_urls = LinkSet(article_urls)
+        unique_new_urls = [url for url in article_urls if url not in self.scraped_urls]
         
-        print(f"\n📊 Found {len(set(article_urls))} total articles")
+        print(f"\n📊 Found {len(article_urls)} total articles")
         print(f"📊 New articles to process: {len(unique_new_urls)}")
         
         if not unique_new_urls:
             print("✅ No new articles found.")
+            if wp_complete:
+                self.wp_synced_at = sync_started
+            sitemaps.commit(self.script_name)
             self.save_state()
             return
         
         print(f"\nProcessing {len(unique_new_urls)} new articles...\n")
         
+        # Known articles are recognised from their <head>, before the full download
+        head_duplicates = {}
+        if self.head_check:
+            # API posts already carry their content; reading their <head> would save nothing
+            pending = [u for u in unique_new_urls
+                       if not self.failures.should_skip(u) and not (wp_posts and u in wp_posts)]
+            head_duplicates = self.heads.check(pending, self.scraped_urls, headers=self.session.headers,
+                                               deadline=self.deadline)
+        
         for i, url in enumerate(unique_new_urls, 1):
+            # Out of time: stop here, what was scraped so far is still saved below
+            if self.deadline.expired():
+                print(f"\n⏰ Time budget used up, stopping with partial results")
+                break
+            
             print(f"\n[{i}/{len(unique_new_urls)}] Processing: {url}")
             
-            # Fetch article
-            article_html = self.fetch_page(url)
-            if not article_html:
-                print(f"  ❌ Failed to fetch article")
+            # Failed on an earlier run and not due for another try yet
+            if self.failures.should_skip(url):
+                print(f"  ⏳ Skipping, {self.failures.describe(url)}")
                 continue
             
-            # Parse article
-            post_data = self.parse_article(url, article_html)
+            # Already have this article under another URL or with the same title and date
+            if url in head_duplicates:
+                print(f"  ⚠️  Duplicate, {head_duplicates[url]}")
+                self.scraped_urls.add(url)
+                continue
+            
+            if wp_posts and url in wp_posts:
+                # Content came with the API answer, no page to fetch
+                post_data = self.parse_wp_post(wp_posts[url])
+            else:
+                # Fetch article
+                article_soup = self.fetch_page(url)
+                if not article_soup:
+                    print(f"  ❌ Failed to fetch article")
+                    self.failures.record_failure(url, failure_reason(self.last_error))
+                    continue
+                self.failures.record_success(url)
+                
+                # Parse article
+                post_data = self.parse_article(url, article_soup)
             
             # Check for duplicate content
             if post_data['content_hash'] in self.content_hashes:
                 print(f"  ⚠️  Duplicate content (hash: {post_data['content_hash']})")
                 # Still add URL to scraped list
                 self.scraped_urls.add(url)
+                self.heads.add(url)
                 continue
             
             # Save to facebook_ready_posts
@@ -513,6 +627,7 @@ class USNKrajinaScraper:
             # Update state
             self.scraped_urls.add(url)
             self.content_hashes.add(post_data['content_hash'])
+            self.heads.add(url)
             self.new_posts.append((filename, post_data))
             
             print(f"  ✅ Saved: {filename}")
@@ -521,6 +636,17 @@ class USNKrajinaScraper:
             print(f"    Content length: {len(post_data['content'])} chars")
             print(f"    Content hash: {post_data['content_hash']}")
         
+        # Next run asks the API only for posts published after this one, unless it stopped early
+        if wp_complete and not self.deadline.expired():
+            self.wp_synced_at = sync_started
+        unhandled = [u for u in unique_new_urls if u not in self.scraped_urls and not self.failures.recorded(u)]
+        # A listing only counts as read once all its links were handled; otherwise the next run reads it again
+        if unhandled:
+            listings = [self.base_url] + [urljoin(self.base_url, section) for section in self.news_sections]
+            http_transport.discard_validators(listings + [feeds.known_feed(self.script_name, self.base_url)])
+        # The sitemap high-water mark stops short of any URL it gave us that was not handled
+        sitemaps.commit(self.script_name, unhandled)
+        
         # Print summary
         print("\n" + "=" * 60)
         print("Scraping completed!")
@@ -538,6 +664,7 @@ class USNKrajinaScraper:
                 if len(post['content']) < 100:
                     print(f"    ⚠️  Warning: Very short content!")
         
+        http_transport.print_stats()
         print(f"\n✅ Check the 'facebook_ready_posts' directory for JSON files.")
         
         # Save state
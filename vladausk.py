@@ -4,8 +4,6 @@ VLADA USK News Scraper - REFINED VERSION
 Extracts only actual news from category page
 """
 
-import requests
-from bs4 import BeautifulSoup
 import json
 import os
 import hashlib
@@ -15,6 +13,9 @@ from urllib.parse import urljoin
 import time
 import sys
 
+import http_transport
+from deadline import source_deadline
+
 # Configuration
 BASE_URL = "https://vladausk.ba/v4/vrsta/kategorija/4"
 OUTPUT_DIR = "facebook_ready_posts"
@@ -50,6 +51,7 @@ def save_scraped_data(content_hashes):
     }
     with open(STATE_FILE, 'w') as f:
         json.dump(state, f, indent=2, ensure_ascii=False)
+    http_transport.save_validators()
 
 def clean_text(text):
     if not text:
@@ -103,14 +105,17 @@ def is_valid_news_title(title):
     # Titles should be reasonably long (not single words)
     return len(title) > 20
 
-def extract_news_from_category():
+def extract_news_from_category(deadline=None):
     """Extract only actual news articles from category page"""
     try:
         print(f"Fetching category page: {BASE_URL}")
-        response = requests.get(BASE_URL, headers=HEADERS, timeout=15)
+        response = http_transport.get_conditional(BASE_URL, headers=HEADERS, timeout=15, deadline=deadline)
         response.raise_for_status()
+        if response.status_code == 304:
+            print("⏸️  Listing page not modified since last run, skipping")
+            return None
         
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = http_transport.parse_html(response)
         
         # Find all h3 elements (these seem to contain news titles)
         all_h3 = soup.find_all('h3')
@@ -237,9 +242,14 @@ def scrape_latest_news():
     ensure_dirs()
     scraped_hashes = load_scraped_data()
     new_posts = []
+    deadline = source_deadline(SCRIPT_NAME)
     
     # Extract news from category page
-    news_items = extract_news_from_category()
+    news_items = extract_news_from_category(deadline)
+    
+    # Listing page unchanged since the last run
+    if news_items is None:
+        return []
     
     if not news_items:
         print("No news articles found!")
@@ -248,6 +258,7 @@ def scrape_latest_news():
     print(f"\nProcessing {len(news_items)} news articles...")
     
     counter = 1
+    unsaved = 0
     
     for news_item in news_items:
         print(f"\nArticle {counter}: {news_item['title'][:60]}...")
@@ -288,6 +299,11 @@ def scrape_latest_news():
             
         except Exception as e:
             print(f"  ❌ Error saving: {e}")
+            unsaved += 1
+    
+    # A listing only counts as read once all its news was saved; otherwise the next run reads it again
+    if unsaved:
+        http_transport.discard_validators([BASE_URL])
     
     # Save state
     save_scraped_data(scraped_hashes)
@@ -320,6 +336,7 @@ def main():
     else:
         print("\nℹ️  No new posts found.")
     
+    http_transport.print_stats()
     print(f"✅ Check the '{OUTPUT_DIR}' directory for JSON files.")
     print("=" * 60)
 
@@ -4,17 +4,25 @@ Vodovod Bihać Utility Scraper for Facebook Auto-Posting
 Scrapes: https://www.vodovod-bihac.ba/
 """
 
-import requests
-from bs4 import BeautifulSoup
 import json
 import os
 import hashlib
 from datetime import datetime
 import re
 from urllib.parse import urljoin
-import time
 import sys
 
+import feeds
+import http_transport
+import rate_limit
+from async_fetch import fetch, fetch_all
+from failure_ledger import FailureLedger, failure_reason
+from deadline import source_deadline
+from head_index import HeadIndex
+from link_model import LinkModel, SHORT_CONTENT
+from keywords import Matcher
+from urls import LinkSet
+
 # Configuration
 BASE_URL = "https://www.vodovod-bihac.ba/"
 OUTPUT_DIR = "facebook_ready_posts"
@@ -23,6 +31,32 @@ HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
 }
 
+# Fetch article pages concurrently instead of one by one
+ASYNC_FETCH = True
+MAX_CONCURRENCY_PER_HOST = 4
+
+# Read only the <head> of new pages first and skip the full download of
+# articles we already have (same canonical URL, or same title and date)
+HEAD_CHECK = True
+
+# Skip new links whose URL pattern has mostly led to duplicates, errors or
+# empty pages on earlier runs, before they are fetched
+URL_MODEL = True
+
+# Politeness towards the host: sustained requests per second and burst size.
+# robots.txt Crawl-delay and Retry-After can only slow this down.
+RATE_PER_SECOND = 0.5
+RATE_BURST = 4
+
+# Words that mark an announcement link, in its text or its URL
+ANNOUNCEMENT_WORDS = Matcher([
+    'obavijest', 'obavjest', 'vijest', 'novost',
+    'aktuelno', 'aktualno', 'news', 'announcement',
+    'prekidi', 'planirani', 'održavanje', 'servis'
+])
+# Paragraphs with these are page furniture, not announcement text
+BOILERPLATE_WORDS = Matcher(['menu', 'home', 'contact', 'copyright', 'sva prava'])
+
 # Get script name hash for file naming
 SCRIPT_NAME = os.path.basename(sys.argv[0])
 SCRIPT_NAME_HASH = hashlib.md5(SCRIPT_NAME.encode()).hexdigest()[:12]
@@ -43,8 +77,8 @@ def load_scraped_data():
     if os.path.exists(STATE_FILE):
         with open(STATE_FILE, 'r') as f:
             data = json.load(f)
-            return set(data.get('scraped_urls', [])), set(data.get('content_hashes', []))
-    return set(), set()
+            return LinkSet(data.get('scraped_urls', [])), set(data.get('content_hashes', []))
+    return LinkSet(), set()
 
 def save_scraped_data(scraped_urls, content_hashes):
     """Save scraped data to state file"""
@@ -57,6 +91,7 @@ def save_scraped_data(scraped_urls, content_hashes):
     }
     with open(STATE_FILE, 'w') as f:
         json.dump(state, f, indent=2, ensure_ascii=False)
+    http_transport.save_validators()
 
 def clean_text(text):
     """Clean and normalize text"""
@@ -67,14 +102,17 @@ def clean_text(text):
     text = re.sub(r'\s+', ' ', text)
     return text.strip()
 
-def extract_announcement_details(announcement_url):
+def extract_announcement_details(announcement_url, response=None, deadline=None):
     """Extract details from an announcement page"""
     try:
         print(f"  Fetching: {announcement_url}")
-        response = requests.get(announcement_url, headers=HEADERS, timeout=10)
+        if response is None:
+            response = http_transport.get(announcement_url, headers=HEADERS, timeout=10, html_only=True, deadline=deadline)
+        elif isinstance(response, Exception):
+            raise response
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = http_transport.parse_html(response)
         
         # Extract title - utility announcements often have specific structure
         title = "Obavještenje Vodovoda Bihać"
@@ -133,7 +171,7 @@ def extract_announcement_details(announcement_url):
                 text = clean_text(elem.get_text())
                 # Filter out navigation, menus, etc.
                 if (len(text) > 30 and 
-                    not any(word in text.lower() for word in ['menu', 'home', 'contact', 'copyright', 'sva prava']) and
+                    not BOILERPLATE_WORDS.search(text) and
                     not re.match(r'^[\d\W]+$', text)):
                     meaningful_text.append(text)
             
@@ -227,6 +265,9 @@ def extract_announcement_details(announcement_url):
             'type': 'utility_announcement'
         }
         
+    except http_transport.SkippedRequest:
+        # Non-HTML page or unreachable host, already reported by the transport
+        return None
     except Exception as e:
         print(f"  Error extracting details: {e}")
         return None
@@ -276,54 +317,41 @@ def format_for_facebook(announcement_data):
     
     return fb_post, post_id, content_hash
 
-def scrape_announcement_links():
+def scrape_announcement_links(deadline=None):
     """Scrape the main page for utility announcement links"""
+    # The site's feed, when it has one, replaces the listing page heuristics below
+    found, feed_urls = feeds.feed_links(SCRIPT_NAME, BASE_URL, headers=HEADERS, deadline=deadline)
+    if found:
+        return feed_urls
+    
     try:
         print(f"Scraping Vodovod Bihać: {BASE_URL}")
-        response = requests.get(BASE_URL, headers=HEADERS, timeout=15)
+        response = http_transport.get_conditional(BASE_URL, headers=HEADERS, timeout=15, deadline=deadline)
         response.raise_for_status()
+        if response.status_code == 304:
+            print("⏸️  Listing page not modified since last run, skipping")
+            return None
         
-        soup = BeautifulSoup(response.content, 'html.parser')
-        announcement_links = []
+        soup = http_transport.parse_html(response)
+        announcement_links = LinkSet()
         
         # Strategy 1: Look for announcement/notice links
         # Utility sites often have sections like "Obavijesti", "Vijesti", "Aktuelno"
         print("Looking for utility announcements...")
         
-        # Common utility site link patterns
-        announcement_patterns = [
-            'obavijest', 'obavjest', 'vijest', 'novost',
-            'aktuelno', 'aktualno', 'news', 'announcement',
-            'prekidi', 'planirani', 'održavanje', 'servis'
-        ]
-        
         all_links = soup.find_all('a', href=True)
         
         for link in all_links:
             href = link.get('href')
             link_text = clean_text(link.get_text())
-            link_lower = link_text.lower()
             
             # Skip empty or non-announcement links
             if not href or href.startswith(('#', 'javascript:', 'mailto:')):
                 continue
             
-            # Check if it's an announcement link
-            is_announcement = False
-            
-            # Check link text for announcement keywords
-            for pattern in announcement_patterns:
-                if pattern in link_lower and len(link_text) > 5:
-                    is_announcement = True
-                    break
-            
-            # Check URL pattern
-            if not is_announcement and href:
-                href_lower = href.lower()
-                for pattern in announcement_patterns:
-                    if pattern in href_lower:
-                        is_announcement = True
-                        break
+            # Check the link text, then the URL, for announcement keywords
+            is_announcement = ((len(link_text) > 5 and ANNOUNCEMENT_WORDS.search(link_text))
+                               or ANNOUNCEMENT_WORDS.search(href))
             
             if is_announcement:
                 # Make URL absolute
@@ -332,8 +360,7 @@ def scrape_announcement_links():
                 else:
                     full_url = href
                 
-                if full_url not in announcement_links and full_url != BASE_URL:
-                    announcement_links.append(full_url)
+                if full_url != BASE_URL and announcement_links.add(full_url):
                     print(f"  Found announcement: {link_text[:50]}...")
         
         # Strategy 2: Look for date-stamped items (common in utility announcements)
@@ -346,13 +373,7 @@ def scrape_announcement_links():
             # This site might have announcements directly on main page
             # We'll handle this in the main function
         
-        # Remove duplicates
-        unique_links = []
-        seen = set()
-        for link in announcement_links:
-            if link not in seen:
-                seen.add(link)
-                unique_links.append(link)
+        unique_links = list(announcement_links)
         
         print(f"Total announcement links: {len(unique_links)}")
         return unique_links[:8]  # Limit to 8 announcements
@@ -361,14 +382,14 @@ def scrape_announcement_links():
         print(f"Error scraping announcement links: {e}")
         return []
 
-def extract_from_main_page():
+def extract_from_main_page(deadline=None):
     """Extract announcements directly from main page if no separate pages"""
     try:
         print("Extracting announcements from main page content...")
-        response = requests.get(BASE_URL, headers=HEADERS, timeout=15)
+        response = http_transport.get(BASE_URL, headers=HEADERS, timeout=15, deadline=deadline)
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = http_transport.parse_html(response)
         announcements = []
         
         # Look for announcement sections
@@ -424,10 +445,19 @@ def scrape_latest_announcements():
     
     ensure_dirs()
     scraped_urls, content_hashes = load_scraped_data()
+    failures = FailureLedger(SCRIPT_NAME)
+    heads = HeadIndex(SCRIPT_NAME)
+    model = LinkModel(SCRIPT_NAME)
+    deadline = source_deadline(SCRIPT_NAME)
+    rate_limit.configure(BASE_URL, RATE_PER_SECOND, RATE_BURST)
     new_posts = []
     
     # Try to get announcement links first
-    announcement_links = scrape_announcement_links()
+    announcement_links = scrape_announcement_links(deadline)
+    
+    # Listing page unchanged since the last run
+    if announcement_links is None:
+        return []
     
     if announcement_links:
         # Process individual announcement pages
@@ -435,7 +465,29 @@ def scrape_latest_announcements():
         
         counter = 1
         
+        # Links whose URL pattern rarely held an article are not fetched at all
+        if URL_MODEL:
+            announcement_links = model.filter(announcement_links, scraped_urls)
+        
+        # Known articles are recognised from their <head>, before the full download
+        pending = [u for u in announcement_links if u not in scraped_urls and not failures.should_skip(u)]
+        head_duplicates = {}
+        if HEAD_CHECK:
+            head_duplicates = heads.check(pending, scraped_urls, headers=HEADERS, deadline=deadline)
+        
+        # Download all unseen pages up front; the loop below only parses them
+        prefetched = {}
+        if ASYNC_FETCH:
+            pending = [u for u in pending if u not in head_duplicates]
+            prefetched = fetch_all(pending, headers=HEADERS, timeout=10,
+                                   per_host=MAX_CONCURRENCY_PER_HOST, deadline=deadline)
+        
         for announcement_url in announcement_links:
+            # Out of time: stop here, what was scraped so far is still saved below
+            if deadline.expired():
+                print(f"\n⏰ Time budget used up, stopping with partial results")
+                break
+            
             print(f"\n[{counter}/{len(announcement_links)}] Checking: {announcement_url}")
             
             # Skip if already scraped
@@ -444,12 +496,36 @@ def scrape_latest_announcements():
                 counter += 1
                 continue
             
+            # Failed on an earlier run and not due for another try yet
+            if failures.should_skip(announcement_url):
+                print(f"  ⏳ Skipping, {failures.describe(announcement_url)}")
+                counter += 1
+                continue
+            
+            # Already have this article under another URL or with the same title and date
+            if announcement_url in head_duplicates:
+                print(f"  ⚠️  Duplicate, {head_duplicates[announcement_url]}")
+                scraped_urls.add(announcement_url)
+                model.record(announcement_url, False)
+                counter += 1
+                continue
+            
             # Extract details
-            announcement_details = extract_announcement_details(announcement_url)
+            # The page as fetched, or the error, so a broken URL can be told apart from a timeout
+            response = prefetched.get(announcement_url)
+            if response is None:
+                response = fetch(announcement_url, headers=HEADERS, timeout=10, deadline=deadline)
+            announcement_details = extract_announcement_details(announcement_url, response, deadline)
             if not announcement_details:
                 print("  ❌ Could not extract details")
+                reason = failure_reason(response)
+                failures.record_failure(announcement_url, reason)
+                # Timeouts and outages say nothing about the URL pattern
+                if reason is not None:
+                    model.record(announcement_url, False)
                 counter += 1
                 continue
+            failures.record_success(announcement_url)
             
             print(f"  Title: {announcement_details['title'][:60]}...")
             print(f"  Date: {announcement_details.get('date', 'N/A')}")
@@ -463,6 +539,8 @@ def scrape_latest_announcements():
             if content_hash in content_hashes:
                 print(f"  ⚠️  Duplicate content detected")
                 scraped_urls.add(announcement_url)
+                heads.add(announcement_url)
+                model.record(announcement_url, False)
                 counter += 1
                 continue
             
@@ -480,6 +558,8 @@ def scrape_latest_announcements():
                 # Update tracking
                 scraped_urls.add(announcement_url)
                 content_hashes.add(content_hash)
+                heads.add(announcement_url)
+                model.record(announcement_url, len(announcement_details['content']) >= SHORT_CONTENT)
                 new_posts.append({
                     'filename': filename,
                     'title': announcement_details['title'],
@@ -491,12 +571,11 @@ def scrape_latest_announcements():
                 print(f"  ❌ Error saving: {e}")
             
             counter += 1
-            time.sleep(2)
     
     else:
         # If no individual pages, extract from main page
         print("\nNo individual announcement pages found, extracting from main page...")
-        announcements = extract_from_main_page()
+        announcements = extract_from_main_page(deadline)
         
         if announcements:
             print(f"\nProcessing {len(announcements)} announcements from main page...")
@@ -544,8 +623,16 @@ def scrape_latest_announcements():
                 
                 counter += 1
     
+    # A listing only counts as read once all its links were handled; otherwise the next run reads it again
+    unhandled = [u for u in announcement_links if u not in scraped_urls and not failures.recorded(u)]
+    if unhandled:
+        http_transport.discard_validators([BASE_URL, feeds.known_feed(SCRIPT_NAME, BASE_URL)])
+    
     # Save state
     save_scraped_data(scraped_urls, content_hashes)
+    failures.save()
+    heads.save()
+    model.save()
     
     print(f"\n" + "=" * 60)
     print(f"Scraping completed!")
@@ -576,6 +663,7 @@ def main():
     else:
         print("\nℹ️  No new announcements found.")
     
+    http_transport.print_stats()
     print(f"✅ Check the '{OUTPUT_DIR}' directory for JSON files.")
     print("=" * 60)
 